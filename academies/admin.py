@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.db.models import Count
 from .models import (
     Academy, Category, Language, Location, Teacher, 
-    Offering, Variation, VariationTeacher, Link
+    Offering, Variation, VariationTeacher, Link, Order, Enrollment
 )
 
 
@@ -14,6 +14,12 @@ class VariationInline(admin.TabularInline):
     show_change_link = True
     readonly_fields = ('created_at', 'updated_at')
 
+class EnrollmentInline(admin.TabularInline):
+    model = Enrollment
+    extra = 0
+    fields = ('variation', 'title', 'quantity', 'unit_price', 'total_price')
+    raw_id_fields = ['variation']
+
 class VariationTeacherInline(admin.TabularInline):
     model = VariationTeacher
     extra = 1
@@ -184,7 +190,7 @@ class TeacherAdmin(admin.ModelAdmin):
             'fields': ('name', 'title', 'profile_url', 'photo_url')
         }),
         ('Details', {
-            'fields': ('bio', 'description')
+            'fields': ('bio', 'description', 'drupal_user_id')
         }),
         ('Statistics', {
             'fields': ('variation_count',),
@@ -420,3 +426,13 @@ class LinkAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('order_number', 'academy', 'customer_name', 'mail', 'state', 'total_price', 'currency', 'created_at')
+    list_filter = ('academy', 'state', 'created_at')
+    search_fields = ('order_number', 'customer_name', 'customer_mail', 'mail')
+    list_select_related = ('academy',)
+    readonly_fields = ('drupal_order_id', 'created_at', 'updated_at')
+    inlines = [EnrollmentInline]
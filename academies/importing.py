@@ -0,0 +1,242 @@
+"""
+Lookup caches and helpers for the bulk data importers
+
+The import commands used to look up the academy, category, language, location
+and teachers of every offering with one or more queries each. ImportCache
+loads these tables once into dictionaries keyed the way the importers look
+them up, and creates missing rows on the fly so later lookups find them.
+"""
+import bisect
+import hashlib
+import json
+import string
+import time
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Academy, Category, Language, Location, Teacher
+
+# Rows per bulk_create/bulk_update statement, well below SQLite's variable limit
+BATCH_SIZE = 500
+
+# Academy names used on the websites that differ from the names in the database
+ACADEMY_NAME_MAPPING = {
+    'Gandaius Academy': 'Gandaius Permanente Vorming',
+    'Beta Academy': 'Science Academy',
+    'Ghall': 'The GHALL',
+    'ACVetMed': 'Academie voor Diergeneeskunde',
+    'ALLPHA': 'Academy for Lifelong Learning in Pharmacy',
+    'APSS': 'Academy for Political and Social Sciences',
+}
+
+# SQLite's LIKE only folds the case of ASCII letters
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def icontains(needle, haystack):
+    """Whether haystack contains needle, with the semantics of a name__icontains lookup on SQLite."""
+    return needle.translate(ASCII_LOWER) in haystack.translate(ASCII_LOWER)
+
+
+def fingerprint(*parts):
+    """Hex digest of JSON-serialisable data, e.g. everything an offering is imported from."""
+    data = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def assign(obj, values):
+    """
+    Set attributes of a model instance
+
+    Args:
+        obj: Model instance
+        values: Dictionary of field names and values
+
+    Returns:
+        Whether any attribute changed
+    """
+    changed = False
+    for name, value in values.items():
+        if getattr(obj, name) != value:
+            setattr(obj, name, value)
+            changed = True
+    return changed
+
+
+def bulk_update(model, objects, fields):
+    """bulk_update model instances in batches, setting updated_at as save() would."""
+    objects = list(objects)
+    if any(field.name == 'updated_at' for field in model._meta.fields):
+        now = timezone.now()
+        for obj in objects:
+            obj.updated_at = now
+        fields = fields + ['updated_at']
+    model.objects.bulk_update(objects, fields, batch_size=BATCH_SIZE)
+
+
+class QueryCounter:
+    """Context manager counting the database queries and wall time of an import."""
+
+    def __enter__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self._wrapper = connection.execute_wrapper(self._count)
+        self._wrapper.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def _count(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self._start
+        self._wrapper.__exit__(*exc_info)
+
+    def __str__(self):
+        return f'{self.queries} queries in {self.seconds:.1f}s'
+
+
+class CategoryIndex:
+    """
+    Finds the category of one academy a category name refers to, without queries
+
+    The importers match a name with Category.objects.filter(name__icontains=name,
+    academy=academy).first(): the first category by name that contains it,
+    ignoring the case of ASCII letters. The index keeps the case-folded
+    category names sorted by name, so the first one containing a name is that
+    match, and remembers the match of every folded name it has been asked for;
+    an offering's categories are almost always names seen before.
+
+    An exact name is not looked up directly: 'Data' also matches 'Big Data',
+    which comes first.
+    """
+
+    def __init__(self, categories):
+        """
+        Args:
+            categories: Dictionary of category name -> category of one academy;
+                the index follows categories added to it
+        """
+        self.categories = categories
+        self._size = None
+
+    def _build(self):
+        names = sorted(self.categories)
+        self._names = names
+        self._folded = [name.translate(ASCII_LOWER) for name in names]
+        self._matches = {}
+        self._size = len(names)
+
+    def add(self, category):
+        """Add a new category, keeping the index up to date."""
+        self.categories[category.name] = category
+        if self._size is not None:
+            position = bisect.bisect(self._names, category.name)
+            self._names.insert(position, category.name)
+            self._folded.insert(position, category.name.translate(ASCII_LOWER))
+            # Names that matched nothing or a later category may now match this one
+            self._matches = {}
+            self._size += 1
+
+    def find(self, name):
+        """The first category (by name) whose name contains name, ignoring ASCII case, or None."""
+        if self._size != len(self.categories):
+            self._build()
+        folded = name.translate(ASCII_LOWER)
+        try:
+            match = self._matches[folded]
+        except KeyError:
+            match = self._matches[folded] = next(
+                (self._names[i] for i, candidate in enumerate(self._folded) if folded in candidate), None
+            )
+        return self.categories[match] if match is not None else None
+
+
+class ImportCache:
+    """Academies, categories, languages, locations and teachers by the names the importers use."""
+
+    def __init__(self):
+        self.academies = {academy.name: academy for academy in Academy.objects.all()}
+        self.languages = {language.name: language for language in Language.objects.all()}
+        self.locations = {location.name: location for location in Location.objects.all()}
+        self.teachers = {teacher.name: teacher for teacher in Teacher.objects.all()}
+        # Academy id -> category name -> category
+        self.categories = {}
+        for category in Category.objects.all():
+            self.categories.setdefault(category.academy_id, {})[category.name] = category
+        self.category_indexes = {}
+
+    def academy(self, name):
+        """
+        Find the academy for a name used in the scraped data
+
+        Args:
+            name: Academy name, possibly one of ACADEMY_NAME_MAPPING
+
+        Returns:
+            The academy with that exact name, else the first (in the model
+            ordering) whose name contains it, or None
+        """
+        name = ACADEMY_NAME_MAPPING.get(name, name)
+        academy = self.academies.get(name)
+        if academy is None:
+            ordered = sorted(self.academies.values(), key=lambda a: (a.sort_order, a.name))
+            academy = next((a for a in ordered if icontains(name, a.name)), None)
+        return academy
+
+    def language(self, name):
+        """Get or create the language with the given name."""
+        language = self.languages.get(name)
+        if language is None:
+            language = self.languages[name] = Language.objects.create(name=name)
+        return language
+
+    def location(self, name, url=''):
+        """Get or create the location with the given name; url is only used when creating it."""
+        location = self.locations.get(name)
+        if location is None:
+            location = self.locations[name] = Location.objects.create(name=name, url=url)
+        return location
+
+    def teacher(self, name, profile_url=''):
+        """Get or create the teacher with the given name; profile_url is only used when creating it."""
+        teacher = self.teachers.get(name)
+        if teacher is None:
+            teacher = self.teachers[name] = Teacher.objects.create(name=name, profile_url=profile_url)
+        return teacher
+
+    def category_index(self, academy):
+        """The CategoryIndex of an academy's categories."""
+        index = self.category_indexes.get(academy.pk)
+        if index is None:
+            index = self.category_indexes[academy.pk] = CategoryIndex(self.categories.setdefault(academy.pk, {}))
+        return index
+
+    def category_named(self, academy, name):
+        """Get or create the category of an academy with exactly the given name."""
+        category = self.categories.setdefault(academy.pk, {}).get(name)
+        if category is None:
+            category = Category.objects.create(name=name, academy=academy)
+            self.category_index(academy).add(category)
+        return category
+
+    def category(self, academy, name):
+        """
+        Find the category of an academy an offering's category name refers to
+
+        Args:
+            academy: Academy of the offering
+            name: Category name without the academy prefix
+
+        Returns:
+            The first category (by name) whose name contains name, with the
+            semantics of a name__icontains lookup; a new category if none does
+        """
+        index = self.category_index(academy)
+        category = index.find(name)
+        if category is None:
+            category = Category.objects.create(name=name, academy=academy)
+            index.add(category)
+        return category
@@ -0,0 +1,232 @@
+"""
+Streaming reader for the JSON files the import commands load
+
+The scraper and extract_data.py write one JSON document with a few top-level
+arrays (academies, categories, offerings, teachers or courses, orders,
+teachers), or NDJSON with one {"type": ..., "record": ...} object per line.
+read_records() yields the elements of these arrays one at a time, so an import
+holds a single record in memory instead of the whole file. A path ending in
+.gz is read gzip-compressed.
+
+Sections needed before the others (academies and categories before offerings)
+are read with a separate pass over the file; see read_sections(). Deltas
+written by extract_data.py --since are read with read_delta().
+"""
+import gzip
+import json
+import re
+
+# Characters read from the file at a time
+CHUNK_SIZE = 1 << 20
+
+# NDJSON record type -> top-level array of the JSON document
+RECORD_SECTIONS = {
+    'academy': 'academies',
+    'category': 'categories',
+    'offering': 'offerings',
+    'teacher': 'teachers',
+    'course': 'courses',
+    'order': 'orders',
+}
+
+NDJSON_START = re.compile(r'\s*\{\s*"type"\s*:')
+DELTA_START = re.compile(r'\s*\{\s*(?:"since"\s*:|"type"\s*:\s*"[^"]*"\s*,\s*"change"\s*:)')
+WHITESPACE = re.compile(r'\s*')
+NUMBER_CHARS = frozenset('0123456789.eE+-')
+DECODER = json.JSONDecoder()
+
+
+def open_text(path):
+    """Open a file for reading text, gzip-compressed when the path ends in .gz."""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+class JSONTokenizer:
+    """Decodes the values of a JSON document from a text file, reading as little as needed."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Append text from the file; returns False at the end of the file."""
+        if self.eof:
+            return False
+        # Read at least as much as is buffered, so a large value is decoded
+        # a logarithmic number of times
+        chunk = self.f.read(max(CHUNK_SIZE, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next character that is not whitespace, or '' at the end of the file."""
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of chars, and return it."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f'Expecting one of {chars!r}', self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buf, self.pos)
+                # A number may continue after the end of the buffer: "-4." of "-4.5e3"
+                if self.eof or (end < len(self.buf) and self.buf[end] not in NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def keys(self):
+        """
+        Decode the keys of a JSON object
+
+        The caller must decode the value of each key (with value(), elements()
+        or keys()) before asking for the next one.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def elements(self):
+        """Decode a JSON array element by element."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+    def members(self):
+        """
+        Decode a JSON object member by member
+
+        Yields:
+            Tuples of (key, value); for a value that is an array, one tuple per element
+        """
+        for key in self.keys():
+            if self.peek() == '[':
+                for element in self.elements():
+                    yield key, element
+            else:
+                yield key, self.value()
+
+
+def read_records(path, sections=None):
+    """
+    Read the records of a JSON document or NDJSON file one at a time
+
+    Args:
+        path: Path of the file (.gz for gzip)
+        sections: Names of the top-level arrays to read (e.g. {'offerings'}),
+            or None for all of them
+
+    Yields:
+        Tuples of (section, record); a top-level value that is not an array
+        (metadata, scraped_at) is yielded once as (key, value)
+
+    Raises:
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    with open_text(path) as f:
+        is_ndjson = NDJSON_START.match(f.read(256))
+        f.seek(0)
+        if is_ndjson:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    section = RECORD_SECTIONS.get(entry['type'], entry['type'])
+                    if sections is None or section in sections:
+                        yield section, entry['record']
+            return
+
+        for section, record in JSONTokenizer(f).members():
+            if sections is None or section in sections:
+                yield section, record
+
+
+def is_delta(path):
+    """Whether a file is a delta written by extract_data.py --since."""
+    with open_text(path) as f:
+        return bool(DELTA_START.match(f.read(256)))
+
+
+def read_delta(path):
+    """
+    Read the changes of a delta written by extract_data.py --since one at a time
+
+    Args:
+        path: Path of the delta in any of its formats (.gz for gzip)
+
+    Yields:
+        Tuples of (kind, change, entity), e.g. ('lessons', 'added', {...}) or
+        ('orders', 'removed', 1234)
+    """
+    with open_text(path) as f:
+        is_ndjson = NDJSON_START.match(f.read(256))
+        f.seek(0)
+        if is_ndjson:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield entry['type'], entry['change'], entry['record']
+            return
+
+        tokenizer = JSONTokenizer(f)
+        for kind in tokenizer.keys():
+            if kind == 'since':
+                tokenizer.value()
+                continue
+            for change in tokenizer.keys():
+                for entity in tokenizer.elements():
+                    yield kind, change, entity
+
+
+def read_sections(path, sections):
+    """
+    Read some sections of a JSON document or NDJSON file completely
+
+    Meant for the small sections an import needs before streaming the large
+    one. The whole file is read, so it is also validated.
+
+    Args:
+        path: Path of the file (.gz for gzip)
+        sections: Names of the top-level arrays to read
+
+    Returns:
+        Dictionary mapping every name in sections to a list of its records
+    """
+    data = {section: [] for section in sections}
+    for section, record in read_records(path, sections):
+        data[section].append(record)
+    return data
@@ -1,16 +1,52 @@
 import json
-import os
 import re
 from datetime import datetime
-from django.core.management.base import BaseCommand
-from django.core.files.base import ContentFile
-from django.utils.text import slugify
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
 from django.utils import timezone
+from academies.importing import BATCH_SIZE, ImportCache, QueryCounter, assign, bulk_update, fingerprint
+from academies.json_stream import read_records, read_sections
 from academies.models import (
     Academy, Category, Language, Location, Teacher, 
     Offering, Variation, VariationTeacher, Link
 )
 
+# Offering fields set from the JSON data
+OFFERING_FIELDS = [
+    'title', 'academy', 'description', 'program_content', 'remarks',
+    'course_id', 'language', 'image_url', 'is_active', 'category',
+    'import_fingerprint',
+]
+
+
+def parse_variation_dates(dates):
+    """
+    Parse the dates of a variation
+
+    Args:
+        dates: List of date strings, e.g. "16/09/2025 - 09:00 – 30/06/2026 - 16:00"
+
+    Returns:
+        Tuple of (all dates joined as text, start date, end date); the dates
+        are taken from the first string that contains a valid date, or None
+    """
+    lesson_dates = ', '.join(dates)
+    for date_str in dates:
+        found = re.findall(r'(\d{1,2}/\d{1,2}/\d{4})', date_str)
+        if not found:
+            continue
+        try:
+            # The first date found is the start, the last one the end
+            start_date = timezone.make_aware(datetime.strptime(found[0], '%d/%m/%Y'))
+            end_date = None
+            if len(found) > 1:
+                end_date = timezone.make_aware(datetime.strptime(found[-1], '%d/%m/%Y'))
+            return lesson_dates, start_date, end_date
+        except ValueError:
+            # If parsing fails, continue with the next date string
+            continue
+    return lesson_dates, None, None
+
 
 class Command(BaseCommand):
     help = 'Import academy and offering data from the detailed JSON file'
@@ -19,358 +55,350 @@ class Command(BaseCommand):
         parser.add_argument(
             'json_file',
             type=str,
-            help='Path to the detailed JSON file containing academy data'
+            help='Path to the detailed JSON file containing academy data (or NDJSON, .gz for gzip)'
         )
         parser.add_argument(
             '--clear',
             action='store_true',
             help='Clear existing data before importing'
         )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rewrite every offering, also those unchanged since the last import'
+        )
+        parser.add_argument(
+            '--deactivate-missing',
+            action='store_true',
+            help='Deactivate offerings that are no longer in the JSON file'
+        )
 
     def handle(self, *args, **options):
         json_file = options['json_file']
         clear_data = options['clear']
-        
-        if clear_data:
-            self.stdout.write('Clearing existing data...')
-            # Delete related data first to avoid integrity errors
-            Link.objects.all().delete()
-            VariationTeacher.objects.all().delete()
-            Variation.objects.all().delete()
-            Offering.objects.all().delete()
-            Category.objects.all().delete()
-            Language.objects.all().delete()
-            Location.objects.all().delete()
-            Teacher.objects.all().delete()
-            Academy.objects.all().delete()
-            self.stdout.write(self.style.SUCCESS('Data cleared successfully'))
+        self.full = options['full']
+        self.deactivate_missing = options['deactivate_missing']
 
+        # The offerings are streamed from the file in a second pass, so only
+        # one of them is in memory at a time
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = read_sections(json_file, ['academies', 'categories', 'teachers'])
         except FileNotFoundError:
-            self.stdout.write(self.style.ERROR(f'File not found: {json_file}'))
-            return
+            raise CommandError(f'File not found: {json_file}')
         except json.JSONDecodeError as e:
-            self.stdout.write(self.style.ERROR(f'Invalid JSON: {e}'))
-            return        # Import academies
-        self.import_academies(data['academies'])
-        
-        # Import categories
-        self.import_categories(data['categories'])
-        
-        # Import teachers
-        self.import_teachers(data.get('teachers', []))
-        
-        # Import offerings
-        self.import_offerings(data['offerings'])
-        
-        self.stdout.write(self.style.SUCCESS('Data imported successfully'))
+            raise CommandError(f'Invalid JSON: {e}')
+
+        # One transaction: the site never sees a half-imported database, and
+        # SQLite does not sync the file after every statement
+        with QueryCounter() as counter, transaction.atomic():
+            if clear_data:
+                self.clear()
+
+            self.cache = ImportCache()
+            self.import_academies(data['academies'])
+            self.import_categories(data['categories'])
+            self.import_teachers(data.get('teachers', []))
+            self.import_offerings(offering for _, offering in read_records(json_file, {'offerings'}))
+
+        self.stdout.write(self.style.SUCCESS(f'Data imported successfully ({counter})'))
+
+    def clear(self):
+        """Delete all imported data."""
+        self.stdout.write('Clearing existing data...')
+        # Delete related data first to avoid integrity errors
+        Link.objects.all().delete()
+        VariationTeacher.objects.all().delete()
+        Variation.objects.all().delete()
+        Offering.objects.all().delete()
+        Category.objects.all().delete()
+        Language.objects.all().delete()
+        Location.objects.all().delete()
+        Teacher.objects.all().delete()
+        Academy.objects.all().delete()
+        self.stdout.write(self.style.SUCCESS('Data cleared successfully'))
 
     def import_academies(self, academies_data):
         """Import academies from the JSON data."""
         self.stdout.write('Importing academies...')
-        created_count = 0
-        updated_count = 0
-        
+        created = []
+        updated = {}
+        unchanged_count = 0
+
         for item in academies_data:
-            academy, created = Academy.objects.update_or_create(
-                name=item['name'],
-                defaults={
-                    'base_url': item['url'],
-                    'program_url': item.get('program_url', ''),
-                    'colour': item.get('colour', ''),
-                    'sort_order': item.get('sort_order', 0),
-                    'introduction': item.get('introduction', ''),
-                    'logo': item.get('logo', '')
-                }
-            )
-            
-            if created:
-                created_count += 1
+            values = {
+                'base_url': item['url'],
+                'program_url': item.get('program_url', ''),
+                'colour': item.get('colour', ''),
+                'sort_order': item.get('sort_order', 0),
+                'introduction': item.get('introduction', ''),
+                'logo': item.get('logo', ''),
+            }
+            academy = self.cache.academies.get(item['name'])
+            if academy is None:
+                academy = self.cache.academies[item['name']] = Academy(name=item['name'], **values)
+                created.append(academy)
+            elif assign(academy, values):
+                if academy.pk is not None:
+                    updated[academy.name] = academy
             else:
-                updated_count += 1
-                
-        self.stdout.write(f'Created {created_count} academies, updated {updated_count} academies')
-        
+                unchanged_count += 1
+
+        Academy.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        bulk_update(Academy, updated.values(), ['base_url', 'program_url', 'colour', 'sort_order', 'introduction', 'logo'])
+        updated_count = len(academies_data) - len(created) - unchanged_count
+        self.stdout.write(f'Created {len(created)} academies, updated {updated_count} academies, {unchanged_count} unchanged')
+
     def import_categories(self, categories_data):
         """Import categories from the JSON data."""
         self.stdout.write('Importing categories...')
-        created_count = 0
-        updated_count = 0
+        created = []
+        existing_count = 0
         skipped_count = 0
-        
-        # Create a mapping for academy name variations
-        academy_name_mapping = {
-            'Gandaius Academy': 'Gandaius Permanente Vorming',
-            'Beta Academy': 'Science Academy',
-            'Ghall': 'The GHALL',
-            'ACVetMed': 'Academie voor Diergeneeskunde',
-            'ALLPHA': 'Academy for Lifelong Learning in Pharmacy',
-            'APSS': 'Academy for Political and Social Sciences',
-        }
-        
+
         for item in categories_data:
-            academy_name = item['academy']
-            
-            # Map academy name if a known variation exists
-            if academy_name in academy_name_mapping:
-                academy_name = academy_name_mapping[academy_name]
-            
-            try:
-                # First try to find the academy by exact name
-                academy = Academy.objects.get(name=academy_name)
-            except Academy.DoesNotExist:                # If exact match fails, try a case-insensitive search with partial match
-                academies = Academy.objects.filter(name__icontains=academy_name)
-                if academies.exists():
-                    academy = academies.first()
-                else:
-                    self.stdout.write(self.style.WARNING(f"Academy not found for category: {item['name']} (Academy: {academy_name})"))
-                    skipped_count += 1
-                    continue
-            
-            category, created = Category.objects.update_or_create(
-                name=item['name'],
-                academy=academy,
-                defaults={}
-            )
-            
-            if created:
-                created_count += 1
+            academy = self.cache.academy(item['academy'])
+            if academy is None:
+                self.stdout.write(self.style.WARNING(f"Academy not found for category: {item['name']} (Academy: {item['academy']})"))
+                skipped_count += 1
+                continue
+
+            categories = self.cache.categories.setdefault(academy.pk, {})
+            if item['name'] in categories:
+                existing_count += 1
             else:
-                updated_count += 1
-                
-        self.stdout.write(f'Created {created_count} categories, updated {updated_count} categories, skipped {skipped_count} categories')
-        
+                categories[item['name']] = Category(name=item['name'], academy=academy)
+                created.append(categories[item['name']])
+
+        Category.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        self.stdout.write(f'Created {len(created)} categories, {existing_count} existing, skipped {skipped_count} categories')
+
     def import_teachers(self, teachers_data):
         """Import teachers from the JSON data."""
         self.stdout.write('Importing teachers...')
-        created_count = 0
-        updated_count = 0
-        
+        created = []
+        updated = {}
+        unchanged_count = 0
+
+        # A teacher listed twice gets the data of the last entry
+        teacher_values = {}
         for teacher_data in teachers_data:
             teacher_name = teacher_data.get('name', '').strip()
-            if not teacher_name:
-                continue
-                
-            teacher, created = Teacher.objects.update_or_create(
-                name=teacher_name,
-                defaults={
+            if teacher_name:
+                teacher_values[teacher_name] = {
                     'profile_url': teacher_data.get('link', ''),
                     'photo_url': teacher_data.get('photo_url', ''),
                     'description': teacher_data.get('description', ''),
                 }
-            )
-            
-            if created:
-                created_count += 1
+
+        for teacher_name, values in teacher_values.items():
+            teacher = self.cache.teachers.get(teacher_name)
+            if teacher is None:
+                teacher = self.cache.teachers[teacher_name] = Teacher(name=teacher_name, **values)
+                created.append(teacher)
+            elif assign(teacher, values):
+                updated[teacher_name] = teacher
             else:
-                updated_count += 1
-                
-        self.stdout.write(f'Created {created_count} teachers, updated {updated_count} teachers')
-        
+                unchanged_count += 1
+
+        Teacher.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        bulk_update(Teacher, updated.values(), ['profile_url', 'photo_url', 'description'])
+        self.stdout.write(f'Created {len(created)} teachers, updated {len(updated)} teachers, {unchanged_count} unchanged')
+
     def import_offerings(self, offerings_data):
-        """Import offerings from the JSON data."""
+        """
+        Import offerings from the JSON data, writing them in batches
+
+        An offering whose fingerprint (of its JSON data, academy and matched
+        categories) equals the one stored at the previous import is left
+        untouched, variations included.
+        """
         self.stdout.write('Importing offerings...')
-        created_count = 0
-        updated_count = 0
-        skipped_count = 0
-        variation_count = 0
-        
-        # Create a mapping for academy name variations
-        academy_name_mapping = {
-            'Gandaius Academy': 'Gandaius Permanente Vorming',
-            'Beta Academy': 'Science Academy',
-            'Ghall': 'The GHALL',
-            'ACVetMed': 'Academie voor Diergeneeskunde',
-            'ALLPHA': 'Academy for Lifelong Learning in Pharmacy',
-            'APSS': 'Academy for Political and Social Sciences',
+        self.offerings = {
+            offering.url: offering
+            for offering in Offering.objects.only('id', 'url', 'category_id', 'is_active', 'import_fingerprint', 'drupal_product_id')
         }
-        
-        # Process each offering
+        self.seen_urls = set()
+        self.counts = dict.fromkeys(['created', 'updated', 'unchanged', 'skipped', 'variations'], 0)
+        self.start_batch()
+
         for item in offerings_data:
-            if not item or 'title' not in item or 'academy' not in item:
-                skipped_count += 1
-                continue
-                
-            academy_name = item['academy']
-            
-            # Map academy name if a known variation exists
-            if academy_name in academy_name_mapping:
-                academy_name = academy_name_mapping[academy_name]
-                
-            try:
-                # First try to find the academy by exact name
-                academy = Academy.objects.get(name=academy_name)
-            except Academy.DoesNotExist:
-                # If exact match fails, try a case-insensitive search with partial match
-                academies = Academy.objects.filter(name__icontains=academy_name)
-                if academies.exists():
-                    academy = academies.first()
-                else:
-                    self.stdout.write(self.style.WARNING(f"Academy not found for offering: {item['title']} (Academy: {academy_name})"))
-                    skipped_count += 1
-                    continue
-              # Process language
-            language = None
-            if 'language' in item and item['language']:
-                language_names = item['language'].split('\n')
-                for lang_name in language_names:
-                    lang_name = lang_name.strip()
-                    if lang_name:
-                        language, _ = Language.objects.get_or_create(name=lang_name)
-                        break  # Just use the first language for now
-            
-            # Find or create the offering
-            defaults = {
-                'title': item['title'],
-                'academy': academy,
-                'description': item.get('description', ''),  # Preserve HTML content
-                'program_content': item.get('program', ''),  # Preserve HTML content
-                'remarks': item.get('remarks', ''),  # Preserve HTML content
-                'course_id': item.get('course_id', ''),
-                'language': language,
-                'image_url': item.get('image_url', ''),
-                'is_active': True
-            }
-            
-            offering, created = Offering.objects.update_or_create(
-                url=item['link'],
-                defaults=defaults
-            )
-            
-            if created:
-                created_count += 1
+            self.import_offering(item)
+            if self.batch_items >= BATCH_SIZE:
+                self.flush_offerings()
+        self.flush_offerings()
+
+        # Offerings imported from a Drupal extract are not in the scraped data
+        missing = [
+            offering.pk for url, offering in self.offerings.items()
+            if url not in self.seen_urls and offering.is_active and offering.drupal_product_id is None
+        ]
+        if self.deactivate_missing:
+            for start in range(0, len(missing), BATCH_SIZE):
+                Offering.objects.filter(pk__in=missing[start:start + BATCH_SIZE]).update(is_active=False, updated_at=timezone.now())
+
+        counts = self.counts
+        self.stdout.write(f"Created {counts['created']} offerings, updated {counts['updated']} offerings, "
+                          f"{counts['unchanged']} unchanged, skipped {counts['skipped']} offerings")
+        removed = f'{len(missing)} active offerings are no longer in the file'
+        if self.deactivate_missing:
+            self.stdout.write(f'{removed}; deactivated them')
+        elif missing:
+            self.stdout.write(f'{removed}; use --deactivate-missing to deactivate them')
+        self.stdout.write(f"Created {counts['variations']} variations")
+
+    def start_batch(self):
+        self.batch_items = 0
+        self.new_offerings = []
+        self.changed_offerings = {}
+        self.category_links = []
+        # Offering URL -> (offering, variations replacing its current ones)
+        self.new_variations = {}
+
+    def import_offering(self, item):
+        """Queue the changes for one offering of the JSON data."""
+        if item and 'link' in item:
+            self.seen_urls.add(item['link'])
+        if not item or 'title' not in item or 'academy' not in item:
+            self.counts['skipped'] += 1
+            return
+
+        academy = self.cache.academy(item['academy'])
+        if academy is None:
+            self.stdout.write(self.style.WARNING(f"Academy not found for offering: {item['title']} (Academy: {item['academy']})"))
+            self.counts['skipped'] += 1
+            return
+
+        categories = []
+        for full_category_name in item.get('categories') or []:
+            # Format in JSON is typically "Academy Name - Category Name"
+            if ' - ' in full_category_name:
+                category_name = full_category_name.split(' - ')[1].strip()
             else:
-                updated_count += 1
-                
-            # Create categories for this offering if they exist
-            if 'categories' in item and item['categories']:
-                for full_category_name in item['categories']:
-                    # Format in JSON is typically "Academy Name - Category Name"
-                    # Try to extract just the category name
-                    if ' - ' in full_category_name:
-                        category_name = full_category_name.split(' - ')[1].strip()
-                    else:
-                        category_name = full_category_name.strip()
-                        
-                    # Try to find the category by name for this academy
-                    matching_categories = Category.objects.filter(
-                        name__icontains=category_name, 
-                        academy=academy
-                    )
-                    
-                    if matching_categories.exists():
-                        # Use the first matching category
-                        category = matching_categories.first()
-                        # Add to the new many-to-many relationship
-                        offering.categories.add(category)
-                        # Also set the old single category field for the first category only
-                        if offering.category is None:
-                            offering.category = category
-                            offering.save()
-                    else:
-                        # If category doesn't exist yet, create it
-                        category = Category.objects.create(
-                            name=category_name,
-                            academy=academy
-                        )
-                        # Add to the new many-to-many relationship
-                        offering.categories.add(category)
-                        # Also set the old single category field for the first category only
-                        if offering.category is None:
-                            offering.category = category
-                            offering.save()
-
-            # Process variations for this offering
-            if 'variations' in item and item['variations']:
-                variation_count += self.import_variations(offering, item['variations'])
-                        
-        self.stdout.write(f'Created {created_count} offerings, updated {updated_count} offerings, skipped {skipped_count} offerings')
-        self.stdout.write(f'Created {variation_count} variations')
-
-    def import_variations(self, offering, variations_data):
-        """Import variations for an offering."""
-        count = 0
-        
-        # Clear existing variations for this offering to avoid duplicates
-        Variation.objects.filter(offering=offering).delete()
-        
-        for variation_data in variations_data:
-            # Process location
-            location = None
-            if 'location' in variation_data and variation_data['location'] and 'name' in variation_data['location']:
-                location_name = variation_data['location']['name']
-                location_url = variation_data['location'].get('link', '')
-                location, _ = Location.objects.get_or_create(
-                    name=location_name,
-                    defaults={'url': location_url}
-                )
-            
-            # Process dates
-            lesson_dates = ''
-            start_date = None
-            end_date = None
-            
-            if 'dates' in variation_data and variation_data['dates']:
-                # Join all dates into a single string
-                lesson_dates = ', '.join(variation_data['dates'])
-                
-                # Try to parse the first date range
-                for date_str in variation_data['dates']:
-                    # Common format: "16/09/2025 - 09:00 – 30/06/2026 - 16:00"
-                    date_pattern = r'(\d{1,2}/\d{1,2}/\d{4})'
-                    dates = re.findall(date_pattern, date_str)
-                    
-                    if dates:
-                        try:
-                            # Parse the start date (first date found)
-                            start_date = datetime.strptime(dates[0], '%d/%m/%Y')
-                            start_date = timezone.make_aware(start_date)
-                            
-                            # Parse the end date if available (last date found)
-                            if len(dates) > 1:
-                                end_date = datetime.strptime(dates[-1], '%d/%m/%Y')
-                                end_date = timezone.make_aware(end_date)
-                            break  # Successfully parsed a date, no need to try other strings
-                        except ValueError:
-                            # If parsing fails, continue with the next date string
-                            continue
-              # Create the variation
-            variation = Variation.objects.create(
-                offering=offering,
-                title=variation_data.get('title', ''),
-                price=variation_data.get('price', ''),
-                lesson_dates=lesson_dates,
-                start_date=start_date,
-                end_date=end_date,
-                location=location,
-                description=variation_data.get('description', ''),  # Preserve HTML content
-                is_available=True
+                category_name = full_category_name.strip()
+            categories.append(self.cache.category(academy, category_name))
+
+        item_fingerprint = fingerprint(item, academy.pk, [category.pk for category in categories])
+        offering = self.offerings.get(item['link'])
+        if offering is not None and offering.import_fingerprint == item_fingerprint and offering.is_active and not self.full:
+            self.counts['unchanged'] += 1
+            return
+        self.batch_items += 1
+
+        # Just use the first language for now
+        language = None
+        if item.get('language'):
+            language_names = [name.strip() for name in item['language'].split('\n')]
+            language_name = next((name for name in language_names if name), None)
+            if language_name:
+                language = self.cache.language(language_name)
+
+        if offering is None:
+            offering = self.offerings[item['link']] = Offering(url=item['link'])
+            self.new_offerings.append(offering)
+            self.counts['created'] += 1
+        else:
+            if offering.pk is not None:
+                self.changed_offerings[offering.url] = offering
+            self.counts['updated'] += 1
+
+        offering.title = item['title']
+        offering.academy = academy
+        offering.description = item.get('description', '')  # Preserve HTML content
+        offering.program_content = item.get('program', '')  # Preserve HTML content
+        offering.remarks = item.get('remarks', '')  # Preserve HTML content
+        offering.course_id = item.get('course_id', '')
+        offering.language = language
+        offering.image_url = item.get('image_url', '')
+        offering.is_active = True
+        offering.import_fingerprint = item_fingerprint
+
+        for category in categories:
+            self.category_links.append((offering, category))
+            # Also set the old single category field for the first category only
+            if offering.category_id is None:
+                offering.category = category
+
+        if item.get('variations'):
+            self.new_variations[offering.url] = (offering, item['variations'])
+
+    def flush_offerings(self):
+        """Write the queued offerings, category links and variations."""
+        Offering.objects.bulk_create(self.new_offerings, batch_size=BATCH_SIZE)
+        bulk_update(Offering, self.changed_offerings.values(), OFFERING_FIELDS)
+
+        # Categories are only ever added to an offering
+        CategoryLink = Offering.categories.through
+        CategoryLink.objects.bulk_create(
+            [CategoryLink(offering_id=offering.pk, category_id=category.pk) for offering, category in self.category_links],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+        self.import_variations(self.new_variations.values())
+
+        # Keep only what later lookups of these URLs need, not the imported texts
+        for offering in self.new_offerings + list(self.changed_offerings.values()):
+            self.offerings[offering.url] = Offering(
+                pk=offering.pk,
+                url=offering.url,
+                category_id=offering.category_id,
+                import_fingerprint=offering.import_fingerprint,
             )
-            count += 1
-            
-            # Process teachers
-            if 'teachers' in variation_data and variation_data['teachers']:
-                for teacher_data in variation_data['teachers']:
+        # With DEBUG on, Django keeps the SQL of the last 9000 queries
+        reset_queries()
+        self.start_batch()
+
+    def import_variations(self, offerings_variations):
+        """
+        Replace the variations of offerings
+
+        Args:
+            offerings_variations: Iterable of (offering, list of variation data)
+        """
+        offerings_variations = list(offerings_variations)
+        if not offerings_variations:
+            return
+        # Clear existing variations of these offerings to avoid duplicates
+        Variation.objects.filter(offering__in=[offering.pk for offering, _ in offerings_variations]).delete()
+
+        variations = []
+        teachers = []
+        for offering, variations_data in offerings_variations:
+            for variation_data in variations_data:
+                location = None
+                if variation_data.get('location') and 'name' in variation_data['location']:
+                    location = self.cache.location(variation_data['location']['name'], variation_data['location'].get('link', ''))
+
+                lesson_dates, start_date, end_date = '', None, None
+                if variation_data.get('dates'):
+                    lesson_dates, start_date, end_date = parse_variation_dates(variation_data['dates'])
+
+                variations.append(Variation(
+                    offering=offering,
+                    title=variation_data.get('title', ''),
+                    price=variation_data.get('price', ''),
+                    lesson_dates=lesson_dates,
+                    start_date=start_date,
+                    end_date=end_date,
+                    location=location,
+                    description=variation_data.get('description', ''),  # Preserve HTML content
+                    registration_url=variation_data.get('registration_url') or '',
+                    is_available=True
+                ))
+
+                # A teacher is linked to a variation only once
+                variation_teachers = {}
+                for teacher_data in variation_data.get('teachers') or []:
                     if 'name' in teacher_data:
-                        teacher_name = teacher_data['name']
-                        teacher_url = teacher_data.get('link', '')
-                        
-                        teacher, _ = Teacher.objects.get_or_create(
-                            name=teacher_name,
-                            defaults={'profile_url': teacher_url}
-                        )
-                        
-                        # Create the teacher-variation relationship
-                        VariationTeacher.objects.create(
-                            variation=variation,
-                            teacher=teacher
-                        )
-            
-            # Add registration URL if available
-            if 'registration_url' in variation_data and variation_data['registration_url']:
-                variation.registration_url = variation_data['registration_url']
-                variation.save()
-        
-        return count
+                        teacher = self.cache.teacher(teacher_data['name'], teacher_data.get('link', ''))
+                        variation_teachers.setdefault(teacher.pk, teacher)
+                teachers.append(variation_teachers.values())
+
+        Variation.objects.bulk_create(variations, batch_size=BATCH_SIZE)
+        VariationTeacher.objects.bulk_create(
+            [VariationTeacher(variation=variation, teacher=teacher)
+             for variation, variation_teachers in zip(variations, teachers)
+             for teacher in variation_teachers],
+            batch_size=BATCH_SIZE,
+        )
+        self.counts['variations'] += len(variations)
@@ -0,0 +1,509 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+from django.utils import timezone
+from academies.importing import BATCH_SIZE, ImportCache, QueryCounter, assign, bulk_update, fingerprint
+from academies.json_stream import is_delta, read_delta, read_records
+from academies.models import Enrollment, Offering, Order, Teacher, Variation, VariationTeacher
+
+# Fields set from the extract; other fields keep what was entered in the admin
+COURSE_FIELDS = ['title', 'description', 'program_content', 'image_url', 'is_active', 'category', 'import_fingerprint']
+LESSON_FIELDS = ['offering', 'title', 'lesson_dates', 'start_date', 'end_date', 'location', 'is_available']
+ORDER_FIELDS = ['order_number', 'state', 'mail', 'customer_name', 'customer_mail', 'total_price', 'currency', 'import_fingerprint']
+
+LESSON_DATES_LENGTH = Variation._meta.get_field('lesson_dates').max_length
+
+
+def is_published(status):
+    return status in (1, '1', True)
+
+
+def to_decimal(value):
+    """Decimal of a price or quantity from the extract, or None."""
+    if value is None or value == '':
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return None
+
+
+def file_url(site_url, uri):
+    """URL of a Drupal file URI such as public://images/course.jpg, or '' for none."""
+    if not uri:
+        return ''
+    if uri.startswith('public://'):
+        return f"{site_url}/sites/default/files/{uri[len('public://'):]}"
+    if uri.startswith(('http://', 'https://')):
+        return uri
+    return ''
+
+
+def parse_drupal_date(value):
+    """Aware datetime of a Drupal date field value, e.g. '2025-01-01T09:00:00' (stored in UTC), or None."""
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if timezone.is_naive(moment):
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment
+
+
+def parse_lesson_dates(dates):
+    """
+    Parse the dates of a lesson
+
+    Args:
+        dates: List of {"start": ..., "end": ...} from the extract
+
+    Returns:
+        Tuple of (dates as text in the format the websites use, first start, last end)
+    """
+    texts = []
+    starts = []
+    ends = []
+    for date in dates or ():
+        start = parse_drupal_date(date.get('start'))
+        end = parse_drupal_date(date.get('end'))
+        if start is None:
+            continue
+        starts.append(start)
+        text = timezone.localtime(start).strftime('%d/%m/%Y - %H:%M')
+        if end is not None:
+            ends.append(end)
+            text += timezone.localtime(end).strftime(' – %d/%m/%Y - %H:%M')
+        texts.append(text)
+    lesson_dates = ', '.join(texts)
+    if len(lesson_dates) > LESSON_DATES_LENGTH:
+        lesson_dates = lesson_dates[:LESSON_DATES_LENGTH - 1] + '…'
+    return lesson_dates, min(starts, default=None), max(ends or starts, default=None)
+
+
+class Command(BaseCommand):
+    help = 'Import courses, lessons, orders and teachers from the output of extract_data.py'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'extract_file',
+            type=str,
+            help='Output of extract_data.py: JSON, NDJSON or a --since delta (.gz for gzip)'
+        )
+        parser.add_argument(
+            '--academy',
+            required=True,
+            help="Name of the academy whose Drupal shop the SQL dump was taken from"
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rewrite every course and order, also those unchanged since the last import'
+        )
+
+    def handle(self, *args, **options):
+        extract_file = options['extract_file']
+        self.full = options['full']
+
+        try:
+            delta = is_delta(extract_file)
+        except FileNotFoundError:
+            raise CommandError(f'File not found: {extract_file}')
+
+        # Courses become offerings with their lessons as variations, orders
+        # and their items become orders and enrollments. The attendees of a
+        # lesson are the enrollments of the orders, so they are not imported
+        # separately.
+        with QueryCounter() as counter, transaction.atomic():
+            self.cache = ImportCache()
+            self.academy = self.cache.academy(options['academy'])
+            if self.academy is None:
+                raise CommandError(f"Academy not found: {options['academy']}")
+            self.load_maps()
+            self.counts = defaultdict(int)
+            self.changed_teachers = {}
+            self.start_batch()
+
+            try:
+                if delta:
+                    self.stdout.write(f'Importing changes from {extract_file}...')
+                    self.import_delta(read_delta(extract_file))
+                else:
+                    self.stdout.write(f'Importing {extract_file}...')
+                    self.import_extract(read_records(extract_file, {'courses', 'orders', 'teachers'}))
+            except json.JSONDecodeError as e:
+                raise CommandError(f'Invalid JSON: {e}')
+            self.flush()
+            if not delta:
+                self.remove_missing()
+            bulk_update(Teacher, self.changed_teachers.values(), ['photo_url', 'drupal_user_id'])
+
+        counts = self.counts
+        self.stdout.write(f"Courses: created {counts['courses_created']}, updated {counts['courses_updated']}, "
+                          f"{counts['courses_unchanged']} unchanged, deactivated {counts['courses_removed']}")
+        self.stdout.write(f"Lessons: created {counts['lessons_created']}, updated {counts['lessons_updated']}, "
+                          f"deleted {counts['lessons_removed']}, skipped {counts['lessons_skipped']}")
+        self.stdout.write(f"Orders: created {counts['orders_created']}, updated {counts['orders_updated']}, "
+                          f"{counts['orders_unchanged']} unchanged, deleted {counts['orders_removed']}; "
+                          f"{counts['enrollments']} enrollments written")
+        self.stdout.write(f"Teachers: updated {len(self.changed_teachers)}")
+        if self.unmatched_users:
+            # Link them by entering the user id as a teacher's Drupal user id in the admin
+            self.stdout.write(self.style.WARNING(
+                f"{len(self.unmatched_users)} Drupal users match no teacher and were not linked to their lessons:"
+            ))
+            for user_id, name in self.unmatched_users.items():
+                self.stdout.write(f"  user {user_id}: {name}")
+        self.stdout.write(self.style.SUCCESS(f'Extract imported successfully ({counter})'))
+
+    def load_maps(self):
+        """Load the ids of what earlier imports created for this academy, keyed by Drupal id."""
+        # Drupal paths start at the root of the site, not at the academy's base URL
+        parts = urlsplit(self.academy.base_url)
+        self.site_url = f'{parts.scheme}://{parts.netloc}'
+        # Drupal product id -> (offering id, fingerprint, active)
+        self.offerings = {
+            product_id: (pk, import_fingerprint, is_active)
+            for pk, product_id, import_fingerprint, is_active in Offering.objects.filter(
+                academy=self.academy, drupal_product_id__isnull=False
+            ).values_list('pk', 'drupal_product_id', 'import_fingerprint', 'is_active')
+        }
+        # Drupal variation id -> (variation id, offering id)
+        self.variations = {
+            variation_id: (pk, offering_id)
+            for pk, variation_id, offering_id in Variation.objects.filter(
+                offering__academy=self.academy, drupal_variation_id__isnull=False
+            ).values_list('pk', 'drupal_variation_id', 'offering_id')
+        }
+        # Drupal order id -> (order id, fingerprint)
+        self.orders = {
+            order_id: (pk, import_fingerprint)
+            for pk, order_id, import_fingerprint in Order.objects.filter(
+                academy=self.academy
+            ).values_list('pk', 'drupal_order_id', 'import_fingerprint')
+        }
+        # Drupal user id -> teacher
+        self.user_teachers = {
+            teacher.drupal_user_id: teacher
+            for teacher in self.cache.teachers.values() if teacher.drupal_user_id is not None
+        }
+        self.unmatched_users = {}
+        self.seen_courses = set()
+        self.seen_lessons = set()
+        self.seen_orders = set()
+
+    def start_batch(self):
+        self.batch_size = 0
+        self.new_offerings = []
+        self.changed_offerings = []
+        self.category_links = []
+        # (offering or the Drupal product id of a course from a delta, lesson, teachers)
+        self.lessons = []
+        self.new_orders = []
+        self.changed_orders = []
+        self.order_items = []
+
+    def import_extract(self, records):
+        """Queue the courses, orders and teachers of a complete extract."""
+        for section, record in records:
+            if section == 'courses':
+                self.queue_course(record, record.get('lessons') or [])
+            elif section == 'orders':
+                self.queue_order(record)
+            elif section == 'teachers':
+                self.import_teacher(record)
+            if self.batch_size >= BATCH_SIZE:
+                self.flush()
+
+    def import_delta(self, changes):
+        """Queue the changes of a delta written by extract_data.py --since."""
+        removed = defaultdict(list)
+        for kind, change, entity in changes:
+            if change == 'removed':
+                removed[kind].append(entity)
+            elif kind == 'courses':
+                self.queue_course(entity, None)
+            elif kind == 'lessons':
+                self.lessons.append((entity['course_id'], entity, self.lesson_teachers(entity)))
+                self.batch_size += 1
+            elif kind == 'orders':
+                self.queue_order(entity)
+            if self.batch_size >= BATCH_SIZE:
+                self.flush()
+        self.flush()
+
+        self.deactivate_courses(removed['courses'])
+        self.delete_lessons(removed['lessons'])
+        self.delete_orders(removed['orders'])
+
+    def queue_course(self, course, lessons):
+        """
+        Queue a course for writing as an offering
+
+        Args:
+            course: Course record from the extract
+            lessons: Its complete list of lessons, or None to leave its
+                variations alone (a course from a delta)
+        """
+        product_id = course['id']
+        self.seen_courses.add(product_id)
+        self.seen_lessons.update(lesson['id'] for lesson in lessons or ())
+        known = self.offerings.get(product_id)
+
+        course_fingerprint = ''
+        if lessons is not None:
+            lesson_teachers = [self.lesson_teachers(lesson) for lesson in lessons]
+            # Attendees change with every order; they are imported as enrollments.
+            # The teachers are part of it, so a user matched since is linked.
+            course_fingerprint = fingerprint(
+                {**course, 'lessons': [{k: v for k, v in lesson.items() if k != 'attendees'} for lesson in lessons]},
+                self.academy.pk,
+                [[teacher.pk for teacher in teachers] for teachers in lesson_teachers],
+            )
+            if known and known[1] == course_fingerprint and not self.full:
+                self.counts['courses_unchanged'] += 1
+                return
+
+        offering = Offering(
+            pk=known[0] if known else None,
+            url=f'{self.site_url}/product/{product_id}',
+            drupal_product_id=product_id,
+            academy=self.academy,
+            title=course.get('title') or '',
+            description=course.get('description') or '',
+            program_content=course.get('program') or '',
+            image_url=file_url(self.site_url, course.get('image')),
+            is_active=is_published(course.get('status')),
+            import_fingerprint=course_fingerprint,
+        )
+        category_name = course.get('category')
+        if isinstance(category_name, str) and category_name.strip():
+            offering.category = self.cache.category_named(self.academy, category_name.strip())
+            self.category_links.append((offering, offering.category))
+
+        if known:
+            self.changed_offerings.append(offering)
+            self.counts['courses_updated'] += 1
+        else:
+            if course.get('created'):
+                offering.created_at = datetime.fromtimestamp(int(course['created']), tz=dt_timezone.utc)
+            self.new_offerings.append(offering)
+            self.counts['courses_created'] += 1
+        self.batch_size += 1
+
+        if lessons is not None:
+            self.lessons.extend((offering, lesson, teachers) for lesson, teachers in zip(lessons, lesson_teachers))
+            self.batch_size += len(lessons)
+
+    def queue_order(self, order):
+        """Queue an order and its items for writing as an order with enrollments."""
+        order_id = order['id']
+        self.seen_orders.add(order_id)
+        known = self.orders.get(order_id)
+        order_fingerprint = fingerprint(order)
+        if known and known[1] == order_fingerprint and not self.full:
+            self.counts['orders_unchanged'] += 1
+            return
+
+        owner = order.get('owner') or {}
+        instance = Order(
+            pk=known[0] if known else None,
+            academy=self.academy,
+            drupal_order_id=order_id,
+            order_number=str(order.get('order_number') or ''),
+            state=order.get('state') or '',
+            mail=order.get('mail') or '',
+            customer_name=owner.get('name') or '',
+            customer_mail=owner.get('mail') or '',
+            total_price=to_decimal(order.get('total_price')),
+            currency=order.get('currency') or '',
+            import_fingerprint=order_fingerprint,
+        )
+        if known:
+            self.changed_orders.append(instance)
+            self.counts['orders_updated'] += 1
+        else:
+            self.new_orders.append(instance)
+            self.counts['orders_created'] += 1
+        self.order_items.append((instance, order.get('items') or []))
+        self.batch_size += 1 + len(order.get('items') or [])
+
+    def teacher(self, user):
+        """
+        Find the teacher a Drupal user is
+
+        A user is matched on Teacher.drupal_user_id, which can be set in the
+        admin, and otherwise on the exact name of a teacher that is not linked
+        to another user yet; the match is then stored in drupal_user_id. Drupal
+        user names are mostly e-mail addresses, which are never matched or
+        used as a teacher's name.
+
+        Returns:
+            The teacher, or None; users that match no teacher are remembered
+            for the report and not created
+        """
+        user_id = user.get('id')
+        teacher = self.user_teachers.get(user_id)
+        if teacher is not None:
+            return teacher
+
+        name = (user.get('name') or '').strip()
+        teacher = self.cache.teachers.get(name) if name and '@' not in name else None
+        if teacher is None or teacher.drupal_user_id is not None or user_id is None:
+            self.unmatched_users[user_id] = name
+            return None
+        teacher.drupal_user_id = user_id
+        self.user_teachers[user_id] = teacher
+        self.changed_teachers[teacher.pk] = teacher
+        return teacher
+
+    def lesson_teachers(self, lesson):
+        """The teachers of a lesson's users that match one, each once."""
+        teachers = {}
+        for user in lesson.get('teachers') or []:
+            teacher = self.teacher(user)
+            if teacher is not None:
+                teachers.setdefault(teacher.pk, teacher)
+        return list(teachers.values())
+
+    def import_teacher(self, user):
+        """Update the photo of a teacher from the user's picture."""
+        teacher = self.teacher(user)
+        photo_url = file_url(self.site_url, user.get('picture'))
+        if teacher is not None and photo_url and assign(teacher, {'photo_url': photo_url}):
+            self.changed_teachers[teacher.pk] = teacher
+
+    def flush(self):
+        """Write the queued offerings, variations and orders."""
+        Offering.objects.bulk_create(self.new_offerings, batch_size=BATCH_SIZE)
+        bulk_update(Offering, self.changed_offerings, COURSE_FIELDS)
+        for offering in self.new_offerings + self.changed_offerings:
+            self.offerings[offering.drupal_product_id] = (offering.pk, offering.import_fingerprint, offering.is_active)
+
+        CategoryLink = Offering.categories.through
+        CategoryLink.objects.bulk_create(
+            [CategoryLink(offering_id=offering.pk, category_id=category.pk) for offering, category in self.category_links],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+        self.write_lessons()
+        self.write_orders()
+        # With DEBUG on, Django keeps the SQL of the last 9000 queries
+        reset_queries()
+        self.start_batch()
+
+    def write_lessons(self):
+        """Create or update the queued lessons as variations, with their teachers."""
+        new = []
+        changed = []
+        teachers = []
+        for offering, lesson, lesson_teachers in self.lessons:
+            if not isinstance(offering, Offering):
+                # A lesson from a delta refers to its course by Drupal id
+                offering_id = self.offerings.get(offering, (None,))[0]
+            else:
+                offering_id = offering.pk
+            if offering_id is None:
+                self.counts['lessons_skipped'] += 1
+                continue
+
+            variation_id = lesson['id']
+            known = self.variations.get(variation_id)
+            lesson_dates, start_date, end_date = parse_lesson_dates(lesson.get('dates'))
+            location = lesson.get('location')
+            variation = Variation(
+                pk=known[0] if known else None,
+                offering_id=offering_id,
+                drupal_variation_id=variation_id,
+                title=lesson.get('title') or '',
+                lesson_dates=lesson_dates,
+                start_date=start_date,
+                end_date=end_date,
+                location=self.cache.location(location.strip()) if isinstance(location, str) and location.strip() else None,
+                is_available=is_published(lesson.get('status')),
+            )
+            if known:
+                changed.append(variation)
+                self.counts['lessons_updated'] += 1
+            else:
+                new.append(variation)
+                self.counts['lessons_created'] += 1
+            teachers.append((variation, lesson_teachers))
+
+        Variation.objects.bulk_create(new, batch_size=BATCH_SIZE)
+        bulk_update(Variation, changed, LESSON_FIELDS)
+        for variation in new + changed:
+            self.variations[variation.drupal_variation_id] = (variation.pk, variation.offering_id)
+
+        changed_ids = [variation.pk for variation in changed]
+        for start in range(0, len(changed_ids), BATCH_SIZE):
+            VariationTeacher.objects.filter(variation__in=changed_ids[start:start + BATCH_SIZE]).delete()
+        VariationTeacher.objects.bulk_create(
+            [VariationTeacher(variation=variation, teacher=teacher)
+             for variation, variation_teachers in teachers
+             for teacher in variation_teachers],
+            batch_size=BATCH_SIZE,
+        )
+
+    def write_orders(self):
+        """Create or update the queued orders and replace their enrollments."""
+        Order.objects.bulk_create(self.new_orders, batch_size=BATCH_SIZE)
+        bulk_update(Order, self.changed_orders, ORDER_FIELDS)
+        for order in self.new_orders + self.changed_orders:
+            self.orders[order.drupal_order_id] = (order.pk, order.import_fingerprint)
+
+        changed_ids = [order.pk for order in self.changed_orders]
+        for start in range(0, len(changed_ids), BATCH_SIZE):
+            Enrollment.objects.filter(order__in=changed_ids[start:start + BATCH_SIZE]).delete()
+
+        enrollments = []
+        for order, items in self.order_items:
+            for item in items:
+                quantity = to_decimal(item.get('quantity'))
+                enrollments.append(Enrollment(
+                    order=order,
+                    variation_id=self.variations.get(item.get('product_variation_id'), (None,))[0],
+                    drupal_order_item_id=item['id'],
+                    title=item.get('product_title') or '',
+                    quantity=quantity if quantity is not None else 1,
+                    unit_price=to_decimal(item.get('unit_price')),
+                    total_price=to_decimal(item.get('total_price')),
+                ))
+        Enrollment.objects.bulk_create(enrollments, batch_size=BATCH_SIZE)
+        self.counts['enrollments'] += len(enrollments)
+
+    def remove_missing(self):
+        """Deactivate courses and delete lessons and orders that are no longer in a complete extract."""
+        self.deactivate_courses(
+            product_id for product_id, (_, _, is_active) in self.offerings.items()
+            if product_id not in self.seen_courses and is_active
+        )
+        self.delete_lessons([variation_id for variation_id in self.variations if variation_id not in self.seen_lessons])
+        self.delete_orders(order_id for order_id in self.orders if order_id not in self.seen_orders)
+
+    def deactivate_courses(self, product_ids):
+        pks = [self.offerings[product_id][0] for product_id in product_ids if product_id in self.offerings]
+        for start in range(0, len(pks), BATCH_SIZE):
+            # Clear the fingerprint so the course is written again if it returns
+            Offering.objects.filter(pk__in=pks[start:start + BATCH_SIZE]).update(
+                is_active=False, import_fingerprint='', updated_at=timezone.now()
+            )
+        self.counts['courses_removed'] += len(pks)
+
+    def delete_lessons(self, variation_ids):
+        pks = [self.variations.pop(variation_id)[0] for variation_id in list(variation_ids) if variation_id in self.variations]
+        for start in range(0, len(pks), BATCH_SIZE):
+            Variation.objects.filter(pk__in=pks[start:start + BATCH_SIZE]).delete()
+        self.counts['lessons_removed'] += len(pks)
+
+    def delete_orders(self, order_ids):
+        pks = [self.orders.pop(order_id)[0] for order_id in list(order_ids) if order_id in self.orders]
+        for start in range(0, len(pks), BATCH_SIZE):
+            Order.objects.filter(pk__in=pks[start:start + BATCH_SIZE]).delete()
+        self.counts['orders_removed'] += len(pks)
@@ -3,6 +3,7 @@ import re
 from datetime import datetime
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from academies.json_stream import read_records, read_sections
 from academies.models import (
     Academy, Category, Language, Location, Teacher, 
     Offering, Variation, VariationTeacher, Link
@@ -41,8 +42,8 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('Data cleared'))
 
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Offerings are streamed from the file in a second pass
+            data = read_sections(json_file, ['academies'])
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR(f'File not found: {json_file}'))
             return
@@ -53,7 +54,7 @@ class Command(BaseCommand):
         # Load academies
         self.stdout.write('Loading academies...')
         academy_objects = {}
-        for academy_data in data.get('academies', []):
+        for academy_data in data['academies']:
             academy, created = Academy.objects.get_or_create(
                 name=academy_data['name'],
                 defaults={
@@ -76,7 +77,7 @@ class Command(BaseCommand):
 
         # Load offerings
         self.stdout.write('Loading offerings...')
-        for offering_data in data.get('offerings', []):
+        for _, offering_data in read_records(json_file, {'offerings'}):
             if not offering_data.get('url') or not offering_data.get('title'):
                 continue
                 
@@ -1,7 +1,8 @@
 import json
 from django.core.management.base import BaseCommand
+from academies.importing import CategoryIndex
+from academies.json_stream import read_records
 from academies.models import Offering, Category
-from django.db.models import Q
 
 class Command(BaseCommand):
     help = 'Migrate existing category data to the new categories M2M relationship'
@@ -47,8 +48,7 @@ class Command(BaseCommand):
         """Import multiple categories from the JSON file."""
         self.stdout.write(f'Importing multiple categories from {json_file}...')
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            updated_count = self.import_offering_categories(read_records(json_file, {'offerings'}))
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR(f'File not found: {json_file}'))
             return
@@ -56,9 +56,26 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'Invalid JSON: {e}'))
             return
         
-        # Process offerings in the JSON file
+        self.stdout.write(f'Updated {updated_count} offerings with categories from JSON')
+
+    def import_offering_categories(self, offerings):
+        """
+        Add the categories of offerings streamed from the JSON file
+
+        Args:
+            offerings: Iterable of (section, offering data) from read_records
+
+        Returns:
+            Number of categories added
+        """
+        # Academy id -> index of its categories, to match names without queries
+        categories = {}
+        for category in Category.objects.all():
+            categories.setdefault(category.academy_id, {})[category.name] = category
+        indexes = {academy_id: CategoryIndex(names) for academy_id, names in categories.items()}
+
         updated_count = 0
-        for item in data.get('offerings', []):
+        for _, item in offerings:
             if not item or 'link' not in item or 'categories' not in item or not item['categories']:
                 continue
             
@@ -77,13 +94,10 @@ class Command(BaseCommand):
                     category_name = full_category_name.strip()
                 
                 # Try to find the category
-                matching_categories = Category.objects.filter(
-                    Q(name__icontains=category_name) & 
-                    Q(academy=offering.academy)
-                )
+                index = indexes.get(offering.academy_id)
+                category = index.find(category_name) if index else None
                 
-                if matching_categories.exists():
-                    category = matching_categories.first()
+                if category is not None:
                     # Add to M2M if not already there
                     if not offering.categories.filter(id=category.id).exists():
                         offering.categories.add(category)
@@ -91,5 +105,4 @@ class Command(BaseCommand):
                         self.stdout.write(self.style.SUCCESS(
                             f"Added category '{category.name}' to offering '{offering.title}'"
                         ))
-        
-        self.stdout.write(f'Updated {updated_count} offerings with categories from JSON')
+        return updated_count
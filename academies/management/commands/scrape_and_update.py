@@ -6,6 +6,7 @@ from pathlib import Path
 from datetime import datetime
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from academies.json_stream import read_records, read_sections
 from academies.models import (
     Academy, Category, Language, Location, Teacher, 
     Offering, Variation, VariationTeacher, Link
@@ -271,8 +272,8 @@ class Command(BaseCommand):
     def import_data_preserving_academies(self, json_file, academy_metadata):
         """Import data while preserving existing academy customizations."""
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Offerings are streamed from the file in a second pass
+            data = read_sections(json_file, ['academies'])
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR(f'File not found: {json_file}'))
             return
@@ -298,7 +299,7 @@ class Command(BaseCommand):
             # Load academies (update existing, create new)
             self.stdout.write('Processing academies...')
             academy_objects = {}
-            for academy_data in data.get('academies', []):
+            for academy_data in data['academies']:
                 academy_name = academy_data['name']
                 
                 # Check if we have existing metadata for this academy
@@ -340,7 +341,7 @@ class Command(BaseCommand):
             # Load offerings (same as original load_academy_data command)
             self.stdout.write('Loading offerings...')
             offerings_created = 0
-            for offering_data in data.get('offerings', []):
+            for _, offering_data in read_records(json_file, {'offerings'}):
                 if not offering_data.get('url') or not offering_data.get('title'):
                     continue
                     
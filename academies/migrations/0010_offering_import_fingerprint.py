@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academies', '0009_teacher_description_teacher_photo_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offering',
+            name='import_fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Fingerprint of the imported data, used to skip unchanged offerings', max_length=32),
+        ),
+    ]
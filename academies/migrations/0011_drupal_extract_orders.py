@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academies', '0010_offering_import_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offering',
+            name='drupal_product_id',
+            field=models.PositiveIntegerField(blank=True, db_index=True, help_text="Product id in the academy's Drupal shop, for offerings imported from a database extract", null=True),
+        ),
+        migrations.AddField(
+            model_name='variation',
+            name='drupal_variation_id',
+            field=models.PositiveIntegerField(blank=True, db_index=True, help_text="Product variation id in the academy's Drupal shop", null=True),
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('drupal_order_id', models.PositiveIntegerField(help_text="Order id in the academy's Drupal shop")),
+                ('order_number', models.CharField(blank=True, max_length=50)),
+                ('state', models.CharField(blank=True, help_text='Order state (e.g., completed, canceled)', max_length=50)),
+                ('mail', models.EmailField(blank=True, help_text='E-mail address the order was placed with', max_length=254)),
+                ('customer_name', models.CharField(blank=True, help_text='User name of the customer', max_length=200)),
+                ('customer_mail', models.EmailField(blank=True, help_text="E-mail address of the customer's account", max_length=254)),
+                ('total_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('currency', models.CharField(blank=True, max_length=3)),
+                ('import_fingerprint', models.CharField(blank=True, editable=False, help_text='Fingerprint of the imported data, used to skip unchanged orders', max_length=32)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('academy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='academies.academy')),
+            ],
+            options={
+                'ordering': ['academy__name', '-drupal_order_id'],
+                'unique_together': {('academy', 'drupal_order_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('drupal_order_item_id', models.PositiveIntegerField(help_text="Order item id in the academy's Drupal shop")),
+                ('title', models.CharField(blank=True, help_text='Title of the variation at the time of the order', max_length=300)),
+                ('quantity', models.DecimalField(decimal_places=2, default=1, max_digits=10)),
+                ('unit_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('total_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='academies.order')),
+                ('variation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='enrollments', to='academies.variation')),
+            ],
+            options={
+                'ordering': ['order', 'drupal_order_item_id'],
+                'unique_together': {('order', 'drupal_order_item_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academies', '0011_drupal_extract_orders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacher',
+            name='drupal_user_id',
+            field=models.PositiveIntegerField(blank=True, db_index=True, help_text="User id in the academy's Drupal shop, to link the teacher's lessons imported from a database extract", null=True),
+        ),
+    ]
@@ -123,6 +123,7 @@ class Teacher(models.Model):
     bio = models.TextField(blank=True, help_text="Teacher biography")
     photo_url = models.URLField(blank=True, help_text="URL to teacher's photo")
     description = models.TextField(blank=True, help_text="Teacher description from profile page (can contain HTML)")
+    drupal_user_id = models.PositiveIntegerField(null=True, blank=True, db_index=True, help_text="User id in the academy's Drupal shop, to link the teacher's lessons imported from a database extract")
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -152,6 +153,8 @@ class Offering(models.Model):
     is_active = models.BooleanField(default=True, help_text="Whether the offering is currently active")
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    import_fingerprint = models.CharField(max_length=32, blank=True, editable=False, help_text="Fingerprint of the imported data, used to skip unchanged offerings")
+    drupal_product_id = models.PositiveIntegerField(null=True, blank=True, db_index=True, help_text="Product id in the academy's Drupal shop, for offerings imported from a database extract")
     
     def __str__(self):
         return f"{self.title} ({self.academy.name})"
@@ -253,6 +256,7 @@ class Variation(models.Model):
     description = models.TextField(blank=True, help_text="Variation-specific description (can contain HTML)")
     registration_url = models.URLField(blank=True, help_text="Registration link")
     is_available = models.BooleanField(default=True, help_text="Whether registration is available")
+    drupal_variation_id = models.PositiveIntegerField(null=True, blank=True, db_index=True, help_text="Product variation id in the academy's Drupal shop")
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -309,3 +313,45 @@ class Link(models.Model):
     
     class Meta:
         ordering = ['link_type', 'text']
+
+
+class Order(models.Model):
+    """An order from an academy's Drupal shop, imported from a database extract."""
+    academy = models.ForeignKey(Academy, on_delete=models.CASCADE, related_name='orders')
+    drupal_order_id = models.PositiveIntegerField(help_text="Order id in the academy's Drupal shop")
+    order_number = models.CharField(max_length=50, blank=True)
+    state = models.CharField(max_length=50, blank=True, help_text="Order state (e.g., completed, canceled)")
+    mail = models.EmailField(blank=True, help_text="E-mail address the order was placed with")
+    customer_name = models.CharField(max_length=200, blank=True, help_text="User name of the customer")
+    customer_mail = models.EmailField(blank=True, help_text="E-mail address of the customer's account")
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    currency = models.CharField(max_length=3, blank=True)
+    import_fingerprint = models.CharField(max_length=32, blank=True, editable=False, help_text="Fingerprint of the imported data, used to skip unchanged orders")
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Order {self.order_number or self.drupal_order_id} ({self.academy.name})"
+
+    class Meta:
+        unique_together = ['academy', 'drupal_order_id']
+        ordering = ['academy__name', '-drupal_order_id']
+
+
+class Enrollment(models.Model):
+    """One item of an order: places in a variation bought by the customer."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='enrollments')
+    variation = models.ForeignKey(Variation, on_delete=models.SET_NULL, null=True, blank=True, related_name='enrollments')
+    drupal_order_item_id = models.PositiveIntegerField(help_text="Order item id in the academy's Drupal shop")
+    title = models.CharField(max_length=300, blank=True, help_text="Title of the variation at the time of the order")
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, default=1)
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.order.customer_name or self.order.mail} - {self.title}"
+
+    class Meta:
+        unique_together = ['order', 'drupal_order_item_id']
+        ordering = ['order', 'drupal_order_item_id']
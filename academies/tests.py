@@ -1,3 +1,71 @@
+import random
+
 from django.test import TestCase
 
-# Create your tests here.
+from .importing import CategoryIndex, ImportCache
+from .models import Academy, Category
+
+
+class CategoryIndexTests(TestCase):
+    """The category index must pick the category a name__icontains query picks."""
+
+    NAMES = [
+        'Data', 'Big Data', 'data science', 'DATA-analyse', 'Économie', 'économie', 'Ärzte', 'ärzte',
+        '100% online', 'under_score', 'Recht', 'Rechtspraak', 'Gezondheid & Zorg', 'Zorg',
+    ]
+    NEEDLES = [
+        '', 'data', 'DATA', 'Data', 'big', 'É', 'é', 'ÉCONOMIE', 'conomie', 'ä', 'Ä', 'ÄRZTE', '%', '_',
+        '100%', 'online', 'recht', 'RECHTS', 'zorg', ' & ',
+    ]
+    # Names no category contains
+    UNKNOWN = ['x', 'Datas', 'économie ']
+
+    def setUp(self):
+        self.academy = Academy.objects.create(name='Test Academy', base_url='https://test.ugent.be')
+        self.other = Academy.objects.create(name='Other Academy', base_url='https://other.ugent.be')
+        for name in self.NAMES:
+            Category.objects.create(name=name, academy=self.academy)
+        Category.objects.create(name='Aaa data', academy=self.other)
+
+    def assertMatchesQuery(self, index, academy, needles):
+        for needle in needles:
+            expected = Category.objects.filter(name__icontains=needle, academy=academy).first()
+            with self.subTest(needle=needle):
+                self.assertEqual(index.find(needle), expected)
+
+    def test_matches_icontains_first(self):
+        cache = ImportCache()
+        self.assertMatchesQuery(cache.category_index(self.academy), self.academy, self.NEEDLES + self.UNKNOWN)
+        self.assertMatchesQuery(cache.category_index(self.other), self.other, self.NEEDLES + self.UNKNOWN)
+
+    def test_matches_icontains_first_random(self):
+        rng = random.Random(25)
+        alphabet = 'aAbBéÉ -%_'
+        academy = Academy.objects.create(name='Random Academy', base_url='https://random.ugent.be')
+        names = {''.join(rng.choices(alphabet, k=rng.randint(1, 6))) for _ in range(200)}
+        for name in names:
+            Category.objects.create(name=name, academy=academy)
+        needles = {name[start:start + length] for name in names for start in range(3) for length in (1, 2, 3)}
+        needles |= {''.join(rng.choices(alphabet, k=rng.randint(1, 3))) for _ in range(100)}
+        self.assertMatchesQuery(ImportCache().category_index(academy), academy, sorted(needles))
+
+    def test_finds_added_categories(self):
+        cache = ImportCache()
+        self.assertEqual(cache.category(self.academy, 'ata'), Category.objects.get(name='Big Data'))
+        created = cache.category(self.academy, 'Aardrijkskunde')
+        self.assertEqual(Category.objects.get(name='Aardrijkskunde', academy=self.academy), created)
+        cache.category_named(self.academy, 'A data course')
+        self.assertMatchesQuery(cache.category_index(self.academy), self.academy, self.NEEDLES + self.UNKNOWN + ['aardrijk', 'ata'])
+
+    def test_no_queries_for_known_names(self):
+        cache = ImportCache()
+        with self.assertNumQueries(0):
+            for needle in self.NEEDLES:
+                cache.category(self.academy, needle)
+
+    def test_follows_dictionary(self):
+        categories = {}
+        index = CategoryIndex(categories)
+        self.assertIsNone(index.find('data'))
+        categories['Data'] = category = Category.objects.create(name='Data', academy=self.other)
+        self.assertEqual(index.find('DAT'), category)
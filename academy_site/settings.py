@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -79,7 +80,8 @@ WSGI_APPLICATION = 'academy_site.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # update_data.py imports into a shadow copy of the database
+        'NAME': os.environ.get('ACADEMY_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
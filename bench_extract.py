@@ -0,0 +1,352 @@
+"""
+Benchmark of the SQL dump tokenizer in extract_data.py
+
+Writes a synthetic Drupal Commerce dump in phpMyAdmin format (all tables in
+DESIRED_TABLES plus large cache/watchdog tables that are never kept) and times
+extract_data() on it. The line-based parser extract_data.py used before the
+streaming tokenizer is kept here as the baseline; it splits rows on "),(" and
+therefore loses rows whose text contains that sequence, which the synthetic
+descriptions do on purpose. --workers times extract_data(workers=N) for each
+given number of parse processes. --memory compares the peak memory traced by
+tracemalloc with rows held as Row tuples and as dicts.
+
+Usage:
+    python bench_extract.py [--size-mb 256] [--skip-baseline] [--keep-dump PATH]
+    python bench_extract.py --size-mb 3000 --skip-baseline   # multi-GB run
+    python bench_extract.py --skip-baseline --workers 1,2,4,8
+    python bench_extract.py --skip-baseline --memory
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from extract_data import DESIRED_TABLES, DumpReader, dump_events, extract_data
+
+# Rows per INSERT statement, as phpMyAdmin writes them
+ROWS_PER_INSERT = 500
+
+SCHEMAS = {
+    "taxonomy_term_field_data": ["tid", "revision_id", "vid", "langcode", "status", "name", "weight", "changed"],
+    "file_managed": ["fid", "uuid", "langcode", "uid", "filename", "uri", "filemime", "filesize", "status", "created"],
+    "users_field_data": ["uid", "langcode", "name", "pass", "mail", "timezone", "status", "created", "changed", "init"],
+    "user__roles": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "roles_target_id"],
+    "user__user_picture": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "user_picture_target_id"],
+    "commerce_product_field_data": ["product_id", "type", "langcode", "title", "uid", "status", "created", "changed"],
+    "commerce_product__field_course_desc": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "field_course_desc_value", "field_course_desc_format"],
+    "commerce_product__field_course_program": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "field_course_program_value", "field_course_program_format"],
+    "commerce_product__field_course_img": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "field_course_img_target_id", "field_course_img_alt"],
+    "commerce_product__field_course_category": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "field_course_category_target_id"],
+    "commerce_product_variation_field_data": ["variation_id", "type", "product_id", "langcode", "sku", "title", "price__number", "price__currency_code", "status", "created"],
+    "commerce_product_variation__field_lesson_dates": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "field_lesson_dates_value", "field_lesson_dates_end_value"],
+    "commerce_product_variation__field_location_ref": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "field_location_ref_target_id"],
+    "commerce_product_variation__field_optional_prices": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "field_optional_prices_target_id"],
+    "commerce_product_variation__field_teachers": ["bundle", "deleted", "entity_id", "revision_id", "langcode", "delta", "field_teachers_target_id"],
+    "commerce_order": ["order_id", "type", "order_number", "store_id", "uid", "mail", "state", "data", "total_price__number", "total_price__currency_code", "placed", "completed"],
+    "commerce_order_item": ["order_item_id", "type", "order_id", "purchased_entity", "title", "quantity", "unit_price__number", "unit_price__currency_code", "total_price__number", "total_price__currency_code", "data", "created"],
+    "cache_render": ["cid", "data", "expire", "created", "serialized", "tags", "checksum"],
+    "watchdog": ["wid", "uid", "type", "message", "variables", "severity", "link", "location", "referer", "hostname", "timestamp"],
+}
+
+# Text that breaks naive parsers: row separators, quotes, escapes, semicolons
+TRICKY_TEXT = (
+    "<p>Module 1),(2: het ''klinisch'' onderzoek; zie \\'bijlage\\' en C:\\\\cursus\\r\\n"
+    "Lesgevers (dr. X), (dr. Y);</p>"
+)
+
+
+def sql_literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    if isinstance(value, str):
+        # Already escaped in mysqldump style by the callers
+        return f"'{value}'"
+    return str(value)
+
+
+class DumpWriter:
+    """Writes phpMyAdmin-style CREATE TABLE and multi-row INSERT statements."""
+
+    def __init__(self, f):
+        self.f = f
+
+    def create_table(self, table):
+        columns = ",\n".join(f"  `{column}` varchar(255) DEFAULT NULL" for column in SCHEMAS[table])
+        self.f.write(f"\n--\n-- Table structure for table `{table}`\n--\n\nCREATE TABLE `{table}` (\n{columns}\n) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;\n")
+
+    def insert(self, table, rows):
+        header = f"INSERT INTO `{table}` (" + ", ".join(f"`{c}`" for c in SCHEMAS[table]) + ") VALUES\n"
+        for start in range(0, len(rows), ROWS_PER_INSERT):
+            batch = rows[start:start + ROWS_PER_INSERT]
+            body = ",\n".join("(" + ", ".join(sql_literal(v) for v in row) + ")" for row in batch)
+            self.f.write(header + body + ";\n")
+
+
+def write_synthetic_dump(path, size_mb=256, users=20000, products=500, seed=1):
+    """
+    Write a synthetic dump of roughly size_mb megabytes
+
+    Courses, lessons, users and their field tables are written once; orders,
+    order items and cache/watchdog rows are added until the dump reaches the
+    requested size.
+
+    Returns:
+        Size of the dump in bytes
+    """
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    variations = products * 4
+
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        out = DumpWriter(f)
+        f.write("-- phpMyAdmin SQL Dump\n-- Synthetic benchmark data\n\n")
+        f.write('SET SQL_MODE = "NO_AUTO_VALUE_ON_ZERO";\n/*!40101 SET NAMES utf8mb4 */;\n')
+        for table in SCHEMAS:
+            out.create_table(table)
+
+        out.insert("taxonomy_term_field_data", [[t, t, "cat", "nl", 1, f"Categorie {t}", 0, 1700000000] for t in range(1, 101)])
+        out.insert("file_managed", [[f, f"uuid-{f}", "nl", 1, f"img{f}.jpg", f"public://img{f}.jpg", "image/jpeg", 1000 + f, 1, 1700000000] for f in range(1, users // 10 + products + 2)])
+        out.insert("users_field_data", [[u, "nl", f"user{u}@ugent.be", "$2y$10$hash", f"user{u}@ugent.be", "Europe/Brussels", 1, 1700000000, 1700000000, f"user{u}@ugent.be"] for u in range(1, users + 1)])
+        out.insert("user__roles", [["user", 0, u, u, "en", 0, "lesgever" if u % 50 == 0 else "student"] for u in range(1, users + 1, 3)])
+        out.insert("user__user_picture", [["user", 0, u, u, "en", 0, u // 10 + 1] for u in range(1, users + 1, 10)])
+        out.insert("commerce_product_field_data", [[p, "course", "nl", f"Cursus {p}", 1, 1, 1700000000, 1700000000] for p in range(1, products + 1)])
+        out.insert("commerce_product__field_course_desc", [["course", 0, p, p, "nl", 0, TRICKY_TEXT * 3, "full_html"] for p in range(1, products + 1)])
+        out.insert("commerce_product__field_course_program", [["course", 0, p, p, "nl", 0, TRICKY_TEXT * 5, "full_html"] for p in range(1, products + 1)])
+        out.insert("commerce_product__field_course_img", [["course", 0, p, p, "nl", 0, users // 10 + p, f"Cursus {p}"] for p in range(1, products + 1)])
+        out.insert("commerce_product__field_course_category", [["course", 0, p, p, "nl", 0, p % 100 + 1] for p in range(1, products + 1)])
+        out.insert("commerce_product_variation_field_data", [[v, "lesson", (v - 1) // 4 + 1, "nl", f"SKU-{v}", f"Les {v}", "85.000000", "EUR", 1, 1700000000] for v in range(1, variations + 1)])
+        out.insert("commerce_product_variation__field_lesson_dates", [["lesson", 0, v, v, "nl", d, f"2025-0{d + 1}-01T09:00:00", f"2025-0{d + 1}-01T17:00:00"] for v in range(1, variations + 1) for d in range(2)])
+        out.insert("commerce_product_variation__field_location_ref", [["lesson", 0, v, v, "nl", 0, v % 100 + 1] for v in range(1, variations + 1)])
+        out.insert("commerce_product_variation__field_optional_prices", [["lesson", 0, v, v, "nl", 0, v % 7 + 1] for v in range(1, variations + 1)])
+        out.insert("commerce_product_variation__field_teachers", [["lesson", 0, v, v, "nl", 0, rng.randrange(50, users + 1, 50)] for v in range(1, variations + 1)])
+
+        order_id = 0
+        item_id = 0
+        cache_id = 0
+        while f.tell() < target:
+            orders = []
+            items = []
+            for _ in range(2000):
+                order_id += 1
+                uid = rng.randint(1, users)
+                orders.append([order_id, "default", str(order_id), 1, uid, f"user{uid}@ugent.be", "completed",
+                               b"a:1:{s:4:\"note\";s:5:\"x),(y\";}", 85.0, "EUR", 1700000000, 1700000000])
+                for _ in range(rng.randint(1, 3)):
+                    item_id += 1
+                    variation = rng.randint(1, variations)
+                    items.append([item_id, "default", order_id, variation, f"Les {variation}", 1.0, 85.0, "EUR", 85.0, "EUR",
+                                  b"a:0:{}", 1700000000])
+            out.insert("commerce_order", orders)
+            out.insert("commerce_order_item", items)
+            # Tables that are never kept make up most of a real Drupal dump
+            cache_rows = []
+            for _ in range(1500):
+                cache_id += 1
+                cache_rows.append([f"entity_view:commerce_product:{cache_id}", TRICKY_TEXT * 20, -1, 1700000000, 1, "rendered", "1"])
+            out.insert("cache_render", cache_rows)
+            out.insert("watchdog", [[cache_id * 10 + w, 0, "php", "INSERT INTO `users_field_data` VALUES (1);", "a:0:{}", 3, "", "https://x/", "", "127.0.0.1", 1700000000] for w in range(200)])
+        return f.tell()
+
+
+# --- Baseline: the line-based parser extract_data.py used before ------------
+
+INSERT_INTO_REGEX = re.compile(r"INSERT INTO `(\w+)` \((.*?)\) VALUES")
+
+
+def parse_sql_value(val_str):
+    val_str = val_str.strip()
+    if val_str.upper() == "NULL":
+        return None
+    if val_str.startswith("'") and val_str.endswith("'"):
+        inner = val_str[1:-1]
+        return inner.replace(r"\'", "'").replace(r"\\", "\\").replace("''", "'")
+    if val_str.startswith("0x"):
+        return val_str
+    try:
+        if "." in val_str:
+            return float(val_str)
+        return int(val_str)
+    except ValueError:
+        return val_str
+
+
+def parse_insert_values_simple(values_str):
+    s = values_str.strip()
+    if s.endswith(";"): s = s[:-1].strip()
+    if s.endswith(","): s = s[:-1].strip()
+    if s.startswith("("): s = s[1:]
+    if s.endswith(")"): s = s[:-1]
+    rows = []
+    for rs in re.split(r"\),\s*\(", s):
+        vals = []
+        curr = []
+        in_quote = False
+        escape = False
+        for char in rs:
+            if in_quote:
+                curr.append(char)
+                if char == "'" and not escape:
+                    in_quote = False
+                if char == "\\" and not escape:
+                    escape = True
+                else:
+                    escape = False
+            else:
+                if char == "'":
+                    in_quote = True
+                    curr.append(char)
+                elif char == ",":
+                    vals.append("".join(curr))
+                    curr = []
+                else:
+                    curr.append(char)
+        if curr:
+            vals.append("".join(curr))
+        rows.append([parse_sql_value(v) for v in vals])
+    return rows
+
+
+def extract_data_linewise(sql_file):
+    """extract_data() as it was before the streaming tokenizer (rows only)."""
+    data = {t: [] for t in DESIRED_TABLES}
+    current_insert_table = None
+    current_insert_cols = []
+    with open(sql_file, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line_stripped = line.strip()
+            if not line_stripped:
+                continue
+            if line_stripped.startswith("INSERT INTO"):
+                match = INSERT_INTO_REGEX.match(line_stripped)
+                current_insert_table = None
+                if match and match.group(1) in DESIRED_TABLES:
+                    current_insert_table = match.group(1)
+                    current_insert_cols = [c.strip().strip('`') for c in match.group(2).split(',')]
+                    values_part = line_stripped[match.end():].strip()
+                    if values_part:
+                        try:
+                            for row in parse_insert_values_simple(values_part):
+                                if len(row) == len(current_insert_cols):
+                                    data[current_insert_table].append(dict(zip(current_insert_cols, row)))
+                        except Exception:
+                            pass
+                    if line_stripped.endswith(";"):
+                        current_insert_table = None
+            elif current_insert_table:
+                if line_stripped.startswith("("):
+                    try:
+                        for row in parse_insert_values_simple(line_stripped):
+                            if len(row) == len(current_insert_cols):
+                                data[current_insert_table].append(dict(zip(current_insert_cols, row)))
+                    except Exception:
+                        pass
+                if line_stripped.endswith(";"):
+                    current_insert_table = None
+    return data
+
+
+def extract_data_dicts(sql_file):
+    """extract_data() as it was before Row tuples, with a dict per row."""
+    schemas = {}
+    data = {t: [] for t in DESIRED_TABLES}
+    for event in dump_events(sql_file, DESIRED_TABLES):
+        if event[0] == "schema":
+            schemas[event[1]] = event[2]
+            continue
+        _, table, columns, rows = event
+        columns = columns or schemas.get(table, [])
+        data[table].extend(dict(zip(columns, row)) for row in rows if len(row) == len(columns))
+    return schemas, data
+
+
+def traced_peak_mb(func):
+    """Peak memory allocated while func runs, as traced by tracemalloc."""
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        return result, tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def timed(func):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark extract_data.py on a synthetic SQL dump")
+    parser.add_argument("--size-mb", type=int, default=256, help="Approximate size of the synthetic dump (default: 256)")
+    parser.add_argument("--skip-baseline", action="store_true", help="Only time the streaming tokenizer")
+    parser.add_argument("--keep-dump", type=Path, help="Write the dump here and keep it (reused if it exists)")
+    parser.add_argument("--memory", action="store_true", help="Compare peak memory of Row tuples and dict rows")
+    parser.add_argument("--workers", help="Comma-separated numbers of parse processes to compare, e.g. 1,2,4,8")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = args.keep_dump or Path(tmp) / "synthetic.sql"
+        if not dump.exists():
+            start = time.perf_counter()
+            write_synthetic_dump(dump, args.size_mb)
+            print(f"Wrote {dump} in {time.perf_counter() - start:.1f} s")
+        size_mb = os.path.getsize(dump) / (1024 * 1024)
+        print(f"Dump: {size_mb:,.0f} MB")
+
+        (schemas, data), elapsed = timed(lambda: extract_data(dump))
+        rows = sum(len(r) for r in data.values())
+        print(f"{'streaming':<12} {elapsed:8.1f} s {size_mb / elapsed:8.1f} MB/s {rows:12,} rows")
+
+        (_, exact), _ = timed(lambda: extract_data(dump, fast_skip=False))
+        if exact != data:
+            print("  WARNING: fast skip changed the extracted rows")
+
+        # Skipping every table isolates the cost of passing over unwanted ones
+        for fast_skip in (True, False):
+            start = time.perf_counter()
+            with open(dump, "rb") as f:
+                for _ in DumpReader(f, [], fast_skip=fast_skip).events():
+                    pass
+            skip_elapsed = time.perf_counter() - start
+            label = "fast skip" if fast_skip else "exact skip"
+            print(f"{label:<12} {skip_elapsed:8.1f} s {size_mb / skip_elapsed:8.1f} MB/s  (all tables skipped)")
+
+        if not args.skip_baseline:
+            baseline, baseline_elapsed = timed(lambda: extract_data_linewise(dump))
+            baseline_rows = sum(len(r) for r in baseline.values())
+            print(f"{'line-based':<12} {baseline_elapsed:8.1f} s {size_mb / baseline_elapsed:8.1f} MB/s {baseline_rows:12,} rows")
+            print(f"{'speedup':<12} {baseline_elapsed / elapsed:8.1f} x")
+            for table in DESIRED_TABLES:
+                if len(baseline[table]) != len(data[table]):
+                    print(f"  {table}: line-based parser kept {len(baseline[table]):,} of {len(data[table]):,} rows")
+
+        if args.workers:
+            print(f"\n{'workers':<12} {'seconds':>10} {'MB/s':>13} {'speedup':>9}  ({os.cpu_count()} CPUs)")
+            sequential = None
+            for workers in [int(n) for n in args.workers.split(",")]:
+                (_, parallel), parallel_elapsed = timed(lambda: extract_data(dump, workers=workers))
+                sequential = sequential or parallel_elapsed
+                print(f"{workers:<12} {parallel_elapsed:8.1f} s {size_mb / parallel_elapsed:8.1f} MB/s {sequential / parallel_elapsed:8.1f} x")
+                if parallel != data:
+                    print("  WARNING: parallel parsing changed the extracted rows")
+
+        if args.memory:
+            del data, exact
+            print(f"\n{'rows as':<12} {'peak MB':>10}")
+            (_, tuples), tuples_peak = traced_peak_mb(lambda: extract_data(dump))
+            del tuples
+            (_, dicts), dicts_peak = traced_peak_mb(lambda: extract_data_dicts(dump))
+            del dicts
+            print(f"{'Row tuples':<12} {tuples_peak:10.1f}")
+            print(f"{'dicts':<12} {dicts_peak:10.1f}")
+            print(f"{'reduction':<12} {dicts_peak / tuples_peak:10.1f} x")
@@ -0,0 +1,148 @@
+"""
+Benchmark of reconstruct_json in extract_data.py
+
+Builds the extracted tables in memory (100,000 users and 1,000,000 order
+items at --scale 1) and times reconstruct_json at a range of fractions of that
+size, so the time per order item shows whether it scales linearly. The old
+teacher selection, which rebuilt the list of all lesson teachers for every
+user, is timed as a baseline at the smaller sizes.
+
+--write compares writing the output at the largest size: json.dump(indent=2)
+of the complete document, as extract_data.py did before, against streaming the
+records with OutputWriter in each format. Every variant runs twice: once for
+the time, and once under tracemalloc for the peak memory, which tracing slows
+down too much to time.
+
+Usage:
+    python bench_reconstruct.py [--scale 1.0] [--steps 4] [--baseline-max-users 25000]
+    python bench_reconstruct.py --steps 1 --write
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from extract_data import OUTPUT_FORMATS, OutputWriter, reconstruct_json, reconstruct_records
+
+USERS = 100_000
+ORDER_ITEMS = 1_000_000
+
+
+def synthetic_data(users=USERS, order_items=ORDER_ITEMS, seed=1):
+    """
+    Tables as returned by extract_data() for a shop of the given size
+
+    There is one course per 50 users with four lessons each; every lesson has
+    a teacher, every 50th user has the lesgever role and orders have two items
+    on average.
+
+    Returns:
+        Dictionary mapping table names to lists of row dicts
+    """
+    rng = random.Random(seed)
+    products = max(1, users // 50)
+    variations = products * 4
+    orders = max(1, order_items // 2)
+    files = users // 10 + products
+
+    return {
+        "file_managed": [{"fid": f, "uri": f"public://img{f}.jpg"} for f in range(1, files + 1)],
+        "users_field_data": [{"uid": u, "name": f"user{u}", "mail": f"user{u}@ugent.be", "status": 1} for u in range(1, users + 1)],
+        "user__roles": [{"entity_id": u, "roles_target_id": "lesgever" if u % 50 == 0 else "student"} for u in range(1, users + 1, 3)],
+        "user__user_picture": [{"entity_id": u, "user_picture_target_id": u // 10 + 1} for u in range(1, users + 1, 10)],
+        "taxonomy_term_field_data": [{"tid": t, "name": f"Categorie {t}"} for t in range(1, 101)],
+        "commerce_product_field_data": [{"product_id": p, "title": f"Cursus {p}", "type": "course", "status": 1, "created": 1700000000} for p in range(1, products + 1)],
+        "commerce_product__field_course_desc": [{"entity_id": p, "field_course_desc_value": "<p>Beschrijving</p>"} for p in range(1, products + 1)],
+        "commerce_product__field_course_program": [{"entity_id": p, "field_course_program_value": "<p>Programma</p>"} for p in range(1, products + 1)],
+        "commerce_product__field_course_img": [{"entity_id": p, "field_course_img_target_id": users // 10 + p} for p in range(1, products + 1)],
+        "commerce_product__field_course_category": [{"entity_id": p, "field_course_category_target_id": p % 100 + 1} for p in range(1, products + 1)],
+        "commerce_product_variation_field_data": [{"variation_id": v, "product_id": (v - 1) // 4 + 1, "sku": f"SKU-{v}", "title": f"Les {v}", "status": 1} for v in range(1, variations + 1)],
+        "commerce_product_variation__field_lesson_dates": [{"entity_id": v, "field_lesson_dates_value": "2025-01-01T09:00:00", "field_lesson_dates_end_value": "2025-01-01T17:00:00"} for v in range(1, variations + 1)],
+        "commerce_product_variation__field_location_ref": [{"entity_id": v, "field_location_ref_target_id": v % 100 + 1} for v in range(1, variations + 1)],
+        "commerce_product_variation__field_teachers": [{"entity_id": v, "field_teachers_target_id": rng.randint(1, users)} for v in range(1, variations + 1)],
+        "commerce_order": [{"order_id": o, "order_number": str(o), "uid": rng.randint(1, users), "mail": None, "state": "completed",
+                            "total_price__number": 85.0, "total_price__currency_code": "EUR"} for o in range(1, orders + 1)],
+        "commerce_order_item": [{"order_item_id": i, "type": "default", "order_id": rng.randint(1, orders), "purchased_entity": rng.randint(1, variations),
+                                 "quantity": 1.0, "unit_price__number": 85.0, "total_price__number": 85.0} for i in range(1, order_items + 1)],
+    }
+
+
+def old_teacher_selection(data, courses):
+    """The teacher selection reconstruct_json used before: a list of all lesson teachers per user."""
+    roles = {}
+    for r in data["user__roles"]:
+        roles.setdefault(r["entity_id"], []).append(r["roles_target_id"])
+    users = [{"id": u["uid"], "roles": roles.get(u["uid"], [])} for u in data["users_field_data"]]
+    return [u for u in users if "lesgever" in u["roles"] or u["id"] in [t["id"] for c in courses for l in c["lessons"] if "teachers" in l for t in l["teachers"]]]
+
+
+def write_document(data, path):
+    """The output step of extract_data.py before streaming."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(reconstruct_json(data), f, indent=2, default=str)
+
+
+def write_stream(data, path, fmt):
+    with OutputWriter(path, fmt) as writer:
+        for record_type, record in reconstruct_records(data):
+            writer.write(record_type, record)
+
+
+def measure(func):
+    """Seconds of an untraced run and peak traced MB of a second run of func()."""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        func()
+        return seconds, tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark reconstruct_json on synthetic data")
+    parser.add_argument("--scale", type=float, default=1.0, help=f"Fraction of {USERS:,} users / {ORDER_ITEMS:,} order items for the largest run (default: 1.0)")
+    parser.add_argument("--steps", type=int, default=4, help="Number of runs, halving the size each time (default: 4)")
+    parser.add_argument("--write", action="store_true", help="Compare writing the output at the largest size")
+    parser.add_argument("--baseline-max-users", type=int, default=25_000, help="Largest number of users to time the old teacher selection for (default: 25000)")
+    args = parser.parse_args()
+
+    print(f"{'users':>9} {'items':>11} {'teachers':>9} {'seconds':>9} {'us/item':>9} {'old teachers s':>15}")
+    for step in reversed(range(args.steps)):
+        fraction = args.scale / 2 ** step
+        data = synthetic_data(int(USERS * fraction), int(ORDER_ITEMS * fraction))
+        users = len(data["users_field_data"])
+        items = len(data["commerce_order_item"])
+
+        start = time.perf_counter()
+        result = reconstruct_json(data)
+        elapsed = time.perf_counter() - start
+
+        old = "skipped"
+        if users <= args.baseline_max_users:
+            start = time.perf_counter()
+            old_teachers = old_teacher_selection(data, result["courses"])
+            old = f"{time.perf_counter() - start:.1f}"
+            if [t["id"] for t in old_teachers] != [t["id"] for t in result["teachers"]]:
+                old += " (differs!)"
+        print(f"{users:9,} {items:11,} {len(result['teachers']):9,} {elapsed:9.2f} {elapsed / items * 1e6:9.2f} {old:>15}")
+
+    if args.write:
+        del result
+        print(f"\n{'output':<20} {'seconds':>9} {'peak MB':>9} {'file MB':>9}")
+        with tempfile.TemporaryDirectory() as tmp:
+            runs = [("json.dump indent=2", "document.json", lambda path: write_document(data, path))]
+            for fmt in OUTPUT_FORMATS:
+                for suffix in ("", ".gz"):
+                    name = f"{fmt}{suffix}"
+                    runs.append((f"stream {name}", f"stream.{fmt}{suffix}", lambda path, fmt=fmt: write_stream(data, path, fmt)))
+            for label, filename, func in runs:
+                path = Path(tmp) / filename
+                seconds, peak = measure(lambda: func(path))
+                print(f"{label:<20} {seconds:9.1f} {peak:9.1f} {os.path.getsize(path) / (1024 * 1024):9.1f}")
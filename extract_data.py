@@ -1,10 +1,23 @@
+import gzip
+import hashlib
 import json
+import lzma
+import mmap
 import re
+import sqlite3
 import sys
 from pathlib import Path
 import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
 
 # Configuration
 BASE_DIR = Path(__file__).resolve().parent
@@ -32,198 +45,633 @@ DESIRED_TABLES = [
     "commerce_order_item"
 ]
 
-# Simple regex for SQL parsing
-CREATE_TABLE_REGEX = re.compile(r"CREATE TABLE `(\w+)` \((.*?)\) ENGINE", re.DOTALL)
-INSERT_INTO_REGEX = re.compile(r"INSERT INTO `(\w+)` \((.*?)\) VALUES")
+# Leading bytes of compressed dumps
+COMPRESSION_MAGIC = {
+    "gzip": b"\x1f\x8b",
+    "zstd": b"\x28\xb5\x2f\xfd",
+    "xz": b"\xfd7zXZ\x00",
+}
 
-def parse_sql_value(val_str):
-    """
-    Parses a single SQL value string into a Python type.
-    Handles 'string', NULL, numbers, hex.
-    """
-    val_str = val_str.strip()
-    if val_str.upper() == "NULL":
-        return None
-    if val_str.startswith("'") and val_str.endswith("'"):
-        # Basic unescaping for SQL strings
-        # Replace '' with '
-        inner = val_str[1:-1]
-        return inner.replace(r"\'", "'").replace(r"\\", "\\").replace("''", "'") # standard SQL escape is '' typically
-    if val_str.startswith("0x"):
-        # Hex string / binary
-        return val_str
+# Bytes read from the dump at a time
+BLOCK_SIZE = 8 * 1024 * 1024
+
+# INSERT statements are handed to parse workers in batches of about this size
+TASK_BYTES = 4 * 1024 * 1024
+
+# Columns with at most this many distinct values share one object per value
+SHARED_VALUES_MAX = 256
+
+# Record type -> list in the output document
+OUTPUT_SECTIONS = {"course": "courses", "order": "orders", "teacher": "teachers"}
+OUTPUT_FORMATS = ("json", "pretty", "ndjson")
+
+# Entities compared by extract_data.py --since
+DELTA_KINDS = ("courses", "lessons", "attendees", "orders")
+
+# Columns indexed in the SQLite staging database: the join keys of reconstruct_json
+STAGING_INDEX_COLUMNS = ("entity_id", "product_id", "order_id", "uid", "variation_id", "purchased_entity", "fid", "tid")
+
+# A single row larger than this is treated as a syntax error rather than
+# reading the rest of the dump into memory looking for its end
+MAX_ROW_BYTES = 256 * 1024 * 1024
+
+# MySQL INSERT syntax, matched on raw bytes. Quoted strings use the unrolled
+# form [^'\\]*(?:(?:\\.|'')[^'\\]*)* so the regex engine scans runs of plain
+# characters instead of alternating per character.
+_STRING = rb"'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'"
+_QUOTED = rb"'([^'\\]*(?:(?:\\.|'')[^'\\]*)*)'"
+# Any other literal: _binary 'bytes', 0xCAFE, X'CAFE', NULL or a number
+_LITERAL = rb"_binary[ ]*" + _STRING + rb"|0x[0-9A-Fa-f]*|[Xx]'[0-9A-Fa-f]*'|NULL|[-+]?[0-9][0-9.eE+-]*|[-+]?\.[0-9][0-9eE+-]*"
+# A value as four groups: the body of a string without escapes, the body of
+# a string with escapes, an unsigned integer or another literal
+_VALUE = (
+    rb"'([^'\\]*)'(?!')|" + _QUOTED + rb"|([0-9]+)(?![0-9.eExX+-])|(" + _LITERAL + rb")"
+)
+_WS = rb"[ \t\r\n]*"
+# One complete row of any width, followed by the ',' or ';' after it
+ROW_REGEX = re.compile(
+    _WS + rb"\(" + _WS + rb"(?:" + _STRING + rb"|" + _LITERAL + rb")"
+    + rb"(?:" + _WS + rb"," + _WS + rb"(?:" + _STRING + rb"|" + _LITERAL + rb"))*" + _WS + rb"\)" + _WS + rb"([,;])",
+    re.DOTALL,
+)
+# The values of a row matched by ROW_REGEX
+VALUE_REGEX = re.compile(_VALUE, re.DOTALL)
+INSERT_HEADER_REGEX = re.compile(
+    rb"(?:INSERT|REPLACE)[ \t\r\n]+(?:IGNORE[ \t\r\n]+)?INTO[ \t\r\n]+`(\w+)`[ \t\r\n]*(?:\(([^)]*)\)[ \t\r\n]*)?VALUES[ \t\r\n]*"
+)
+CREATE_TABLE_REGEX = re.compile(rb"CREATE[ \t\r\n]+TABLE[ \t\r\n]+(?:IF NOT EXISTS[ \t\r\n]+)?`(\w+)`")
+QUOTED_REGEX = re.compile(_QUOTED, re.DOTALL)
+# Characters that end a statement or start a quoted section
+STATEMENT_SPECIAL_REGEX = re.compile(rb"[';`]")
+COMMENT_REGEX = re.compile(rb"(?:--|#)[^\n]*\n|/\*.*?\*/[ \t]*;?", re.DOTALL)
+COLUMN_REGEX = re.compile(rb"^[ \t]*`(\w+)`", re.MULTILINE)
+ESCAPE_REGEX = re.compile(rb"\\(.)|''", re.DOTALL)
+
+# MySQL string escapes; \% and \_ keep their backslash, any other \x is x
+ESCAPES = {b"0": b"\0", b"b": b"\b", b"n": b"\n", b"r": b"\r", b"t": b"\t", b"Z": b"\x1a", b"%": b"\\%", b"_": b"\\_"}
+
+
+def _unescape(match):
+    char = match.group(1)
+    if char is None:
+        return b"'"
+    return ESCAPES.get(char, char)
+
+
+def _sql_string(raw):
+    if b"\\" in raw or b"''" in raw:
+        raw = ESCAPE_REGEX.sub(_unescape, raw)
+    return raw.decode("utf-8", "replace")
+
+
+def _sql_bytes(raw):
+    if b"\\" in raw or b"''" in raw:
+        raw = ESCAPE_REGEX.sub(_unescape, raw)
+    return raw
+
+
+def _sql_number(raw):
     try:
-        if "." in val_str:
-            return float(val_str)
-        return int(val_str)
+        if b"." in raw or b"e" in raw or b"E" in raw:
+            return float(raw)
+        return int(raw)
     except ValueError:
-        return val_str
+        return raw.decode("ascii", "replace")
 
-def parse_insert_values(values_str):
+
+def _sql_other(raw):
+    # A literal matched by _LITERAL
+    if raw == b"NULL":
+        return None
+    if raw.startswith(b"_binary"):
+        return _sql_bytes(QUOTED_REGEX.search(raw).group(1))
+    if raw.startswith(b"0x"):
+        return bytes.fromhex(raw[2:].decode("ascii"))
+    if raw[:2] in (b"X'", b"x'"):
+        return bytes.fromhex(raw[2:-1].decode("ascii"))
+    return _sql_number(raw)
+
+
+@lru_cache(maxsize=None)
+def row_regex(width):
     """
-    Parses the VALUES part of an INSERT statement: (1, 'a'), (2, 'b')
-    Returns a list of lists.
-    This is the tricky part usually done by a lexer.
-    We will implement a simple state machine.
+    Regex matching one row of width values and the ',' or ';' after it
+
+    Its groups are the four groups of _VALUE for every value, then the
+    separator, so a single match() both validates a row and returns its values.
     """
-    rows = []
-    current_row = []
-    current_val = []
-    in_string = False
-    escaped = False
-    
-    # Iterate through chars
-    # We expect the string to start with '(' and end with ')' (for the last row)
-    
-    # Quick hack: If the file is extremely consistent, we might be able to split by "), ("
-    # But usually text fields ruin that.
-    
-    # Let's try a scan
-    vals = []
-    
-    idx = 0
-    length = len(values_str)
-    
-    # Values represent a list of rows
-    # Format: (val1, val2), (val3, val4)
-    
-    # We will split into row strings first if possible, but simplest is to parse char by char
-    
-    row_start = False
-    val_start = False
-    quote_char = None
-    
-    # Optimization: processing 50MB by char in Python is slow.
-    # PHP/Drupal dumps are usually: INSERT INTO x VALUES (row1), (row2);
-    # Regex split might be safer if we assume standard formatting.
-    # Split by `), (` is risky if content has it.
-    
-    # Let's try to interpret the structure.
-    # state: OUTSIDE_ROW, IN_ROW, IN_VAL, IN_STRING
-    
-    state = "OUTSIDE_ROW"
-    current_token = []
-    
-    for i, char in enumerate(values_str):
-        if state == "OUTSIDE_ROW":
-            if char == '(':
-                state = "IN_ROW"
-                current_row = []
-        elif state == "IN_ROW":
-            if char == ')':
-                # End of row
-                # Flush last token
-                if current_token:
-                    val = "".join(current_token).strip()
-                    if val.endswith(","): val = val[:-1] # Should not happen if logic is correct
-                    current_row.append(parse_sql_value(val))
-                    current_token = []
-                
-                rows.append(current_row)
-                state = "OUTSIDE_ROW"
-            elif char == "'":
-                state = "IN_STRING"
-                current_token.append(char)
-            elif char == ',':
-                # End of value
-                val = "".join(current_token).strip()
-                current_row.append(parse_sql_value(val))
-                current_token = []
-            else:
-                current_token.append(char)
-        elif state == "IN_STRING":
-            current_token.append(char)
-            if char == "'" and not escaped:
-                state = "IN_ROW" # Back to row
-            
-            if char == '\\':
-                escaped = not escaped
-            else:
-                escaped = False
+    value = rb"(?:" + _VALUE + rb")"
+    return re.compile(
+        _WS + rb"\(" + _WS + value + (_WS + rb"," + _WS + value) * (width - 1) + _WS + rb"\)" + _WS + rb"([,;])",
+        re.DOTALL,
+    )
+
 
-    return rows
+class _Literals(dict):
+    # Converted literals by their text; a column of prices or NULLs repeats a few
+    def __missing__(self, raw):
+        value = self[raw] = _sql_other(raw)
+        return value
 
-def parse_insert_values_simple(values_str):
+
+def _row_values(groups, literals):
+    # Strings without escapes and integers, the bulk of a dump, are told apart
+    # by the regex and converted without a Python function call
+    return [
+        plain.decode("utf-8", "replace") if plain is not None
+        else int(integer) if integer is not None
+        else _sql_string(escaped) if escaped is not None
+        else literals[literal]
+        for plain, escaped, integer, literal in zip(groups[0:-1:4], groups[1:-1:4], groups[2:-1:4], groups[3:-1:4])
+    ]
+
+
+def parse_rows(buf, pos=0):
     """
-    A simpler parser that assumes standard mysqldump format.
-    It splits by `),(`.
-    WARNING: usage of `),(` in text content will break this.
+    Parse the rows of an INSERT ... VALUES list
+
+    Stops at the terminating ';' or at the first row that is not complete in
+    buf, so a streaming caller can append more data and continue from the
+    returned position.
+
+    Args:
+        buf: bytes, bytearray or mmap holding (part of) the dump
+        pos: Offset of the next row, just after VALUES or after a ',' between rows
+
+    Returns:
+        Tuple of (rows, pos, done): the complete rows as lists of Python values,
+        the offset after the last complete row, and whether the statement ended
     """
-    # Remove leading ( and trailing ); or )
-    s = values_str.strip()
-    if s.endswith(";"): s = s[:-1].strip()
-    if s.endswith(","): s = s[:-1].strip()
-    
-    if s.startswith("("): s = s[1:]
-    if s.endswith(")"): s = s[:-1]
-    
-    # Split by "), (" or "),("
-    # Regex for split
-    row_strings = re.split(r"\),\s*\(", s)
-    
     rows = []
-    for rs in row_strings:
-        # Now parse a single row: val1, 'val2', ...
-        # csv module might handle this if we treat ' as quote char
-        # But CSV doesn't handle NULL or Numbers mixed well without custom dialect
-        
-        # Simple scan for comma, respecting quotes
-        vals = []
-        curr = []
-        in_quote = False
-        escape = False
-        
-        for char in rs:
-            if in_quote:
-                curr.append(char)
-                if char == "'" and not escape:
-                    in_quote = False # potential end
-                    # Check if next char is ' (sql escape)
-                    # Use a lookahead assumption or fix later
-                if char == "\\" and not escape:
-                    escape = True
+    literals = _Literals()
+    width_match = None
+    while True:
+        m = width_match(buf, pos) if width_match is not None else None
+        if m is None:
+            # The first row, or one of another width: match it on its own to
+            # find its values, and the rows after it by their width
+            m = ROW_REGEX.match(buf, pos)
+            if m is None:
+                return rows, pos, False
+            width_match = row_regex(len(VALUE_REGEX.findall(buf, pos, m.start(1)))).match
+            m = width_match(buf, pos)
+        rows.append(_row_values(m.groups(), literals))
+        pos = m.end()
+        if m.group(m.lastindex) == b";":
+            return rows, pos, True
+
+
+class DumpFile:
+    """
+    A SQL dump on disk, read as a binary stream
+
+    gzip, zstd and xz dumps are recognised by their first bytes and
+    decompressed while they are read, so they need not be unpacked to disk
+    first. zstd needs the zstandard package.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.size = self.path.stat().st_size
+        self._raw = open(self.path, "rb")
+        magic = self._raw.read(6)
+        self._raw.seek(0)
+        self.compression = next((name for name, prefix in COMPRESSION_MAGIC.items() if magic.startswith(prefix)), None)
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw)
+        elif self.compression == "xz":
+            self._stream = lzma.LZMAFile(self._raw)
+        elif self.compression == "zstd":
+            if not HAS_ZSTD:
+                self._raw.close()
+                raise RuntimeError(f"{self.path} is zstd-compressed; install the zstandard package to read it")
+            self._stream = zstandard.ZstdDecompressor().stream_reader(self._raw, read_size=BLOCK_SIZE, read_across_frames=True)
+        else:
+            self._stream = self._raw
+        self.bytes_read = 0
+
+    def read(self, size):
+        data = self._stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    @property
+    def disk_bytes_read(self):
+        """Bytes of the file on disk consumed so far."""
+        if self._raw.closed:
+            return self._disk_bytes_read
+        return self._raw.tell()
+
+    def close(self):
+        if self._raw.closed:
+            return
+        self._disk_bytes_read = self._raw.tell()
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DumpReader:
+    """
+    Streaming reader for mysqldump / phpMyAdmin SQL dumps
+
+    Reads the dump in binary blocks and tokenizes it statement by statement,
+    independent of line breaks. Only the current block and a partial row are
+    held in memory.
+
+    INSERT and CREATE TABLE statements of tables that are not wanted are
+    skipped without tokenizing them: mysqldump and phpMyAdmin escape line
+    breaks inside strings, so such a statement ends at the first ';' followed
+    by a line break, which bytes.find locates at memchr speed. Pass
+    fast_skip=False for dumps that contain raw line breaks in strings.
+    """
+
+    def __init__(self, stream, tables=None, block_size=BLOCK_SIZE, fast_skip=True):
+        """
+        Args:
+            stream: Binary file object
+            tables: Names of the tables whose rows are wanted (None for all)
+            block_size: Bytes read at a time
+            fast_skip: Skip unwanted tables by searching for ';' at a line end
+        """
+        self.stream = stream
+        self.tables = set(tables) if tables is not None else None
+        self.block_size = block_size
+        self.fast_skip = fast_skip
+        self.bytes_read = 0
+        self.bytes_skipped = 0
+        self._buf = b""
+        self._pos = 0
+        self._eof = False
+        self._terminator = None
+
+    @property
+    def offset(self):
+        """Offset in the dump of the current position."""
+        return self.bytes_read - len(self._buf) + self._pos
+
+    def _fill(self):
+        """Append the next block to the buffer; returns False at end of file."""
+        if self._eof:
+            return False
+        chunk = self.stream.read(self.block_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self.bytes_read += len(chunk)
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _match(self, regex):
+        """Match regex at the current position, reading more data until it is complete."""
+        while True:
+            m = regex.match(self._buf, self._pos)
+            if m is not None and (m.end() < len(self._buf) or self._eof):
+                return m
+            if not self._fill():
+                return regex.match(self._buf, self._pos)
+
+    def _skip_whitespace(self):
+        while True:
+            buf = self._buf
+            pos = self._pos
+            length = len(buf)
+            while pos < length and buf[pos] in b" \t\r\n":
+                pos += 1
+            self._pos = pos
+            if pos < length or not self._fill():
+                return pos < len(self._buf)
+
+    def _startswith(self, prefix):
+        while len(self._buf) - self._pos < len(prefix) and self._fill():
+            pass
+        return self._buf.startswith(prefix, self._pos)
+
+    def _skip_statement(self):
+        """Skip to after the ';' ending the current statement and return the statement."""
+        offset = 0
+        while True:
+            buf = self._buf
+            start = self._pos
+            m = STATEMENT_SPECIAL_REGEX.search(buf, start + offset)
+            if m is not None:
+                char = m.group()
+                if char == b";":
+                    self._pos = m.end()
+                    return buf[start:self._pos]
+                if char == b"'":
+                    quoted = QUOTED_REGEX.match(buf, m.start())
+                    end = quoted.end() if quoted is not None and quoted.end() < len(buf) else -1
                 else:
-                    escape = False
+                    end = buf.find(b"`", m.end()) + 1 or -1
+                if end != -1:
+                    offset = end - start
+                    continue
+                # The quoted section continues in the next block
+                offset = m.start() - start
             else:
-                if char == "'":
-                    in_quote = True
-                    curr.append(char)
-                elif char == ",":
-                    vals.append("".join(curr))
-                    curr = []
+                offset = len(buf) - start
+            if not self._fill():
+                # Unterminated statement at the end of the dump
+                self._pos = len(self._buf)
+                return self._buf[start:]
+
+    def _skip_to_statement_end(self):
+        """Skip to after the ';' that ends the current statement at a line end."""
+        while True:
+            buf = self._buf
+            if self._terminator is None:
+                # Statements end in ';\r\n' in dumps written on Windows
+                newline = buf.find(b"\n")
+                if newline != -1 or self._eof:
+                    self._terminator = b";\r\n" if newline > 0 and buf[newline - 1] == 13 else b";\n"
+            if self._terminator is not None:
+                end = buf.find(self._terminator, self._pos)
+                if end != -1:
+                    self._pos = end + 1
+                    break
+                # Keep only the bytes that may start a terminator split over two blocks
+                self._pos = max(self._pos, len(buf) - len(self._terminator) + 1)
+            if not self._fill():
+                # Last statement of the dump, without a line break after it
+                self._pos = len(self._buf)
+                return
+
+    def _skip_rest(self):
+        """Skip the rest of the current INSERT or CREATE TABLE statement."""
+        if self.fast_skip:
+            self._skip_to_statement_end()
+        else:
+            self._skip_statement()
+
+    def _skip_unwanted(self):
+        start = self.offset
+        self._skip_rest()
+        self.bytes_skipped += self.offset - start
+
+    def _wanted(self, table):
+        return self.tables is None or table in self.tables
+
+    def events(self, rows=True):
+        """
+        Tokenize the dump
+
+        Args:
+            rows: Parse the rows of wanted INSERTs; if False, only their
+                position is reported so they can be parsed elsewhere
+
+        Yields:
+            ('schema', table, columns) for every CREATE TABLE, and
+            ('rows', table, columns, rows) for batches of INSERT rows of the
+            wanted tables; columns is None when the INSERT has no column list.
+            With rows=False, ('insert', table, columns, start, end) for every
+            wanted INSERT instead, where start is the offset of its first row
+            and end the offset after the statement
+        """
+        while self._skip_whitespace():
+            if self._startswith(b"--") or self._startswith(b"#") or self._startswith(b"/*"):
+                m = self._match(COMMENT_REGEX)
+                if m is None:
+                    self._skip_statement()
                 else:
-                    curr.append(char)
-        
-        if curr:
-            vals.append("".join(curr))
-            
-        # Post-process values
-        parsed_vals = [parse_sql_value(v) for v in vals]
-        rows.append(parsed_vals)
-        
-    return rows
+                    self._pos = m.end()
+                continue
 
+            if self._startswith(b"INSERT") or self._startswith(b"REPLACE"):
+                header = self._match(INSERT_HEADER_REGEX)
+                if header is not None:
+                    table = header.group(1).decode("ascii")
+                    if self._wanted(table):
+                        columns = None
+                        if header.group(2) is not None:
+                            columns = [c.strip().strip("`") for c in header.group(2).decode("utf-8").split(",")]
+                        self._pos = header.end()
+                        if rows:
+                            yield from self._insert_rows(table, columns)
+                        else:
+                            start = self.offset
+                            self._skip_rest()
+                            yield ("insert", table, columns, start, self.offset)
+                        continue
+                    self._skip_unwanted()
+                    continue
+                self._skip_statement()
+                continue
 
-# Better approach for large file: State-based scan of the whole VALUES section is too slow?
-# No, let's just use the python `csv` library logic but custom?
-# Actually, the file is 50MB. Reading it line by line and regex matching is OK.
+            if self._startswith(b"CREATE"):
+                create = self._match(CREATE_TABLE_REGEX)
+                if create is not None and not self._wanted(create.group(1).decode("ascii")):
+                    self._skip_unwanted()
+                    continue
+                body = self._skip_statement()
+                if create is not None:
+                    columns = [c.decode("ascii") for c in COLUMN_REGEX.findall(body)]
+                    yield ("schema", create.group(1).decode("ascii"), columns)
+                continue
 
-def extract_data(sql_file: Path, *, progress: bool = False, progress_interval_s: float = 2.0):
-    schemas = {}
-    data = {}
-    
-    print(f"Reading {sql_file}...")
-    
-    current_table = None
-    current_insert_table = None
-    current_insert_cols = []
-    
-    # Pre-initialize data lists
-    for t in DESIRED_TABLES:
-        data[t] = []
+            self._skip_statement()
+
+    def _insert_rows(self, table, columns):
+        while True:
+            rows, self._pos, done = parse_rows(self._buf, self._pos)
+            if rows:
+                yield ("rows", table, columns, rows)
+            if done:
+                return
+            if len(self._buf) - self._pos > MAX_ROW_BYTES:
+                raise ValueError(f"Cannot parse INSERT INTO `{table}` near byte {self.offset}")
+            if not self._fill():
+                print(f"Warning: INSERT INTO `{table}` is cut off at the end of the dump")
+                return
+
+
+class Row(tuple):
+    """
+    A table row, stored as a tuple
+
+    The column names live once in the row class made by row_type() instead of
+    in every row, and values are looked up by name with get() as in a dict.
+    """
+    __slots__ = ()
+    _index = {}
+
+    def get(self, column, default=None):
+        i = self._index.get(column)
+        return default if i is None else self[i]
+
+    def keys(self):
+        return self._index.keys()
+
+    def as_dict(self):
+        return dict(zip(self._index, self))
+
+    def __repr__(self):
+        return f"Row({self.as_dict()!r})"
+
+
+@lru_cache(maxsize=None)
+def row_type(columns):
+    """
+    Row class for a tuple of column names
+
+    Args:
+        columns: Tuple of column names in the order of the values
+
+    Returns:
+        Subclass of Row; call it with a sequence of values to make a row
+    """
+    return type("Row", (Row,), {"__slots__": (), "_index": {column: i for i, column in enumerate(columns)}})
+
+
+# Types whose equal values are shared; ints are left out so 1 and 1.0 never mix
+SHAREABLE = frozenset((str, float, bytes))
+
+
+class ValuePool:
+    """
+    Shares equal values within low-cardinality columns
+
+    Every parsed string or number is a new object, so a column such as a type,
+    state, currency or price holds the same value a million times. The pool
+    keeps one object per distinct value of a column until the column turns
+    out to have more than max_distinct values.
+    """
+
+    def __init__(self, max_distinct=SHARED_VALUES_MAX):
+        self.max_distinct = max_distinct
+        # (table, column) -> {value: value}, or None for high-cardinality columns
+        self._memos = {}
+
+    def share(self, table, columns, rows):
+        """Replace the str, float and bytes values of rows (lists) by shared objects, in place."""
+        for i, column in enumerate(columns):
+            memo = self._memos.setdefault((table, column), {})
+            if memo is None:
+                continue
+            for row in rows:
+                value = row[i]
+                if value.__class__ in SHAREABLE:
+                    row[i] = memo.setdefault(value, value)
+            if len(memo) > self.max_distinct:
+                self._memos[(table, column)] = None
+
+
+_worker_dump = None
+
+
+def _init_parse_worker(sql_file):
+    # Runs once in every parse process; the mapped pages are shared with the
+    # page cache, so workers read the dump without copying it through a pipe
+    global _worker_dump
+    with open(sql_file, "rb") as f:
+        _worker_dump = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _parse_inserts(inserts):
+    # Rows of INSERT statements given as (table, start, end) offsets
+    results = []
+    for table, start, end in inserts:
+        rows, pos, done = parse_rows(_worker_dump, start)
+        if not done and end < len(_worker_dump):
+            raise ValueError(f"Cannot parse INSERT INTO `{table}` near byte {pos}")
+        results.append((rows, done))
+    return results
+
+
+def dump_events(dump, tables=None, *, fast_skip=True, workers=1):
+    """
+    Tokenize a dump, optionally parsing its INSERT statements in parallel
+
+    With more than one worker the dump is first scanned for the offsets of the
+    wanted INSERT statements, which are skipped like unwanted tables. The
+    statements are then parsed in batches of TASK_BYTES by a process pool that
+    memory-maps the dump; compressed dumps are always parsed in this process.
+
+    Args:
+        dump: DumpFile, or the path of the dump
+        tables: Names of the tables whose rows are wanted (None for all)
+        fast_skip: See DumpReader
+        workers: Number of parse processes; 1 parses in this process
+
+    Yields:
+        The events of DumpReader.events(), with the row batches in dump order
+    """
+    if not isinstance(dump, DumpFile):
+        with DumpFile(dump) as f:
+            yield from dump_events(f, tables, fast_skip=fast_skip, workers=workers)
+        return
+
+    if workers > 1 and dump.compression:
+        print(f"Note: {dump.path} is {dump.compression}-compressed and cannot be memory-mapped; parsing in one process")
+        workers = 1
+    reader = DumpReader(dump, tables, fast_skip=fast_skip)
+    if workers <= 1:
+        yield from reader.events()
+        return
+
+    inserts = []
+    for event in reader.events(rows=False):
+        if event[0] == "schema":
+            yield event
+        else:
+            inserts.append(event)
+
+    tasks = []
+    task_bytes = 0
+    for insert in inserts:
+        if not tasks or task_bytes >= TASK_BYTES:
+            tasks.append([])
+            task_bytes = 0
+        tasks[-1].append(insert)
+        task_bytes += insert[4] - insert[3]
+    if not tasks:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker, initargs=(str(dump.path),)) as pool:
+        offsets = [[(table, start, end) for _, table, _, start, end in task] for task in tasks]
+        # map() returns the batches in order, so rows keep their dump order
+        for task, results in zip(tasks, pool.map(_parse_inserts, offsets)):
+            for (_, table, columns, _, _), (rows, done) in zip(task, results):
+                if rows:
+                    yield ("rows", table, columns, rows)
+                if not done:
+                    print(f"Warning: INSERT INTO `{table}` is cut off at the end of the dump")
+
+
+def extract_batches(
+    sql_file: Path,
+    schemas: dict,
+    *,
+    progress: bool = False,
+    progress_interval_s: float = 2.0,
+    fast_skip: bool = True,
+    workers: int = 1,
+):
+    """
+    Parse the rows of DESIRED_TABLES from a SQL dump in batches
+
+    Args:
+        sql_file: Path of the dump, which may be gzip, zstd or xz-compressed
+        schemas: Dictionary that receives the column names per table
+        progress, progress_interval_s, fast_skip, workers: See extract_data
+
+    Yields:
+        Tuples of (table, columns, rows) with rows as lists of values; rows
+        whose width does not match the columns are left out
+    """
+    dump = DumpFile(sql_file)
+    compressed = f", {dump.compression}-compressed" if dump.compression else ""
+    print(f"Reading {sql_file} ({dump.size / 2**20:,.0f} MB on disk{compressed})...")
 
     rows_by_table = {t: 0 for t in DESIRED_TABLES}
-    last_progress = time.monotonic()
+    started = last_progress = time.monotonic()
     last_table = None
 
     def maybe_report_progress(force: bool = False):
@@ -243,94 +691,206 @@ def extract_data(sql_file: Path, *, progress: bool = False, progress_interval_s:
         files = rows_by_table.get("file_managed", 0)
         table_hint = f" (table: {last_table})" if last_table else ""
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        elapsed = max(now - started, 1e-9)
+        sql_mb = dump.bytes_read / 2**20
+        disk_mb = dump.disk_bytes_read / 2**20
+        throughput = f"SQL {sql_mb:,.0f} MB at {sql_mb / elapsed:,.1f} MB/s"
+        if dump.compression:
+            throughput += f", disk {disk_mb:,.0f} MB at {disk_mb / elapsed:,.1f} MB/s"
+        throughput += f", {dump.disk_bytes_read / max(dump.size, 1):.0%} of {dump.size / 2**20:,.0f} MB"
 
         print(
             f"[{ts}] ...parsed rows — courses:{products:,} lessons:{variations:,} "
-            f"orders:{orders:,} items:{order_items:,} users:{users:,} files:{files:,}{table_hint}"
+            f"orders:{orders:,} items:{order_items:,} users:{users:,} files:{files:,}{table_hint} — {throughput}"
         )
 
-    with open(sql_file, 'r', encoding='utf-8', errors='replace') as f:
-        for line in f:
-            line_stripped = line.strip()
-            if not line_stripped:
+    with dump:
+        for event in dump_events(dump, DESIRED_TABLES, fast_skip=fast_skip, workers=workers):
+            if event[0] == "schema":
+                _, table, columns = event
+                schemas[table] = columns
                 continue
 
-            # 1. Parse CREATE TABLE
-            if line_stripped.startswith("CREATE TABLE"):
-                match = re.search(r"CREATE TABLE `(\w+)`", line_stripped)
-                if match:
-                    current_table = match.group(1)
-                    schemas[current_table] = []
-                    current_insert_table = None # Reset insert state if new table creation starts
-            
-            # Detect columns inside create table (simplified)
-            if current_table and line_stripped.startswith("`") and not line_stripped.startswith("CREATE"):
-                # `col_name` type ...
-                col_match = re.search(r"`(\w+)`", line_stripped)
-                if col_match:
-                    schemas[current_table].append(col_match.group(1))
-
-            if line_stripped.startswith(") ENGINE"):
-                current_table = None
-
-            # 2. Parse INSERT INTO
-            if line_stripped.startswith("INSERT INTO"):
-                match = INSERT_INTO_REGEX.match(line_stripped)
-                if match:
-                    table_name = match.group(1)
-                    if table_name in DESIRED_TABLES:
-                        current_insert_table = table_name
-                        cols_str = match.group(2)
-                        current_insert_cols = [c.strip().strip('`') for c in cols_str.split(',')]
-
-                        last_table = current_insert_table
-
-                        values_part = line_stripped[match.end():].strip()
-                        if values_part.startswith("VALUES"):
-                            values_part = values_part[6:].strip()
-
-                        if values_part:
-                            # There is content on the first line
-                            try:
-                                rows = parse_insert_values_simple(values_part)
-                                for row in rows:
-                                    if len(row) == len(current_insert_cols):
-                                        data[current_insert_table].append(dict(zip(current_insert_cols, row)))
-                                        rows_by_table[current_insert_table] += 1
-                                        maybe_report_progress()
-                            except Exception as e:
-                                # print(f"Error parsing line: {e}")
-                                pass
-
-                        if line_stripped.endswith(";"):
-                            current_insert_table = None
-                    else:
-                        current_insert_table = None
-                else:
-                    current_insert_table = None
-
-            elif current_insert_table:
-                # Continuation of INSERT
-                # line likely starts with (
-                if line_stripped.startswith("(") or line_stripped.startswith("0x"): # Sometimes just hex? No, rows are always parens
-                    try:
-                        rows = parse_insert_values_simple(line_stripped)
-                        for row in rows:
-                            if len(row) == len(current_insert_cols):
-                                data[current_insert_table].append(dict(zip(current_insert_cols, row)))
-                                rows_by_table[current_insert_table] += 1
-                                maybe_report_progress()
-                    except Exception as e:
-                         # print(f"Error parsing continuation line: {e}")
-                         pass
-                
-                if line_stripped.endswith(";"):
-                    current_insert_table = None
+            _, table, columns, rows = event
+            if columns is None:
+                # INSERT without a column list: use the CREATE TABLE order
+                columns = schemas.get(table, [])
+            last_table = table
+            width = len(columns)
+            rows = [row for row in rows if len(row) == width]
+            yield table, columns, rows
+            rows_by_table[table] += len(rows)
+            maybe_report_progress()
 
     maybe_report_progress(force=True)
+
+
+def extract_data(
+    sql_file: Path,
+    *,
+    progress: bool = False,
+    progress_interval_s: float = 2.0,
+    fast_skip: bool = True,
+    workers: int = 1,
+):
+    """
+    Extract the rows of DESIRED_TABLES from a SQL dump
+
+    Returns:
+        Tuple of (schemas, data): the column names per table, and per table a
+        list of Row tuples whose values are read with row.get(column)
+    """
+    schemas = {}
+    data = {t: [] for t in DESIRED_TABLES}
+    values = ValuePool()
+    batches = extract_batches(
+        sql_file,
+        schemas,
+        progress=progress,
+        progress_interval_s=progress_interval_s,
+        fast_skip=fast_skip,
+        workers=workers,
+    )
+    for table, columns, rows in batches:
+        values.share(table, columns, rows)
+        data[table].extend(map(row_type(tuple(columns)), rows))
     return schemas, data
 
-def reconstruct_json(data, *, progress: bool = False, progress_interval_s: float = 2.0):
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def export_sqlite(
+    sql_file: Path,
+    db_path: Path,
+    *,
+    progress: bool = False,
+    progress_interval_s: float = 2.0,
+    fast_skip: bool = True,
+    workers: int = 1,
+):
+    """
+    Write the rows of DESIRED_TABLES from a SQL dump to a SQLite staging database
+
+    Tables keep the names and columns of the dump. Columns have no declared
+    type, so values keep the type they were parsed as (int, float, str, bytes
+    or NULL). Rows are inserted batch by batch as they are parsed, and the
+    indexes on STAGING_INDEX_COLUMNS are created after loading. An existing
+    database at db_path is replaced.
+
+    Returns:
+        Dictionary with the number of rows written per table
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    if db_path.exists():
+        db_path.unlink()
+
+    schemas = {}
+    created = {}
+    counts = dict.fromkeys(DESIRED_TABLES, 0)
+    conn = sqlite3.connect(db_path)
+    try:
+        # A staging database is rebuilt from the dump when anything goes wrong
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        with conn:
+            batches = extract_batches(
+                sql_file,
+                schemas,
+                progress=progress,
+                progress_interval_s=progress_interval_s,
+                fast_skip=fast_skip,
+                workers=workers,
+            )
+            for table, columns, rows in batches:
+                known = created.get(table)
+                if known is None:
+                    known = created[table] = list(dict.fromkeys(schemas.get(table) or columns))
+                    conn.execute(f"CREATE TABLE {_quote(table)} ({', '.join(map(_quote, known))})")
+                for column in columns:
+                    if column not in known:
+                        conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}")
+                        known.append(column)
+                conn.executemany(
+                    f"INSERT INTO {_quote(table)} ({', '.join(map(_quote, columns))}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    rows,
+                )
+                counts[table] += len(rows)
+
+            # Tables without rows are still created, so queries on them work
+            for table, columns in schemas.items():
+                if table not in created and columns:
+                    created[table] = columns
+                    conn.execute(f"CREATE TABLE {_quote(table)} ({', '.join(map(_quote, columns))})")
+
+            for table, columns in created.items():
+                for column in STAGING_INDEX_COLUMNS:
+                    if column in columns:
+                        conn.execute(
+                            f"CREATE INDEX {_quote(f'idx_{table}_{column}')} ON {_quote(table)} ({_quote(column)})"
+                        )
+    finally:
+        conn.close()
+    return counts
+
+
+class StagingTable:
+    """Rows of one staging table, read through a new cursor on every iteration."""
+
+    def __init__(self, conn, table):
+        self.conn = conn
+        self.table = table
+
+    def __iter__(self):
+        cursor = self.conn.execute(f"SELECT * FROM {_quote(self.table)} ORDER BY rowid")
+        make_row = row_type(tuple(d[0] for d in cursor.description))
+        return map(make_row, cursor)
+
+    def __len__(self):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {_quote(self.table)}").fetchone()[0]
+
+
+class StagingTables:
+    """
+    A staging database written by export_sqlite, in the shape of extract_data()'s data
+
+    staging[table] streams the rows of the table as Row tuples in dump order,
+    so reconstruct_json(StagingTables(path)) builds the JSON without holding
+    the extracted tables in memory. The database is opened read-only.
+    """
+
+    def __init__(self, db_path: Path):
+        self.conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+        self.tables = [name for (name,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+    def __contains__(self, table):
+        return table in self.tables
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def __getitem__(self, table):
+        if table not in self.tables:
+            raise KeyError(table)
+        return StagingTable(self.conn, table)
+
+    def close(self):
+        self.conn.close()
+
+def reconstruct_records(data, *, progress: bool = False, progress_interval_s: float = 2.0):
+    """
+    Build the courses, orders and teachers from the extracted tables
+
+    Args:
+        data: Rows per table, as returned by extract_data() or StagingTables
+
+    Yields:
+        Tuples of (record type, record): all 'course' records, then all
+        'order' records, then all 'teacher' records
+    """
     last_progress = time.monotonic()
 
     def maybe_report(stage: str, *, force: bool = False, **counts):
@@ -509,35 +1069,20 @@ def reconstruct_json(data, *, progress: bool = False, progress_interval_s: float
 
     # 6. Process Orders
     # Link Orders -> Items -> Variations -> Products
-    # We want to attach students/orders to the Lessons (Variations) or to the output?
-    # Let's add a top-level list of orders for now, or attach "attendees" to lessons.
-    
-    # Let's map orders
-    all_orders = []
+    # Attendees are attached to the lessons in a first pass over the items;
+    # the order records themselves are built one at a time while they are
+    # yielded, from the item rows grouped per order.
     orders_map = {}
     
     if "commerce_order" in data:
         for idx, o in enumerate(data["commerce_order"], start=1):
-            oid = o.get('order_id')
-            uid = o.get('uid')
-            
-            order_obj = {
-                "id": oid,
-                "order_number": o.get('order_number'),
-                "mail": o.get('mail'),
-                "state": o.get('state'),
-                "total_price": o.get('total_price__number'),
-                "currency": o.get('total_price__currency_code'),
-                "owner": users.get(uid),
-                "items": []
-            }
-            orders_map[oid] = order_obj
-            all_orders.append(order_obj)
+            orders_map[o.get('order_id')] = o
             maybe_report("orders", orders=idx, courses=len(result_courses), lessons=len(variations))
 
     # Map Items
+    items_by_order = {}
+    attendees_count = 0
     if "commerce_order_item" in data:
-        attendees_count = 0
         for idx, item in enumerate(data["commerce_order_item"], start=1):
             oid = item.get('order_id')
             vid = item.get('purchased_entity') # Check if this column exists or if it is in another field table
@@ -546,28 +1091,21 @@ def reconstruct_json(data, *, progress: bool = False, progress_interval_s: float
             # but stricly it might be in commerce_order_item_field_data? 
             # If the script fails we will know)
             
-            if oid in orders_map:
-                line_item = {
-                    "id": item.get('order_item_id'),
-                    "type": item.get('type'),
-                    "quantity": item.get('quantity'),
-                    "unit_price": item.get('unit_price__number'),
-                    "total_price": item.get('total_price__number'),
-                    "product_variation_id": vid,
-                    # We can try to attach the variation title directly
-                    "product_title": variations.get(vid, {}).get('title') if vid else "Unknown"
-                }
-                orders_map[oid]["items"].append(line_item)
+            order = orders_map.get(oid)
+            if order is not None:
+                items_by_order.setdefault(oid, []).append(item)
                 
                 # Reverse link: Add student to lesson
-                if vid in variations:
-                   if "attendees" not in variations[vid]: variations[vid]["attendees"] = []
+                variation = variations.get(vid)
+                if variation is not None:
+                   attendees = variation.setdefault("attendees", [])
                    # The attendee is the owner of the order? Or separate registration entity?
                    # Assuming order owner for now.
-                   if orders_map[oid]["owner"]:
-                       variations[vid]["attendees"].append({
-                           "name": orders_map[oid]["owner"]["name"],
-                           "mail": orders_map[oid]["owner"]["mail"],
+                   owner = users.get(order.get('uid'))
+                   if owner:
+                       attendees.append({
+                           "name": owner["name"],
+                           "mail": owner["mail"],
                            "order_id": oid
                        })
                        attendees_count += 1
@@ -585,16 +1123,300 @@ def reconstruct_json(data, *, progress: bool = False, progress_interval_s: float
             force=True,
             courses=len(result_courses),
             lessons=len(variations),
-            orders=len(all_orders),
+            orders=len(orders_map),
             participants=attendees_count,
         )
 
-    return {"courses": result_courses, "orders": all_orders, "teachers": [u for u in users.values() if "lesgever" in u["roles"] or u["id"] in [t["id"] for c in result_courses for l in c["lessons"] if "teachers" in l for t in l["teachers"]]]}
+    for course in result_courses:
+        yield "course", course
+
+    for oid, o in orders_map.items():
+        items = []
+        for item in items_by_order.pop(oid, ()):
+            vid = item.get('purchased_entity')
+            items.append({
+                "id": item.get('order_item_id'),
+                "type": item.get('type'),
+                "quantity": item.get('quantity'),
+                "unit_price": item.get('unit_price__number'),
+                "total_price": item.get('total_price__number'),
+                "product_variation_id": vid,
+                # We can try to attach the variation title directly
+                "product_title": variations.get(vid, {}).get('title') if vid else "Unknown"
+            })
+        yield "order", {
+            "id": oid,
+            "order_number": o.get('order_number'),
+            "mail": o.get('mail'),
+            "state": o.get('state'),
+            "total_price": o.get('total_price__number'),
+            "currency": o.get('total_price__currency_code'),
+            "owner": users.get(o.get('uid')),
+            "items": items
+        }
+
+    # Teachers are users with the lesgever role or assigned to a lesson of a
+    # course; the ids are collected once instead of for every user
+    teacher_ids = {t["id"] for c in result_courses for l in c["lessons"] for t in l.get("teachers", ())}
+    for u in users.values():
+        if "lesgever" in u["roles"] or u["id"] in teacher_ids:
+            yield "teacher", u
+
+
+def reconstruct_json(data, *, progress: bool = False, progress_interval_s: float = 2.0):
+    """
+    Build the courses/orders/teachers structure from the extracted tables
+
+    Returns:
+        Dictionary with lists of courses, orders and teachers
+    """
+    result = {section: [] for section in OUTPUT_SECTIONS.values()}
+    for record_type, record in reconstruct_records(data, progress=progress, progress_interval_s=progress_interval_s):
+        result[OUTPUT_SECTIONS[record_type]].append(record)
+    return result
+
+
+def open_output(path: Path):
+    """Open an output file for writing text, gzip-compressed when the path ends in .gz."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".gz":
+        # Level 6 compresses about as well as the default 9 in a fraction of the time
+        return gzip.open(path, "wt", compresslevel=6, encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def open_input(path: Path):
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+class OutputWriter:
+    """
+    Writes the reconstructed records as they are produced
+
+    Formats:
+        json: one compact JSON document {"courses": [...], "orders": [...], "teachers": [...]}
+        pretty: the same document indented by 2 spaces
+        ndjson: one {"type": ..., "record": ...} line per record, as written by
+            getdata/ndjson_output.py
+
+    Records of a section must be written together, in the order of
+    OUTPUT_SECTIONS, as reconstruct_records() yields them. A path ending in
+    .gz is gzip-compressed.
+    """
+
+    def __init__(self, path: Path, fmt: str = "json"):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {fmt!r}")
+        self.path = Path(path)
+        self.format = fmt
+        self.counts = dict.fromkeys(OUTPUT_SECTIONS, 0)
+        self._section = None
+        self._file = open_output(self.path)
+        if fmt == "json":
+            self._file.write("{")
+        elif fmt == "pretty":
+            self._file.write("{\n")
+
+    def _begin_section(self, record_type):
+        separator = "" if record_type == next(iter(OUTPUT_SECTIONS)) else ","
+        name = json.dumps(OUTPUT_SECTIONS[record_type])
+        if self.format == "json":
+            self._file.write(f"{separator}{name}:[")
+        else:
+            self._file.write(f"{separator}\n  {name}: [" if separator else f"  {name}: [")
+
+    def _end_section(self, record_type):
+        empty = self.counts[record_type] == 0
+        self._file.write("]" if self.format == "json" or empty else "\n  ]")
+
+    def _move_to(self, record_type):
+        """Close the current section and open the one of record_type; sections in between stay empty."""
+        order = list(OUTPUT_SECTIONS)
+        if self._section is not None:
+            self._end_section(self._section)
+        first = 0 if self._section is None else order.index(self._section) + 1
+        for section in order[first:order.index(record_type) + 1]:
+            self._begin_section(section)
+            if section != record_type:
+                self._end_section(section)
+        self._section = record_type
+
+    def write(self, record_type, record):
+        """Append one record of the given type ('course', 'order' or 'teacher')."""
+        if self.format == "ndjson":
+            self._file.write(json.dumps({"type": record_type, "record": record}, ensure_ascii=False, default=str) + "\n")
+        else:
+            if record_type != self._section:
+                self._move_to(record_type)
+            first = self.counts[record_type] == 0
+            if self.format == "json":
+                self._file.write(("" if first else ",") + json.dumps(record, separators=(",", ":"), default=str))
+            else:
+                # json.dump(indent=2) of the whole document puts records at depth 2
+                text = json.dumps(record, indent=2, default=str).replace("\n", "\n    ")
+                self._file.write(("\n    " if first else ",\n    ") + text)
+        self.counts[record_type] += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.format != "ndjson":
+            last = list(OUTPUT_SECTIONS)[-1]
+            if self._section != last:
+                self._move_to(last)
+            self._end_section(last)
+            self._file.write("}" if self.format == "json" else "\n}")
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_output(path: Path):
+    """
+    Read the records of an earlier extract_data.py output or staging database
+
+    Args:
+        path: Output file in any format (.gz for gzip), or a SQLite staging
+            database written with --sqlite
+
+    Yields:
+        Tuples of (record type, record) as reconstruct_records() yields them
+    """
+    with open(path, "rb") as f:
+        is_sqlite = f.read(16) == b"SQLite format 3\0"
+    if is_sqlite:
+        staging = StagingTables(path)
+        try:
+            yield from reconstruct_records(staging)
+        finally:
+            staging.close()
+        return
+
+    with open_input(path) as f:
+        first_line = f.readline()
+        try:
+            first = json.loads(first_line)
+        except ValueError:
+            first = None
+        if isinstance(first, dict) and "type" in first and "record" in first:
+            # NDJSON, read line by line
+            yield first["type"], first["record"]
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield entry["type"], entry["record"]
+            return
+        document = first if isinstance(first, dict) else json.loads(first_line + f.read())
+    for record_type, section in OUTPUT_SECTIONS.items():
+        for record in document.get(section, []):
+            yield record_type, record
+
+
+def fingerprint(record):
+    """Digest of a record that is the same before and after a round trip through the JSON output."""
+    text = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def delta_entities(records):
+    """
+    Split reconstructed records into the entities a delta is made of
+
+    Courses are compared without their lessons, lessons (with a course_id)
+    without their attendees, and every attendee separately (with a lesson_id).
+
+    Yields:
+        Tuples of (kind, key, entity) with kind one of DELTA_KINDS
+    """
+    for record_type, record in records:
+        if record_type == "order":
+            yield "orders", record["id"], record
+        elif record_type == "course":
+            yield "courses", record["id"], {k: v for k, v in record.items() if k != "lessons"}
+            for lesson in record["lessons"]:
+                yield "lessons", lesson["id"], {**{k: v for k, v in lesson.items() if k != "attendees"}, "course_id": record["id"]}
+                # An order with two items for the same lesson has two attendees
+                seen = {}
+                for attendee in lesson.get("attendees", []):
+                    n = seen[attendee["order_id"]] = seen.get(attendee["order_id"], 0) + 1
+                    yield "attendees", (lesson["id"], attendee["order_id"], n), {**attendee, "lesson_id": lesson["id"]}
+
+
+def compute_delta(records, previous_records):
+    """
+    Compare the records of this extraction with those of an earlier one
+
+    Only fingerprints of the earlier records are kept, and the current
+    records are compared as they are produced.
+
+    Args:
+        records: (record type, record) tuples of this extraction
+        previous_records: (record type, record) tuples of the earlier one
+
+    Returns:
+        Dictionary with per kind in DELTA_KINDS the added and changed entities
+        and the keys of the removed ones
+    """
+    previous = {kind: {} for kind in DELTA_KINDS}
+    for kind, key, entity in delta_entities(previous_records):
+        previous[kind][key] = fingerprint(entity)
+
+    delta = {kind: {"added": [], "changed": [], "removed": []} for kind in DELTA_KINDS}
+    for kind, key, entity in delta_entities(records):
+        old = previous[kind].pop(key, None)
+        if old is None:
+            delta[kind]["added"].append(entity)
+        elif old != fingerprint(entity):
+            delta[kind]["changed"].append(entity)
+    for kind, remaining in previous.items():
+        for key in remaining:
+            if kind == "attendees":
+                lesson_id, order_id, _ = key
+                key = {"lesson_id": lesson_id, "order_id": order_id}
+            delta[kind]["removed"].append(key)
+    return delta
+
+
+def write_delta(delta, path: Path, fmt: str = "json", since=None):
+    """
+    Write a delta from compute_delta()
+
+    The json and pretty formats write {"since": ..., "courses": {"added": [...],
+    "changed": [...], "removed": [...]}, "lessons": ..., ...}; ndjson writes
+    one {"type": kind, "change": ..., "record": ...} line per entity.
+    """
+    with open_output(path) as f:
+        if fmt == "ndjson":
+            for kind, changes in delta.items():
+                for change, entities in changes.items():
+                    for entity in entities:
+                        f.write(json.dumps({"type": kind, "change": change, "record": entity}, ensure_ascii=False, default=str) + "\n")
+        else:
+            document = {"since": str(since) if since else None, **delta}
+            if fmt == "pretty":
+                json.dump(document, f, indent=2, default=str)
+            else:
+                json.dump(document, f, separators=(",", ":"), default=str)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Extract course/order data from a Drupal Commerce SQL dump")
-    parser.add_argument("--sql-file", type=Path, default=SQL_FILE, help="Path to the SQL dump")
-    parser.add_argument("--output-file", type=Path, default=OUTPUT_FILE, help="Path to write the extracted JSON")
+    parser.add_argument("--sql-file", type=Path, default=SQL_FILE, help="Path to the SQL dump (.sql, or compressed with gzip, zstd or xz)")
+    parser.add_argument("--output-file", type=Path, default=OUTPUT_FILE, help="Path to write the extracted JSON (.gz for gzip)")
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="json",
+        help="Output format: compact JSON, indented JSON or one record per line (default: json)",
+    )
     parser.add_argument(
         "--progress",
         action="store_true",
@@ -606,26 +1428,81 @@ if __name__ == "__main__":
         default=2.0,
         help="Minimum seconds between progress messages (default: 2.0)",
     )
+    parser.add_argument(
+        "--no-fast-skip",
+        action="store_true",
+        help="Tokenize unwanted tables instead of skipping to the next ';' at a line end "
+             "(for dumps with unescaped line breaks in strings)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes parsing INSERT statements in parallel (default: 1, parse in this process)",
+    )
+    parser.add_argument(
+        "--sqlite",
+        type=Path,
+        help="Write the extracted tables to this SQLite staging database and build the JSON from it",
+    )
+    parser.add_argument(
+        "--no-json",
+        action="store_true",
+        help="With --sqlite, stop after writing the staging database",
+    )
+    parser.add_argument(
+        "--since",
+        type=Path,
+        help="Earlier output file or --sqlite staging database; write only the added, changed and "
+             "removed courses, lessons, attendees and orders to the output file",
+    )
     args = parser.parse_args()
+    if args.no_json and not args.sqlite:
+        parser.error("--no-json requires --sqlite")
+    if args.since and args.sqlite and args.since.resolve() == args.sqlite.resolve():
+        parser.error("--since must not be the staging database that --sqlite replaces")
 
-    schemas, data = extract_data(args.sql_file, progress=args.progress, progress_interval_s=args.progress_interval)
+    extract_options = dict(
+        progress=args.progress,
+        progress_interval_s=args.progress_interval,
+        fast_skip=not args.no_fast_skip,
+        workers=args.workers,
+    )
+    if args.sqlite:
+        counts = export_sqlite(args.sql_file, args.sqlite, **extract_options)
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{ts}] Wrote {sum(counts.values()):,} rows to {args.sqlite}")
+        if args.no_json:
+            sys.exit(0)
+        data = StagingTables(args.sqlite)
+    else:
+        schemas, data = extract_data(args.sql_file, **extract_options)
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{ts}] Extraction complete. Reconstructing JSON...")
-    json_output = reconstruct_json(data, progress=args.progress, progress_interval_s=args.progress_interval)
-
-    # Save
-    args.output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(args.output_file, 'w', encoding='utf-8') as f:
-        json.dump(json_output, f, indent=2, default=str)
-
-    courses_count = len(json_output.get("courses", []))
-    lessons_count = sum(len(c.get("lessons", [])) for c in json_output.get("courses", []))
-    participants_count = sum(
-        len(l.get("attendees", []))
-        for c in json_output.get("courses", [])
-        for l in c.get("lessons", [])
-        if isinstance(l, dict)
-    )
+
+    if args.since:
+        records = reconstruct_records(data, progress=args.progress, progress_interval_s=args.progress_interval)
+        delta = compute_delta(records, read_output(args.since))
+        write_delta(delta, args.output_file, args.format, since=args.since)
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        summary = ", ".join(
+            f"{kind} +{len(changes['added'])} ~{len(changes['changed'])} -{len(changes['removed'])}"
+            for kind, changes in delta.items()
+        )
+        print(f"[{ts}] Saved changes since {args.since} ({summary}) to {args.output_file}")
+        sys.exit(0)
+
+    # Records are written as they are built, so the document is never held in memory as a whole
+    lessons_count = 0
+    participants_count = 0
+    with OutputWriter(args.output_file, args.format) as writer:
+        for record_type, record in reconstruct_records(data, progress=args.progress, progress_interval_s=args.progress_interval):
+            writer.write(record_type, record)
+            if record_type == "course":
+                lessons_count += len(record["lessons"])
+                participants_count += sum(len(l.get("attendees", [])) for l in record["lessons"] if isinstance(l, dict))
+
+    courses_count = writer.counts["course"]
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(
         f"[{ts}] Saved {courses_count} courses, {lessons_count} lessons, {participants_count} participants to {args.output_file}"
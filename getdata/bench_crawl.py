@@ -0,0 +1,125 @@
+"""
+Wall-clock benchmark of the scraper against the local stand-in server
+
+Runs the sequential crawl (one request at a time, as scrape2.py used to do) and
+the asyncio crawl engine against the same synthetic sites, checks that both
+produce the same data and reports the speedup. With --cache the engine is run
+twice more against a fresh HTTP cache to show the cost of a repeat crawl in
+which nothing changed.
+
+Usage:
+    python bench_crawl.py [--academies 10] [--latency 0.05] [--concurrency 16] [--per-host 4]
+                          [--extract-workers 0] [--cache [--sitemap]]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import scrape2
+from crawler import Crawler
+from http_cache import ResponseCache
+from standin_server import start_standin, stop_standin
+
+
+def crawl_sequential(academies):
+    """
+    Crawl all academies one request at a time
+
+    This is the loop scrape2.py ran before the crawl engine existed and serves
+    as the baseline for the benchmark.
+    """
+    all_data = scrape2.new_all_data()
+    offerings_dict = {}
+    teachers_dict = {}
+
+    for academy in academies:
+        introduction = scrape2.scrape_academy_introduction(academy['base_url'], academy['name'])
+        all_data['academies'].append(scrape2.build_academy_data(academy, introduction))
+
+        categories = scrape2.scrape_categories(academy['url'], academy['name'])
+        if categories:
+            all_data['categories'].extend(categories)
+            for category in categories:
+                category_offerings = scrape2.scrape_offerings(category['link'], category['name'], academy['name'])
+                scrape2.merge_category_offerings(offerings_dict, academy['name'], category, category_offerings)
+
+    for url, offering in offerings_dict.items():
+        details = scrape2.scrape_offering_details(url, offering['title'], offering['academy'])
+        details['categories'] = offering['categories']
+        scrape2.collect_teachers(details, teachers_dict)
+        offerings_dict[url] = details
+
+    for teacher_url, teacher_basic in teachers_dict.items():
+        teacher_details = scrape2.scrape_teacher_details(teacher_url, teacher_basic['name'])
+        if teacher_details:
+            teachers_dict[teacher_url] = teacher_details
+
+    all_data['offerings'] = list(offerings_dict.values())
+    all_data['teachers'] = list(teachers_dict.values())
+    return all_data
+
+
+def timed(label, func):
+    # The scraper prints a line per page; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:8.2f} s")
+    return result, elapsed
+
+
+def comparable(all_data):
+    return {key: value for key, value in all_data.items() if key != 'scraped_at'}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs concurrent crawling against the stand-in server")
+    parser.add_argument("--academies", type=int, default=10, help="Number of stand-in academies (default: 10)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of delay per response (default: 0.05)")
+    parser.add_argument("--offerings", type=int, default=10, help="Offerings per academy (default: 10)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Global concurrency of the engine (default: 16)")
+    parser.add_argument("--per-host", type=int, default=4, help="Per-host concurrency of the engine (default: 4)")
+    parser.add_argument("--extract-workers", type=int, default=0, help="Extraction processes of the engine (default: 0, parse inline)")
+    parser.add_argument("--skip-sequential", action="store_true", help="Only time the crawl engine")
+    parser.add_argument("--cache", action="store_true", help="Also time a cold and a warm run with the HTTP cache")
+    parser.add_argument("--sitemap", action="store_true", help="Use sitemap change detection in the cache runs")
+    args = parser.parse_args()
+
+    servers, base_urls = start_standin(args.academies, args.latency, offerings=args.offerings)
+    academies = scrape2.academies_for_base_urls(base_urls)
+    try:
+        print(f"Stand-in: {args.academies} academies, {args.latency * 1000:.0f} ms latency per request")
+
+        crawler = Crawler(concurrency=args.concurrency, per_host=args.per_host, extract_workers=args.extract_workers)
+        engine_data, engine_time = timed("engine", lambda: asyncio.run(crawler.crawl(academies)))
+        print(f"{'requests':<12} {crawler.request_count:8d}")
+
+        if not args.skip_sequential:
+            sequential_data, sequential_time = timed("sequential", lambda: crawl_sequential(academies))
+            print(f"{'speedup':<12} {sequential_time / engine_time:8.1f} x")
+            if comparable(sequential_data) == comparable(engine_data):
+                print("Output identical to the sequential crawl")
+            else:
+                print("WARNING: output differs from the sequential crawl")
+
+        if args.cache:
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = ResponseCache(os.path.join(tmp, 'http_cache.sqlite3'))
+                for label in ("cold cache", "warm cache"):
+                    crawler = Crawler(
+                        concurrency=args.concurrency, per_host=args.per_host, cache=cache,
+                        extract_workers=args.extract_workers, sitemap=args.sitemap,
+                    )
+                    cached_data, _ = timed(label, lambda: asyncio.run(crawler.crawl(academies)))
+                    print(f"  {crawler.request_count} requests; {cache.summary()}")
+                    cache.stats = dict.fromkeys(cache.stats, 0)
+                cache.close()
+            if comparable(cached_data) != comparable(engine_data):
+                print("WARNING: cached output differs from the uncached crawl")
+    finally:
+        stop_standin(servers)
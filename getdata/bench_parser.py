@@ -0,0 +1,127 @@
+"""
+Micro-benchmark of the HTML parser backends used by scrape2.py
+
+Parses a set of saved pages with every available backend (html.parser, lxml,
+html5lib) and reports pages per second per page type. Records are compared
+with the html.parser output, the scraper's default: the benchmark exits with
+status 1 when a backend extracts different data, because switching to it would
+change the stored HTML.
+
+Fixture pages are read from a directory with one sub-directory per page type:
+homepage/, program/, category/, offering/ and teacher/, each holding *.html
+files. Without --fixtures the pages of the local stand-in server are used;
+--save-fixtures writes those to a directory as a starting point.
+
+Usage:
+    python bench_parser.py [--fixtures DIR] [--repeat 3]
+    python bench_parser.py --save-fixtures fixtures/
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import html_parser
+import scrape2
+from standin_server import StandinSite
+
+FIXTURE_URL = 'https://fixture.ugent.be'
+
+PARSERS = {
+    'homepage': lambda html: scrape2.parse_academy_introduction(html, FIXTURE_URL),
+    'program': lambda html: scrape2.parse_categories(html, f"{FIXTURE_URL}/programma", 'Fixture'),
+    'category': lambda html: scrape2.parse_offerings(html, f"{FIXTURE_URL}/programma/categorie", 'Fixture', 'Fixture'),
+    'offering': lambda html: scrape2.parse_offering_details(html, f"{FIXTURE_URL}/cursus", 'Fixture', 'Fixture'),
+    'teacher': lambda html: scrape2.parse_teacher_details(html, f"{FIXTURE_URL}/lesgever", 'Fixture'),
+}
+
+
+def standin_pages(offerings=40):
+    """Pages of one stand-in academy, grouped by page type."""
+    site = StandinSite(0, categories=4, offerings=offerings, teachers=12)
+    return {
+        'homepage': [site.homepage()],
+        'program': [site.program()],
+        'category': [site.category(c) for c in range(site.categories)],
+        'offering': [site.offering(k) for k in range(site.offerings)],
+        'teacher': [site.teacher(t) for t in range(site.teachers)],
+    }
+
+
+def load_fixtures(directory):
+    """Read fixture pages from <directory>/<page type>/*.html."""
+    pages = {}
+    for kind in PARSERS:
+        kind_dir = os.path.join(directory, kind)
+        if not os.path.isdir(kind_dir):
+            continue
+        pages[kind] = []
+        for name in sorted(os.listdir(kind_dir)):
+            if name.endswith('.html'):
+                with open(os.path.join(kind_dir, name), 'r', encoding='utf-8') as f:
+                    pages[kind].append(f.read())
+    return pages
+
+
+def save_fixtures(pages, directory):
+    for kind, htmls in pages.items():
+        os.makedirs(os.path.join(directory, kind), exist_ok=True)
+        for i, html in enumerate(htmls):
+            with open(os.path.join(directory, kind, f"{i:04d}.html"), 'w', encoding='utf-8') as f:
+                f.write(html)
+
+
+def run_backend(backend, pages, repeat):
+    """
+    Parse all pages with one backend
+
+    Returns:
+        Tuple of (pages per second per page type, records per page type)
+    """
+    html_parser.set_backend(backend)
+    rates = {}
+    records = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for kind, htmls in pages.items():
+            parse = PARSERS[kind]
+            start = time.perf_counter()
+            for _ in range(repeat):
+                records[kind] = [parse(html) for html in htmls]
+            elapsed = time.perf_counter() - start
+            rates[kind] = len(htmls) * repeat / elapsed if elapsed else float('inf')
+    return rates, records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends on saved pages")
+    parser.add_argument("--fixtures", help="Directory with <page type>/*.html fixture pages")
+    parser.add_argument("--save-fixtures", help="Write the stand-in pages to this directory and exit")
+    parser.add_argument("--repeat", type=int, default=3, help="Times each page is parsed (default: 3)")
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures) if args.fixtures else standin_pages()
+
+    if args.save_fixtures:
+        save_fixtures(pages, args.save_fixtures)
+        print(f"Saved {sum(len(htmls) for htmls in pages.values())} pages to {args.save_fixtures}")
+        raise SystemExit(0)
+
+    total_pages = sum(len(htmls) for htmls in pages.values())
+    print(f"{total_pages} pages, parsed {args.repeat}x per backend")
+    print(f"{'backend':<12} " + " ".join(f"{kind:>10}" for kind in pages) + f" {'identical':>10}")
+
+    reference = None
+    differing = []
+    for backend in html_parser.available_backends():
+        rates, records = run_backend(backend, pages, args.repeat)
+        if reference is None:
+            reference = records
+        identical = 'yes' if records == reference else 'NO'
+        if records != reference:
+            differing.append(backend)
+        print(f"{backend:<12} " + " ".join(f"{rates[kind]:>8.0f}/s" for kind in pages) + f" {identical:>10}")
+
+    if differing:
+        print(f"Records differ from html.parser with: {', '.join(differing)}")
+        raise SystemExit(1)
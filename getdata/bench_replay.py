@@ -0,0 +1,122 @@
+"""
+Offline crawl benchmark against a recorded fixture archive
+
+Replays an archive written by `scrape2.py --record ARCHIVE` through the crawl
+engine and reports total crawl time, requests per second, parse time per page
+type and peak RSS. Because nothing touches the live sites, runs are comparable
+over time; --history appends each result as one JSON line to a file, and
+--compare checks the output against a saved JSON file from an earlier run.
+
+Usage:
+    python scrape2.py --record fixtures.ndjson.gz --output-file recorded.json
+    python bench_replay.py fixtures.ndjson.gz [--extract-workers 2] [--latency 0.05]
+                           [--compare recorded.json] [--history bench_history.ndjson]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import html_parser
+from crawler import Crawler
+from fixtures import FixtureArchive, replay_session
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process and its finished children
+
+    Returns:
+        Tuple of (own peak in MB, largest child peak in MB), or None if unknown
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+    return own, children
+
+
+def comparable(data):
+    return {key: value for key, value in data.items() if key != 'scraped_at'}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the crawl engine against a recorded fixture archive")
+    parser.add_argument("archive", help="Fixture archive written by scrape2.py --record")
+    parser.add_argument("--concurrency", type=int, default=16, help="Global concurrency of the engine (default: 16)")
+    parser.add_argument("--per-host", type=int, default=4, help="Per-host concurrency of the engine (default: 4)")
+    parser.add_argument("--extract-workers", type=int, default=0, help="Extraction processes of the engine (default: 0, parse inline)")
+    parser.add_argument("--latency", type=float, default=0, help="Seconds of delay per replayed response (default: 0)")
+    parser.add_argument("--parser", choices=["lxml", "html.parser", "html5lib"], default=html_parser.get_backend(),
+                        help=f"HTML parser backend (default: {html_parser.get_backend()})")
+    parser.add_argument("--compare", help="JSON output of an earlier run the replayed crawl must match")
+    parser.add_argument("--history", help="Append the results as a JSON line to this file")
+    args = parser.parse_args()
+
+    html_parser.set_backend(args.parser)
+    archive = FixtureArchive(args.archive)
+    crawler = Crawler(
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        extract_workers=args.extract_workers,
+        session=replay_session(archive, args.latency),
+    )
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        all_data = asyncio.run(crawler.crawl(archive.academies))
+    elapsed = time.perf_counter() - start
+
+    print(f"Archive: {len(archive.responses)} responses recorded at {archive.recorded_at}")
+    print(f"Backend: {args.parser}, {args.extract_workers} extraction workers, {args.latency * 1000:.0f} ms latency")
+    print(f"{'crawl time':<16} {elapsed:10.2f} s")
+    print(f"{'requests':<16} {crawler.request_count:10d}")
+    print(f"{'requests/s':<16} {crawler.request_count / elapsed:10.1f}")
+    print(f"{'offerings':<16} {len(all_data['offerings']):10d}")
+    print(f"{'teachers':<16} {len(all_data['teachers']):10d}")
+    print(f"\n{'page type':<16} {'pages':>6} {'parse s':>9} {'ms/page':>9}")
+    for kind, (pages, seconds) in crawler.parse_stats.items():
+        print(f"{kind:<16} {pages:6d} {seconds:9.3f} {seconds / pages * 1000:9.2f}")
+
+    rss = peak_rss_mb()
+    if rss is not None:
+        print(f"\n{'peak RSS':<16} {rss[0]:10.1f} MB")
+        if args.extract_workers:
+            print(f"{'peak RSS worker':<16} {rss[1]:10.1f} MB")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+        if comparable(expected) == comparable(all_data):
+            print(f"\nOutput identical to {args.compare}")
+        else:
+            print(f"\nWARNING: output differs from {args.compare}")
+
+    if args.history:
+        result = {
+            'run_at': datetime.now().isoformat(),
+            'archive': args.archive,
+            'parser': args.parser,
+            'extract_workers': args.extract_workers,
+            'latency': args.latency,
+            'crawl_seconds': round(elapsed, 3),
+            'requests': crawler.request_count,
+            'parse_seconds': {kind: round(seconds, 3) for kind, (_, seconds) in crawler.parse_stats.items()},
+            'peak_rss_mb': round(rss[0], 1) if rss is not None else None,
+        }
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result) + '\n')
+
+    if args.compare and comparable(expected) != comparable(all_data):
+        raise SystemExit(1)
@@ -0,0 +1,115 @@
+"""
+Checkpoint journal for long scraper runs
+
+Every page that was scraped successfully (academy program pages, category
+pages, offering pages and teacher pages) is appended to an NDJSON journal as
+soon as it completes; the file is flushed to disk periodically. When a crawl
+dies halfway, running scrape2.py again with --resume replays the journal and
+only fetches the pages that were not completed yet.
+
+Each line has the form {"kind": "offering", "url": "...", "record": {...}}.
+"""
+import json
+import os
+import time
+
+
+class CrawlJournal:
+    """Append-only NDJSON journal of completed pages."""
+
+    def __init__(self, path, resume=False, flush_interval=2.0):
+        """
+        Args:
+            path: Path of the journal file
+            resume: Load the existing journal instead of starting a new one
+            flush_interval: Maximum seconds between flushes to disk
+        """
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self.completed_pages = {}
+        self.resumed = 0
+
+        if resume:
+            complete_size = self._load()
+            if complete_size is not None:
+                # Drop a cut-off last line, so the next record starts on a line of its own
+                os.truncate(self.path, complete_size)
+            mode = 'a'
+        else:
+            mode = 'w'
+        self._file = open(self.path, mode, encoding='utf-8')
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def journal_path(output_path):
+        root, _ = os.path.splitext(output_path)
+        return f"{root}.journal.ndjson"
+
+    def _load(self):
+        """
+        Load the completed pages of an existing journal
+
+        Returns:
+            Size in bytes of the journal up to its last complete line, or None
+            if there is no journal
+        """
+        complete_size = None
+        try:
+            with open(self.path, 'rb') as f:
+                complete_size = 0
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # The last line is cut off if the crawl was killed mid-write
+                        break
+                    complete_size += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    self.completed_pages[(entry['kind'], entry['url'])] = entry['record']
+        except FileNotFoundError:
+            pass
+        print(f"Resuming from {self.path}: {len(self.completed_pages)} pages already completed")
+        return complete_size
+
+    def completed(self, kind, url):
+        """
+        Return the journaled record of a completed page
+
+        Args:
+            kind: Page type ('academy', 'category', 'offering' or 'teacher')
+            url: URL of the page
+
+        Returns:
+            The record, or None if the page still has to be scraped
+        """
+        record = self.completed_pages.get((kind, url))
+        if record is not None:
+            self.resumed += 1
+        return record
+
+    def record(self, kind, url, record):
+        """Append a completed page to the journal."""
+        self.completed_pages[(kind, url)] = record
+        self._file.write(json.dumps({'kind': kind, 'url': url, 'record': record}, ensure_ascii=False) + '\n')
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    def close(self, remove=False):
+        """
+        Flush and close the journal
+
+        Args:
+            remove: Delete the journal, e.g. after the output was saved
+        """
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
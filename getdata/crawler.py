@@ -0,0 +1,511 @@
+"""
+Asyncio crawl engine for scrape2.py
+
+The engine fetches academy homepages, program pages, category pages, offering
+pages and teacher pages concurrently and produces the same data structure as a
+sequential crawl: results are merged in academy/category/offering order, so the
+JSON written by scrape2.py does not depend on which request finished first.
+
+Requests are bounded by a global concurrency limit and by a per-host limit, so
+no single academy site sees more than a few requests at once; a
+HostRateLimiter additionally caps the request rate per host. All requests share
+one keep-alive session, and failed requests are retried with backoff (see
+http_session.py). With a ResponseCache (see http_cache.py) pages are fetched
+with conditional GETs and unchanged pages reuse the record extracted on a
+previous run; with sitemap=True pages whose sitemap lastmod shows they did not
+change are not requested at all (see sitemap.py). With an
+IncrementalState (see incremental.py) offering and teacher pages whose content
+hash did not change reuse the record from the previous output file. With a
+CrawlJournal (see checkpoint.py) every completed page is journaled, and pages
+already in the journal are skipped when a crawl is resumed.
+
+Fetching and extraction are separate stages. With extract_workers > 0 the
+fetchers put raw HTML on a bounded queue and a ProcessPoolExecutor runs the
+scrape2.parse_* functions, so BeautifulSoup no longer competes with network
+I/O for the event loop. A page reserves a slot in the extraction backlog before
+it is downloaded and gives it back once its record is extracted; when the
+workers fall behind the fetchers wait, and memory stays flat.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+from xml.etree.ElementTree import ParseError
+
+import html_parser
+import http_session
+import scrape2
+from sitemap import SitemapIndex, parse_sitemap
+
+# Page types whose content depends on other pages (see sitemap.py)
+LISTING_KINDS = ('introduction', 'categories', 'offerings')
+
+
+def _init_extract_worker(backend):
+    # Runs once in every extraction process
+    html_parser.set_backend(backend)
+
+
+def _timed_parse(parser, *args):
+    # Timed where the parser runs, so queueing for a worker is not counted
+    start = time.perf_counter()
+    record = parser(*args)
+    return record, time.perf_counter() - start
+
+
+class Page:
+    """A fetched page; not_modified is set when the body was reused from the cache."""
+
+    def __init__(self, url, text, not_modified=False):
+        self.url = url
+        self.text = text
+        self.not_modified = not_modified
+
+
+class Crawler:
+    """Concurrent crawler for the UGent academy sites."""
+
+    def __init__(self, concurrency=16, per_host=4, cache=None, incremental=None, journal=None, timeout=30,
+                 extract_workers=0, extract_queue=None, session=None, rate_limiter=None, retries=4, sink=None,
+                 sitemap=False):
+        """
+        Args:
+            concurrency: Maximum number of requests in flight across all hosts
+            per_host: Maximum number of requests in flight per host
+            cache: Optional ResponseCache for conditional GETs
+            incremental: Optional IncrementalState with the previous run's records
+            journal: Optional CrawlJournal for checkpointing and resuming
+            timeout: Request timeout in seconds
+            extract_workers: Number of processes parsing pages; 0 parses in the event loop
+            extract_queue: Maximum number of pages waiting for an extraction
+                worker (default: twice the number of workers)
+            session: requests.Session used for all requests (default: a pooled
+                session from http_session.make_session); e.g. one replaying a
+                fixture archive (see fixtures.py)
+            rate_limiter: Optional http_session.HostRateLimiter
+            retries: Retries after a connection error or 429/5xx response
+            sink: Optional writer (see ndjson_output.NDJSONWriter) that receives
+                every record as soon as it is complete
+            sitemap: Read each site's sitemap.xml first and reuse cached pages
+                whose lastmod shows they did not change (needs a cache)
+        """
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.cache = cache
+        self.incremental = incremental
+        self.journal = journal
+        self.timeout = timeout
+        self.extract_workers = max(0, extract_workers)
+        self.extract_queue = extract_queue if extract_queue is not None else 2 * self.extract_workers
+        self.session = session if session is not None else http_session.make_session(pool_maxsize=self.per_host)
+        self.rate_limiter = rate_limiter
+        self.retries = retries
+        self.sink = sink
+        self.use_sitemap = sitemap and cache is not None
+        self.sitemap = None
+        self.request_count = 0
+        self.failed_urls = []
+        self.parse_stats = {}
+        self._executor = None
+        self._process_pool = None
+        self._extract_queue = None
+        self._backlog = None
+        self._global_limit = None
+        self._host_limits = {}
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    def _get(self, url, optional=False):
+        # Runs in the thread pool; failures of optional pages are not reported as lost
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.mark_fresh(entry)
+            return Page(url, entry.body, not_modified=True)
+
+        headers = entry.validators() if entry is not None else {}
+        try:
+            response = http_session.get(self.session, url, retries=self.retries, headers=headers, timeout=self.timeout)
+        except Exception as e:
+            print(f"Error accessing {url}: {e}")
+            if not optional:
+                self.failed_urls.append(url)
+            return None
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.mark_not_modified(entry)
+            return Page(url, entry.body, not_modified=True)
+
+        # Check if the request was successful
+        if response.status_code != 200:
+            print(f"Failed to retrieve {url}: Status code {response.status_code}")
+            if not optional:
+                self.failed_urls.append(url)
+            return None
+
+        if self.cache is not None:
+            self.cache.store(url, response)
+        return Page(url, response.text)
+
+    async def _download(self, url, optional=False):
+        self.request_count += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._get, url, optional)
+
+    async def fetch(self, url, optional=False):
+        """
+        Fetch a page within the host, rate and global limits, without extraction
+
+        Args:
+            url: URL of the page
+            optional: Do not count a failure as a lost page
+
+        Returns:
+            Page, or None if the request failed
+        """
+        async with self._host_limit(url):
+            if self.rate_limiter is not None:
+                await asyncio.sleep(self.rate_limiter.reserve(url))
+            async with self._global_limit:
+                return await self._download(url, optional)
+
+    def _unchanged_page(self, kind, url):
+        """Cached copy of a page the sitemap shows did not change, or None."""
+        if self.sitemap is None:
+            return None
+        entry = self.cache.lookup(url)
+        if entry is None or not self.sitemap.unchanged(url, entry.fetched_at, listing=kind in LISTING_KINDS):
+            return None
+        self.cache.mark_fresh(entry)
+        self.sitemap.skipped += 1
+        return Page(url, entry.body, not_modified=True)
+
+    async def load_sitemap(self, base_url):
+        """
+        Read the sitemap (and the sitemaps it indexes) of one site
+
+        Args:
+            base_url: Base URL of the academy site
+        """
+        pages = []
+        unchanged = True
+        pending = [f"{base_url.rstrip('/')}/sitemap.xml"]
+        seen = set()
+        while pending:
+            url = pending.pop(0)
+            if url in seen:
+                continue
+            seen.add(url)
+            previous = self.cache.lookup(url)
+            page = await self.fetch(url, optional=True)
+            if page is None:
+                # Without a complete sitemap every page of the site is requested
+                return
+            if not page.not_modified and (previous is None or previous.body != page.text):
+                unchanged = False
+            try:
+                site_pages, children = parse_sitemap(page.text)
+            except ParseError as e:
+                print(f"Ignoring unreadable sitemap {url}: {e}")
+                return
+            pages.extend(site_pages)
+            pending.extend(children)
+        self.sitemap.add_site(base_url, pages, unchanged)
+
+    async def scrape_page(self, kind, url, parser, *args):
+        """
+        Fetch a page and extract its record
+
+        The page holds a slot of the extraction backlog from just before the
+        download until its record is extracted.
+
+        Args:
+            kind: Page type used as cache key (e.g. 'offering')
+            url: URL of the page
+            parser: One of the scrape2.parse_* functions
+            *args: Arguments passed to the parser after the HTML and URL
+
+        Returns:
+            The extracted record, or None if the request failed
+        """
+        page = self._unchanged_page(kind, url)
+        if page is not None:
+            await self._backlog.acquire()
+        else:
+            # Wait for the host first so a busy host does not hold global slots
+            async with self._host_limit(url):
+                await self._backlog.acquire()
+                try:
+                    if self.rate_limiter is not None:
+                        await asyncio.sleep(self.rate_limiter.reserve(url))
+                    async with self._global_limit:
+                        page = await self._download(url)
+                except BaseException:
+                    self._backlog.release()
+                    raise
+        try:
+            if page is None:
+                return None
+            return await self.parse(kind, page, parser, *args)
+        finally:
+            self._backlog.release()
+
+    async def extract(self, kind, parser, *args):
+        """
+        Run a parser in the extraction pool, or inline without one
+
+        The time spent in the parser is added to parse_stats[kind] as
+        [pages, seconds].
+
+        Args:
+            kind: Page type the time is counted under
+            parser: One of the scrape2.parse_* functions
+            *args: Arguments passed to the parser
+
+        Returns:
+            The value returned by the parser
+        """
+        if self._process_pool is None:
+            record, elapsed = _timed_parse(parser, *args)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            await self._extract_queue.put((parser, args, future))
+            record, elapsed = await future
+        stats = self.parse_stats.setdefault(kind, [0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        return record
+
+    async def _extraction_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            parser, args, future = await self._extract_queue.get()
+            try:
+                result = await loop.run_in_executor(self._process_pool, _timed_parse, parser, *args)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._extract_queue.task_done()
+
+    async def parse(self, kind, page, parser, *args):
+        """
+        Run a scrape2 parser on a page
+
+        When the page is unchanged since the previous run, the record extracted
+        back then is returned from the previous output or from the cache
+        instead of parsing the HTML again.
+
+        Args:
+            kind: Page type used as cache key (e.g. 'offering')
+            page: Page returned by _download
+            parser: One of the scrape2.parse_* functions
+            *args: Arguments passed to the parser after the HTML and URL
+
+        Returns:
+            The extracted record
+        """
+        if self.incremental is not None:
+            record = self.incremental.reuse(kind, page.url, page.text, args)
+            if record is not None:
+                return record
+        if self.cache is not None and page.not_modified:
+            record = self.cache.load_record(page.url, kind, args)
+            if record is not None:
+                return record
+        record = await self.extract(kind, parser, page.text, page.url, *args)
+        if self.cache is not None:
+            self.cache.store_record(page.url, kind, args, record)
+        return record
+
+    def emit(self, record_type, record):
+        """Pass a completed record to the sink, if there is one."""
+        if self.sink is not None:
+            self.sink.write(record_type, record)
+
+    async def checkpointed(self, kind, url, scrape):
+        """
+        Run a scrape step unless the journal already has its result
+
+        Args:
+            kind: Page type used in the journal
+            url: URL of the page
+            scrape: Coroutine function performing the step
+
+        Returns:
+            The journaled or freshly scraped result
+        """
+        if self.journal is not None:
+            record = self.journal.completed(kind, url)
+            if record is not None:
+                return record
+        result = await scrape()
+        # Failed pages are not journaled so a resumed crawl retries them
+        if self.journal is not None and result not in (None, {}):
+            self.journal.record(kind, url, result)
+        return result
+
+    async def scrape_academy(self, academy):
+        """Fetch the introduction and categories of one academy."""
+        academy_name = academy['name']
+        base_url = academy['base_url']
+
+        async def introduction():
+            print(f"Scraping introduction for {academy_name}...")
+            hardcoded = scrape2.hardcoded_introduction(base_url)
+            if hardcoded is not None:
+                return hardcoded
+            introduction = await self.scrape_page('introduction', base_url, scrape2.parse_academy_introduction)
+            return introduction if introduction is not None else ""
+
+        async def categories():
+            print(f"Scraping categories from {academy_name}...")
+            return await self.scrape_page('categories', academy['url'], scrape2.parse_categories, academy_name)
+
+        if self.journal is not None:
+            record = self.journal.completed('academy', academy['url'])
+            if record is not None:
+                return record
+
+        result = list(await asyncio.gather(introduction(), categories()))
+        if self.journal is not None and result[1] is not None:
+            self.journal.record('academy', academy['url'], result)
+        return result
+
+    async def scrape_offerings(self, category, academy_name):
+        """Fetch the offerings listed on one category page."""
+        print(f"Scraping offerings for category: {category['name']} ({academy_name})")
+        return await self.scrape_page('offerings', category['link'], scrape2.parse_offerings, category['name'], academy_name)
+
+    async def scrape_offering_details(self, offering_url, offering_title, academy_name):
+        """Fetch the detail page of one offering."""
+        print(f"Scraping details for: {offering_title}")
+        details = await self.scrape_page('offering', offering_url, scrape2.parse_offering_details, offering_title, academy_name)
+        return details if details is not None else {}
+
+    async def scrape_teacher_details(self, teacher_url, teacher_name):
+        """Fetch the profile page of one teacher."""
+        print(f"Scraping teacher details for: {teacher_name}")
+        details = await self.scrape_page('teacher', teacher_url, scrape2.parse_teacher_details, teacher_name)
+        return details if details is not None else {}
+
+    async def crawl(self, academies):
+        """
+        Crawl all academies
+
+        Args:
+            academies: List of academy dictionaries (see scrape2.academies)
+
+        Returns:
+            Dictionary in the format of ugent_academies_data_detailed.json
+        """
+        self._global_limit = asyncio.Semaphore(self.concurrency)
+        self._backlog = asyncio.Semaphore(self.concurrency + self.extract_queue + self.extract_workers)
+        self._host_limits = {}
+        self.request_count = 0
+        self.failed_urls = []
+        self.parse_stats = {}
+
+        workers = []
+        if self.extract_workers:
+            # spawn rather than fork: the parent holds threads, the cache's
+            # SQLite connection and the journal file
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.extract_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_extract_worker,
+                initargs=(html_parser.get_backend(),),
+            )
+            self._extract_queue = asyncio.Queue(maxsize=max(1, self.extract_queue))
+            workers = [asyncio.create_task(self._extraction_worker()) for _ in range(self.extract_workers)]
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                self._executor = executor
+                return await self._crawl(academies)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if self._process_pool is not None:
+                self._process_pool.shutdown(cancel_futures=True)
+                self._process_pool = None
+            self._executor = None
+
+    async def _crawl(self, academies):
+        all_data = scrape2.new_all_data()
+        offerings_dict = {}
+        teachers_dict = {}
+        self.emit('meta', {'scraped_at': all_data['scraped_at'], 'metadata': all_data['metadata']})
+
+        if self.use_sitemap:
+            self.sitemap = SitemapIndex()
+            await asyncio.gather(*(self.load_sitemap(academy['base_url']) for academy in academies))
+            print(f"Sitemaps list {len(self.sitemap)} pages")
+
+        # Homepages and program pages of all academies
+        academy_results = await asyncio.gather(*(self.scrape_academy(academy) for academy in academies))
+
+        category_jobs = []
+        for academy, (introduction, categories) in zip(academies, academy_results):
+            academy_name = academy['name']
+            academy_data = scrape2.build_academy_data(academy, introduction)
+            all_data['academies'].append(academy_data)
+            self.emit('academy', academy_data)
+
+            if categories:
+                print(f"Found {len(categories)} categories in {academy_name}")
+                all_data['categories'].extend(categories)
+                for category in categories:
+                    category_jobs.append((academy_name, category))
+                    self.emit('category', category)
+
+        # Category pages, merged in the same order as a sequential crawl
+        category_results = await asyncio.gather(
+            *(
+                self.checkpointed('category', category['link'], partial(self.scrape_offerings, category, academy_name))
+                for academy_name, category in category_jobs
+            )
+        )
+        for (academy_name, category), category_offerings in zip(category_jobs, category_results):
+            scrape2.merge_category_offerings(offerings_dict, academy_name, category, category_offerings)
+
+        async def offering_details(url, offering):
+            details = await self.checkpointed(
+                'offering', url, partial(self.scrape_offering_details, url, offering['title'], offering['academy'])
+            )
+            details['categories'] = offering['categories']
+            self.emit('offering', details)
+            return details
+
+        # Offering detail pages
+        print("\nScraping detailed information for each offering...")
+        offerings = list(offerings_dict.items())
+        details_results = await asyncio.gather(*(offering_details(url, offering) for url, offering in offerings))
+        for (url, offering), details in zip(offerings, details_results):
+            scrape2.collect_teachers(details, teachers_dict)
+            offerings_dict[url] = details
+
+        async def teacher_details(url, teacher):
+            details = await self.checkpointed('teacher', url, partial(self.scrape_teacher_details, url, teacher['name']))
+            # Teachers whose page failed keep their name and link
+            self.emit('teacher', details or teacher)
+            return details
+
+        # Teacher profile pages
+        print(f"\nScraping detailed information for {len(teachers_dict)} unique teachers...")
+        teachers = list(teachers_dict.items())
+        teacher_results = await asyncio.gather(*(teacher_details(url, teacher) for url, teacher in teachers))
+        for (url, _), teacher_details in zip(teachers, teacher_results):
+            if teacher_details:
+                teachers_dict[url] = teacher_details
+
+        all_data['offerings'] = list(offerings_dict.values())
+        all_data['teachers'] = list(teachers_dict.values())
+        return all_data
@@ -0,0 +1,146 @@
+"""
+Record and replay of the scraper's HTTP traffic
+
+In record mode every response the crawler receives is appended to a fixture
+archive. In replay mode a requests transport adapter serves the archived
+responses, so the scraper can be run, benchmarked and regression-tested
+without touching the live *.ugent.be sites.
+
+An archive is gzip-compressed NDJSON. The first line describes the crawl
+({"recorded_at": ..., "academies": [...]}); every further line holds one
+response: {"url": ..., "status": 200, "headers": {...}, "body": "..."}.
+Bodies are stored decoded, so transfer headers such as Content-Encoding are
+dropped.
+"""
+import gzip
+import json
+import threading
+import time
+from datetime import datetime
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Headers describing the transfer rather than the body
+TRANSFER_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+
+class FixtureRecorder:
+    """Appends every response of a requests.Session to a fixture archive."""
+
+    def __init__(self, path, academies):
+        """
+        Args:
+            path: Path of the archive to write
+            academies: List of academy dictionaries that are being crawled
+        """
+        self.path = str(path)
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        header = {'recorded_at': datetime.now().isoformat(), 'academies': academies}
+        self._file.write(json.dumps(header, ensure_ascii=False) + '\n')
+
+    def attach(self, session):
+        """Record the responses of a session; returns the session."""
+        session.hooks['response'].append(self.record_response)
+        return session
+
+    def record_response(self, response, *args, **kwargs):
+        """requests response hook: append the response to the archive."""
+        # A 304 has no body to replay; record with the HTTP cache disabled
+        if response.status_code == 304:
+            return
+        headers = {key: value for key, value in response.headers.items() if key.lower() not in TRANSFER_HEADERS}
+        entry = {'url': response.url, 'status': response.status_code, 'headers': headers, 'body': response.text}
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class FixtureArchive:
+    """Responses loaded from a fixture archive."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Path of an archive written by FixtureRecorder
+        """
+        self.path = str(path)
+        self.responses = {}
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            for line in f:
+                entry = json.loads(line)
+                self.responses[entry['url']] = entry
+        self.recorded_at = header.get('recorded_at')
+        self.academies = header.get('academies', [])
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter answering requests from a FixtureArchive."""
+
+    def __init__(self, archive, latency=0):
+        """
+        Args:
+            archive: FixtureArchive to serve
+            latency: Seconds of delay per response, to imitate the network
+        """
+        super().__init__()
+        self.archive = archive
+        self.latency = latency
+
+    def send(self, request, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.encoding = 'utf-8'
+
+        entry = self.archive.responses.get(request.url)
+        if entry is None:
+            response.status_code = 404
+            response.reason = 'Not in fixture archive'
+            response._content = b''
+            return response
+
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        etag = response.headers.get('ETag')
+        if etag and request.headers.get('If-None-Match') == etag:
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = entry['status']
+            response._content = entry['body'].encode('utf-8')
+        return response
+
+    def close(self):
+        pass
+
+
+def replay_session(archive, latency=0):
+    """
+    Create a session that serves every request from a fixture archive
+
+    Args:
+        archive: FixtureArchive to serve
+        latency: Seconds of delay per response
+
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+    adapter = ReplayAdapter(archive, latency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
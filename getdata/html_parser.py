@@ -0,0 +1,63 @@
+"""
+HTML parser backend for the scraper
+
+All scrape2.py parse functions build their BeautifulSoup tree through
+make_soup(), so the underlying tree builder can be switched in one place.
+html.parser is the default. lxml builds the tree several times faster, but it
+repairs markup differently (it closes an unclosed <p>, for example), so the
+preserved description/program HTML, and with it the content hashes of
+incremental scrapes and the import fingerprints, can change. It is therefore
+only used when asked for with --parser lxml.
+
+selectolax is not offered as a backend: it does not build a BeautifulSoup tree
+and serialises HTML differently, so the preserved description/program HTML in
+the output would change.
+"""
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    import html5lib  # noqa: F401
+    HAS_HTML5LIB = True
+except ImportError:
+    HAS_HTML5LIB = False
+
+_backend = 'html.parser'
+
+
+def available_backends():
+    """Names of the tree builders that can be used on this machine."""
+    backends = ['html.parser']
+    if HAS_LXML:
+        backends.append('lxml')
+    if HAS_HTML5LIB:
+        backends.append('html5lib')
+    return backends
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(name):
+    """
+    Select the tree builder used by make_soup
+
+    Args:
+        name: 'lxml', 'html.parser' or 'html5lib'; unavailable backends fall back to html.parser
+    """
+    global _backend
+    if name not in available_backends():
+        print(f"Parser backend '{name}' is not installed, using html.parser")
+        name = 'html.parser'
+    _backend = name
+
+
+def make_soup(html):
+    """Parse HTML with the selected backend."""
+    return BeautifulSoup(html, _backend)
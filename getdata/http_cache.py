@@ -0,0 +1,185 @@
+"""
+Persistent conditional-GET cache for the scraper
+
+Responses are stored per URL in a SQLite file together with their ETag and
+Last-Modified validators. On the next run the crawler sends If-None-Match /
+If-Modified-Since; a 304 answer reuses the stored body, and the record that was
+extracted from it, so neither the transfer nor the BeautifulSoup parse is
+repeated. Entries younger than max_age are reused without any request at all.
+
+The cache is capped in size; least recently used entries are evicted first.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+
+class CacheEntry:
+    """A cached response body and its validators."""
+
+    def __init__(self, url, body, etag, last_modified, fetched_at):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def validators(self):
+        """Headers for a conditional GET of this entry."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """On-disk response cache keyed by URL with LRU eviction."""
+
+    def __init__(self, path, max_bytes=200 * 1024 * 1024, max_age=0):
+        """
+        Args:
+            path: Path of the SQLite cache file
+            max_bytes: Maximum total size of the cached response bodies
+            max_age: Seconds during which an entry is reused without revalidation
+        """
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = {'fresh': 0, 'not_modified': 0, 'downloaded': 0, 'parse_skipped': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT, last_modified TEXT,"
+            " size INTEGER NOT NULL, fetched_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " url TEXT NOT NULL, kind TEXT NOT NULL, args TEXT NOT NULL, record TEXT NOT NULL,"
+            " PRIMARY KEY (url, kind))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, url):
+        """
+        Return the cached entry for a URL and mark it as recently used
+
+        Returns:
+            CacheEntry, or None if the URL is not cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        return CacheEntry(url, *row)
+
+    def is_fresh(self, entry):
+        """Whether an entry may be reused without a conditional GET."""
+        return bool(self.max_age) and time.time() - entry.fetched_at < self.max_age
+
+    def mark_fresh(self, entry):
+        """Record that an entry was reused without a request."""
+        self.stats['fresh'] += 1
+
+    def mark_not_modified(self, entry):
+        """Record a 304 answer for an entry."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ?, last_used = ? WHERE url = ?", (now, now, entry.url))
+            self._conn.commit()
+        self.stats['not_modified'] += 1
+
+    def store(self, url, response):
+        """
+        Store a 200 response, replacing any older body and extracted record
+
+        Args:
+            url: Requested URL
+            response: The requests.Response that was received
+        """
+        body = response.text
+        size = len(body.encode('utf-8'))
+        now = time.time()
+        self.stats['downloaded'] += 1
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._conn.execute("DELETE FROM records WHERE url = ?", (url,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, size, fetched_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, response.headers.get('ETag'), response.headers.get('Last-Modified'), size, now, now),
+            )
+            self._total_bytes += size
+            self._evict()
+            self._conn.commit()
+
+    def load_record(self, url, kind, args):
+        """
+        Return the record previously extracted from the cached body of a URL
+
+        Args:
+            url: URL of the page
+            kind: Page type (e.g. 'offering', 'teacher')
+            args: Extra arguments that were passed to the parser
+
+        Returns:
+            The extracted record, or None if it has to be parsed again
+        """
+        key = json.dumps(args, ensure_ascii=False)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM records WHERE url = ? AND kind = ? AND args = ?", (url, kind, key)
+            ).fetchone()
+        if row is None:
+            return None
+        self.stats['parse_skipped'] += 1
+        return json.loads(row[0])
+
+    def store_record(self, url, kind, args, record):
+        """Store the record extracted from the cached body of a URL."""
+        key = json.dumps(args, ensure_ascii=False)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM responses WHERE url = ?", (url,)).fetchone() is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO records (url, kind, args, record) VALUES (?, ?, ?, ?)",
+                (url, kind, key, json.dumps(record, ensure_ascii=False)),
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used responses (and their records) until under the cap
+        while self._total_bytes > self.max_bytes:
+            row = self._conn.execute("SELECT url, size FROM responses ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (row[0],))
+            self._conn.execute("DELETE FROM records WHERE url = ?", (row[0],))
+            self._total_bytes -= row[1]
+            self.stats['evicted'] += 1
+
+    def summary(self):
+        """One-line description of the cache activity in this run."""
+        return (
+            f"HTTP cache: {self.stats['downloaded']} downloaded, {self.stats['not_modified']} not modified, "
+            f"{self.stats['fresh']} fresh, {self.stats['parse_skipped']} parses skipped, "
+            f"{self.stats['evicted']} evicted ({self._total_bytes / (1024 * 1024):.1f} MB cached)"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,166 @@
+"""
+Shared HTTP session layer for the scraper
+
+All requests go through one requests.Session per crawl, so TCP/TLS connections
+to an academy site are kept alive and reused instead of being set up again for
+every page. Responses are requested gzip-compressed (and brotli-compressed
+when the brotli package is installed, which urllib3 then uses to decode them).
+
+get() retries connection errors and 429/5xx responses with exponential
+backoff and jitter, honouring Retry-After. HostRateLimiter is a token bucket
+per host that replaces the fixed sleeps between requests.
+"""
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if HAS_BROTLI else 'gzip, deflate'
+
+# Responses worth asking again for
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Longest wait between two attempts, also for a Retry-After header
+MAX_BACKOFF = 60.0
+
+
+def make_session(pool_maxsize=4, pool_connections=32):
+    """
+    Create a session with keep-alive connection pools per host
+
+    Args:
+        pool_maxsize: Connections kept open per host; match the per-host concurrency
+        pool_connections: Number of hosts whose pools are kept
+
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    return session
+
+
+def backoff_delay(attempt, base=0.5):
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    return random.uniform(0, min(MAX_BACKOFF, base * 2 ** attempt))
+
+
+def retry_after(response):
+    """Seconds requested by a Retry-After header, or None."""
+    value = response.headers.get('Retry-After')
+    try:
+        return min(MAX_BACKOFF, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        # Missing, or an HTTP date; fall back to the backoff delay
+        return None
+
+
+def get(session, url, retries=4, backoff=0.5, **kwargs):
+    """
+    GET a URL, retrying connection errors and 429/5xx responses
+
+    Args:
+        session: Session (or the requests module) to send the request with
+        url: URL to fetch
+        retries: Number of retries after the first attempt
+        backoff: Base delay in seconds; doubled on every retry
+        **kwargs: Passed to session.get (headers, timeout, ...)
+
+    Returns:
+        The last response; its status may still be an error after the last retry
+
+    Raises:
+        requests.RequestException: If the last attempt failed without a response
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt, backoff)
+            print(f"Retrying {url} in {delay:.1f}s after error: {e}")
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            delay = retry_after(response)
+            if delay is None:
+                delay = backoff_delay(attempt, backoff)
+            print(f"Retrying {url} in {delay:.1f}s after status code {response.status_code}")
+        time.sleep(delay)
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` requests per second with bursts of `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token
+
+        Returns:
+            Seconds to wait before the request may be sent
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Tokens may go negative: waiting requests queue up behind each other
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class HostRateLimiter:
+    """One token bucket per host."""
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate: Requests per second per host; 0 or None disables the limit
+            burst: Requests that may be sent at once after an idle period
+        """
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url):
+        """Seconds to wait before sending a request to the host of url."""
+        if not self.rate:
+            return 0.0
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return bucket.reserve()
+
+    def wait(self, url):
+        """Block until a request may be sent to the host of url."""
+        delay = self.reserve(url)
+        if delay:
+            time.sleep(delay)
@@ -0,0 +1,180 @@
+"""
+Incremental scraping support for scrape2.py
+
+Every offering and teacher page is content-hashed. When the hash matches the
+one recorded on the previous run, the record from the previous
+ugent_academies_data_detailed.json is reused instead of parsing the page again.
+After the crawl a change manifest lists the offering and teacher URLs that were
+added, changed or removed compared to the previous output, so the import can
+limit itself to those.
+
+The hashes are kept next to the output file (<output>.hashes.json).
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+from ndjson_output import load_all_data
+
+# Drupal renders a few values that differ on every request; they are ignored
+# so that an unchanged page keeps the same hash.
+VOLATILE_PATTERNS = [
+    re.compile(r'js-view-dom-id-[0-9a-f]+'),
+    re.compile(r'name="form_build_id" value="[^"]*"'),
+    re.compile(r'form-[A-Za-z0-9_-]{32,}'),
+    re.compile(r'"view_dom_id":"[0-9a-f]+"'),
+]
+
+# Fields of the previous record that must match the parser arguments
+RECORD_KEYS = {
+    'offering': ('title', 'academy'),
+    'teacher': ('name',),
+}
+
+
+def content_hash(html):
+    """
+    Hash the HTML of a page, ignoring values that change on every request
+
+    Args:
+        html: HTML of the page
+
+    Returns:
+        Hex digest identifying the page content
+    """
+    for pattern in VOLATILE_PATTERNS:
+        html = pattern.sub('', html)
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+
+class IncrementalState:
+    """Previous records and page hashes used by an incremental crawl."""
+
+    def __init__(self, previous_data=None, previous_hashes=None):
+        """
+        Args:
+            previous_data: Contents of the previous detailed JSON file
+            previous_hashes: Page hashes recorded on the previous run
+        """
+        self.previous_data = previous_data or {}
+        self.previous_hashes = previous_hashes or {}
+        self.hashes = {kind: {} for kind in RECORD_KEYS}
+        self.previous_records = {
+            'offering': {o['link']: o for o in self.previous_data.get('offerings', []) if o.get('link')},
+            'teacher': {t['link']: t for t in self.previous_data.get('teachers', []) if t.get('link')},
+        }
+        self.stats = {'reused': 0, 'parsed': 0}
+
+    @staticmethod
+    def hashes_path(output_path):
+        root, _ = os.path.splitext(output_path)
+        return f"{root}.hashes.json"
+
+    @classmethod
+    def load(cls, output_path):
+        """
+        Load the previous output file and its page hashes, if they exist
+
+        Args:
+            output_path: Path of the detailed JSON (or NDJSON) file of the previous run
+        """
+        previous_data = None
+        previous_hashes = None
+        try:
+            previous_data = load_all_data(output_path)
+            with open(cls.hashes_path(output_path), 'r', encoding='utf-8') as f:
+                previous_hashes = json.load(f)
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError as e:
+            print(f"Ignoring unreadable previous output: {e}")
+        return cls(previous_data, previous_hashes)
+
+    def reuse(self, kind, url, html, args):
+        """
+        Return the previous record for a page if its content did not change
+
+        Args:
+            kind: Page type ('offering' or 'teacher'); other types are never reused
+            url: URL of the page
+            html: HTML of the page
+            args: Parser arguments after the HTML and URL (title/academy or name)
+
+        Returns:
+            Copy of the previous record without its categories, or None if the
+            page has to be parsed
+        """
+        if kind not in RECORD_KEYS:
+            return None
+
+        digest = content_hash(html)
+        self.hashes[kind][url] = digest
+
+        record = self.previous_records[kind].get(url)
+        if record is None or self.previous_hashes.get(kind, {}).get(url) != digest:
+            self.stats['parsed'] += 1
+            return None
+        if any(record.get(key) != value for key, value in zip(RECORD_KEYS[kind], args)):
+            self.stats['parsed'] += 1
+            return None
+
+        self.stats['reused'] += 1
+        return {key: value for key, value in record.items() if key != 'categories'}
+
+    def manifest(self, all_data):
+        """
+        Compare the new data with the previous output
+
+        Args:
+            all_data: Dictionary with all scraped data of this run
+
+        Returns:
+            Dictionary with added, changed and removed URLs per record type
+        """
+        manifest = {
+            'generated_at': datetime.now().isoformat(),
+            'scraped_at': all_data.get('scraped_at'),
+            'previous_scraped_at': self.previous_data.get('scraped_at'),
+        }
+        for kind, section in (('offering', 'offerings'), ('teacher', 'teachers')):
+            previous = self.previous_records[kind]
+            current = {record['link']: record for record in all_data.get(section, []) if record.get('link')}
+            manifest[section] = {
+                'added': [url for url in current if url not in previous],
+                'changed': [url for url in current if url in previous and current[url] != previous[url]],
+                'removed': [url for url in previous if url not in current],
+                'unchanged': sum(1 for url in current if url in previous and current[url] == previous[url]),
+            }
+        return manifest
+
+    def save(self, output_path, manifest_path, all_data):
+        """
+        Write the page hashes of this run and the change manifest
+
+        Args:
+            output_path: Path of the detailed JSON file that was written
+            manifest_path: Path of the change manifest to write
+            all_data: Dictionary with all scraped data of this run
+
+        Returns:
+            The change manifest
+        """
+        with open(self.hashes_path(output_path), 'w', encoding='utf-8') as f:
+            json.dump(self.hashes, f, ensure_ascii=False)
+
+        manifest = self.manifest(all_data)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+        return manifest
+
+    def summary(self, manifest):
+        """One-line description of the incremental run."""
+        offerings = manifest['offerings']
+        teachers = manifest['teachers']
+        return (
+            f"Incremental: {self.stats['reused']} pages reused, {self.stats['parsed']} parsed; "
+            f"offerings +{len(offerings['added'])} ~{len(offerings['changed'])} -{len(offerings['removed'])}, "
+            f"teachers +{len(teachers['added'])} ~{len(teachers['changed'])} -{len(teachers['removed'])}"
+        )
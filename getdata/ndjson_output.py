@@ -0,0 +1,109 @@
+"""
+Streaming NDJSON output for scrape2.py
+
+Instead of one indented JSON document written at the end of the crawl, every
+record is written as one line as soon as it is complete:
+
+    {"type": "meta", "record": {"scraped_at": ..., "metadata": {...}}}
+    {"type": "academy", "record": {...}}
+    {"type": "category", "record": {...}}
+    {"type": "offering", "record": {...}}
+    {"type": "teacher", "record": {...}}
+
+Records have the same fields as in ugent_academies_data_detailed.json, but
+appear in the order they complete. A path ending in .gz is gzip-compressed.
+The file is flushed periodically so an importer can follow it while the crawl
+is still running.
+"""
+import gzip
+import json
+import time
+
+# Record type -> list in the detailed JSON document
+SECTIONS = {
+    'academy': 'academies',
+    'category': 'categories',
+    'offering': 'offerings',
+    'teacher': 'teachers',
+}
+
+
+def is_ndjson_path(path):
+    return str(path).endswith(('.ndjson', '.ndjson.gz', '.jsonl', '.jsonl.gz'))
+
+
+def open_text(path, mode='r'):
+    """Open a text file, gzip-compressed when the path ends in .gz."""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class NDJSONWriter:
+    """Writes scraper records as NDJSON lines."""
+
+    def __init__(self, path, flush_interval=1.0):
+        """
+        Args:
+            path: Path of the output file (.gz for gzip)
+            flush_interval: Maximum seconds between flushes
+        """
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self.counts = dict.fromkeys(SECTIONS, 0)
+        self._file = open_text(self.path, 'w')
+        self._last_flush = time.monotonic()
+
+    def write(self, record_type, record):
+        """Append one record of the given type ('meta', 'academy', ...)."""
+        self._file.write(json.dumps({'type': record_type, 'record': record}, ensure_ascii=False) + '\n')
+        if record_type in self.counts:
+            self.counts[record_type] += 1
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_records(path):
+    """
+    Read an NDJSON output file
+
+    Args:
+        path: Path of the file (.gz for gzip)
+
+    Yields:
+        Tuples of (record type, record)
+    """
+    with open_text(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                yield entry['type'], entry['record']
+
+
+def load_all_data(path):
+    """
+    Load scraper output in either format into the detailed JSON structure
+
+    Args:
+        path: Path of a .json document or an NDJSON file
+
+    Returns:
+        Dictionary with academies, metadata, categories, offerings, teachers and scraped_at
+    """
+    if not is_ndjson_path(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    all_data = {section: [] for section in SECTIONS.values()}
+    for record_type, record in read_records(path):
+        if record_type == 'meta':
+            all_data.update(record)
+        elif record_type in SECTIONS:
+            all_data[SECTIONS[record_type]].append(record)
+    return all_data
@@ -1,11 +1,74 @@
-import requests
-from bs4 import BeautifulSoup
+import soupsieve as sv
+import argparse
+import asyncio
 import json
 from datetime import datetime
-import time
 import re
 import os
 
+import html_parser
+import http_session
+from html_parser import make_soup
+
+# CSS selectors, compiled once at module load
+CATEGORIES_CONTAINER = sv.compile("#block-system-main-block > div > div > div.view-content > div")
+CATEGORY_ITEMS = sv.compile('ul li')
+CATEGORY_LINK = sv.compile('.views-field-name a')
+OFFERINGS_CONTAINER = sv.compile("#block-system-main-block > div")
+OFFERING_TITLE = sv.compile('h4 .field--name-title')
+COURSE_ID = sv.compile('.course-number .field--name-field-course-id')
+COURSE_LANGUAGE = sv.compile('.course-language .field--name-field-course-language')
+COURSE_DESCRIPTION = sv.compile('.field--name-field-course-desc')
+COURSE_PROGRAM = sv.compile('.field--name-field-course-program')
+COURSE_PARTNERS = sv.compile('.field--name-field-course-partners .field__item')
+PARTNER_LINK = sv.compile('a')
+PARTNER_IMAGE = sv.compile('img')
+RELATED_COURSES = sv.compile('.field--name-field-course-related-courses .field__item a')
+VARIATIONS = sv.compile('.field--name-variations .field__item')
+VARIATION_TITLE = sv.compile('.field--name-title')
+VARIATION_DESCRIPTION = sv.compile('.field--name-field-description')
+VARIATION_PRICE = sv.compile('.field--name-price .field__item')
+VARIATION_DATES = sv.compile('.field--name-field-lesson-dates .field__item')
+VARIATION_LOCATION = sv.compile('.field--name-field-location-ref a')
+VARIATION_TEACHERS = sv.compile('.field--name-field-teachers .field__item a')
+COURSE_IMAGE = sv.compile('#block-system-main-block > article > div.course--content > section.sidebar--second > div > article > div > picture > img')
+ACADEMY_INTRODUCTION = sv.compile("#block-system-main-block > article > div.field.field--name-field-body.field--type-entity-reference-revisions.field--label-hidden.field__items > div > article > div > div.layout__item.text--wrapper > div.clearfix.text-formatted.field.field--name-field-text.field--type-text-long.field--label-hidden.field__item")
+TEACHER_PHOTO = sv.compile("#block-system-main-block > div > section.main--2-columns > div.field.field--name-field-teacher-pic.field--type-image.field--label-hidden.field__item img")
+TEACHER_DESCRIPTION = sv.compile("#block-system-main-block > div > section.sidebar--second > div")
+
+# Requests per second per academy site
+DEFAULT_RATE = 10
+
+# Shared by fetch_page; the crawl engine creates its own session
+session = http_session.make_session()
+rate_limiter = http_session.HostRateLimiter(DEFAULT_RATE)
+
+def fetch_page(url, timeout=30):
+    """
+    Fetch a page and return its HTML
+    
+    Args:
+        url: URL of the page to fetch
+        timeout: Request timeout in seconds
+        
+    Returns:
+        The response body as text, or None if the request failed
+    """
+    # Avoid overwhelming the server
+    rate_limiter.wait(url)
+    try:
+        response = http_session.get(session, url, timeout=timeout)
+    except Exception as e:
+        print(f"Error accessing {url}: {e}")
+        return None
+    
+    # Check if the request was successful
+    if response.status_code != 200:
+        print(f"Failed to retrieve {url}: Status code {response.status_code}")
+        return None
+    
+    return response.text
+
 def scrape_categories(academy_url, academy_name):
     """
     Scrape categories from an academy
@@ -19,19 +82,29 @@ def scrape_categories(academy_url, academy_name):
     """
     print(f"Scraping categories from {academy_name}...")
     
-    # Send an HTTP request to the URL
-    response = requests.get(academy_url)
-    
-    # Check if the request was successful
-    if response.status_code != 200:
-        print(f"Failed to retrieve the webpage: Status code {response.status_code}")
+    html = fetch_page(academy_url)
+    if html is None:
         return None
     
+    return parse_categories(html, academy_url, academy_name)
+
+def parse_categories(html, academy_url, academy_name):
+    """
+    Extract categories from the HTML of an academy program page
+    
+    Args:
+        html: HTML of the academy program page
+        academy_url: URL of the academy program page
+        academy_name: Name of the academy for reference
+        
+    Returns:
+        List of dictionaries containing category information
+    """
     # Parse the HTML content
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = make_soup(html)
     
     # Find the container with categories using the provided CSS selector
-    container = soup.select_one("#block-system-main-block > div > div > div.view-content > div")
+    container = CATEGORIES_CONTAINER.select_one(soup)
     
     if not container:
         print(f"Could not find the categories container on the page for {academy_name}")
@@ -41,11 +114,11 @@ def scrape_categories(academy_url, academy_name):
     categories = []
     
     # Find all list items in the unordered list based on the actual HTML structure
-    list_items = container.select('ul li')
+    list_items = CATEGORY_ITEMS.select(container)
     
     for item in list_items:
         # Find the link element inside views-field-name
-        link_element = item.select_one('.views-field-name a')
+        link_element = CATEGORY_LINK.select_one(item)
         if link_element:
             name = link_element.get_text().strip()
             link = link_element['href']
@@ -78,19 +151,30 @@ def scrape_offerings(category_url, category_name, academy_name):
     """
     print(f"Scraping offerings for category: {category_name} ({academy_name})")
     
-    # Send an HTTP request to the URL
-    response = requests.get(category_url)
-    
-    # Check if the request was successful
-    if response.status_code != 200:
-        print(f"Failed to retrieve the category page: Status code {response.status_code}")
+    html = fetch_page(category_url)
+    if html is None:
         return None
     
+    return parse_offerings(html, category_url, category_name, academy_name)
+
+def parse_offerings(html, category_url, category_name, academy_name):
+    """
+    Extract offerings from the HTML of a category page
+    
+    Args:
+        html: HTML of the category page
+        category_url: URL of the category page
+        category_name: Name of the category for reference
+        academy_name: Name of the academy for reference
+        
+    Returns:
+        List of dictionaries containing offering information
+    """
     # Parse the HTML content
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = make_soup(html)
     
     # Find the container with offerings using the provided CSS selector
-    container = soup.select_one("#block-system-main-block > div")
+    container = OFFERINGS_CONTAINER.select_one(soup)
     
     if not container:
         print(f"Could not find the offerings container on the page for {category_name}")
@@ -116,7 +200,7 @@ def scrape_offerings(category_url, category_name, academy_name):
                 link = f"{base_url}{link}"
             
             # Get the title from the h4 element
-            title_element = link_element.select_one('h4 .field--name-title')
+            title_element = OFFERING_TITLE.select_one(link_element)
             if title_element:
                 title = title_element.get_text().strip()
                 
@@ -217,23 +301,27 @@ def scrape_offering_details(offering_url, offering_title, academy_name):
     """
     print(f"Scraping details for: {offering_title}")
     
-    # Add a small delay to avoid overwhelming the server
-    time.sleep(0.1)  # Reduced from 1 second to 0.1 seconds
-    
-    # Send an HTTP request to the URL
-    try:
-        response = requests.get(offering_url, timeout=30)
-        
-        # Check if the request was successful
-        if response.status_code != 200:
-            print(f"Failed to retrieve the offering page: Status code {response.status_code}")
-            return {}
-    except Exception as e:
-        print(f"Error accessing {offering_url}: {e}")
+    html = fetch_page(offering_url)
+    if html is None:
         return {}
     
+    return parse_offering_details(html, offering_url, offering_title, academy_name)
+
+def parse_offering_details(html, offering_url, offering_title, academy_name):
+    """
+    Extract detailed information from the HTML of an offering page
+    
+    Args:
+        html: HTML of the offering page
+        offering_url: URL of the offering page
+        offering_title: Title of the offering
+        academy_name: Name of the academy
+        
+    Returns:
+        Dictionary with detailed offering information
+    """
     # Parse the HTML content
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = make_soup(html)
       # Initialize the details dictionary with basic information
     details = {
         'title': offering_title,
@@ -250,15 +338,15 @@ def scrape_offering_details(offering_url, offering_title, academy_name):
     }
     
     # Extract course ID if available
-    course_id_element = soup.select_one('.course-number .field--name-field-course-id')
+    course_id_element = COURSE_ID.select_one(soup)
     if course_id_element:
         details['course_id'] = course_id_element.get_text().strip()
     
     # Extract language if available
-    language_element = soup.select_one('.course-language .field--name-field-course-language')
+    language_element = COURSE_LANGUAGE.select_one(soup)
     if language_element:
         details['language'] = language_element.get_text().strip()      # Extract description with HTML content preserved
-    description_element = soup.select_one('.field--name-field-course-desc')
+    description_element = COURSE_DESCRIPTION.select_one(soup)
     if description_element:
         # Get the inner HTML content of the element (exclude the container tag)
         # First get all the inner HTML
@@ -266,17 +354,17 @@ def scrape_offering_details(offering_url, offering_title, academy_name):
         details['description'] = inner_html
     
     # Extract program details with HTML content preserved
-    program_element = soup.select_one('.field--name-field-course-program')
+    program_element = COURSE_PROGRAM.select_one(soup)
     if program_element:
         # Get the inner HTML content of the element (exclude the container tag)
         inner_html = ''.join(str(child) for child in program_element.children)
         details['program'] = inner_html
     
     # Extract partners
-    partner_elements = soup.select('.field--name-field-course-partners .field__item')
+    partner_elements = COURSE_PARTNERS.select(soup)
     for partner in partner_elements:
-        partner_link = partner.select_one('a')
-        partner_img = partner.select_one('img')
+        partner_link = PARTNER_LINK.select_one(partner)
+        partner_img = PARTNER_IMAGE.select_one(partner)
         if partner_link and partner_img:
             details['partners'].append({
                 'name': partner_img.get('alt', ''),
@@ -284,7 +372,7 @@ def scrape_offering_details(offering_url, offering_title, academy_name):
             })
     
     # Extract related courses
-    related_course_elements = soup.select('.field--name-field-course-related-courses .field__item a')
+    related_course_elements = RELATED_COURSES.select(soup)
     for related in related_course_elements:
         link = related.get('href', '')
         if link.startswith('/'):
@@ -297,7 +385,7 @@ def scrape_offering_details(offering_url, offering_title, academy_name):
         })
     
     # Extract variations/lessons
-    variation_elements = soup.select('.field--name-variations .field__item')
+    variation_elements = VARIATIONS.select(soup)
     for variation in variation_elements:
         variation_data = {
             'title': '',
@@ -309,27 +397,27 @@ def scrape_offering_details(offering_url, offering_title, academy_name):
         }
         
         # Extract variation title
-        title_element = variation.select_one('.field--name-title')
+        title_element = VARIATION_TITLE.select_one(variation)
         if title_element:
             variation_data['title'] = title_element.get_text().strip()          # Extract variation description with HTML content preserved
-        desc_element = variation.select_one('.field--name-field-description')
+        desc_element = VARIATION_DESCRIPTION.select_one(variation)
         if desc_element:
             # Get the inner HTML content of the element (exclude the container tag)
             inner_html = ''.join(str(child) for child in desc_element.children)
             variation_data['description'] = inner_html
         
         # Extract variation price
-        price_element = variation.select_one('.field--name-price .field__item')
+        price_element = VARIATION_PRICE.select_one(variation)
         if price_element:
             variation_data['price'] = price_element.get_text().strip()
         
         # Extract variation dates
-        date_elements = variation.select('.field--name-field-lesson-dates .field__item')
+        date_elements = VARIATION_DATES.select(variation)
         for date_element in date_elements:
             variation_data['dates'].append(date_element.get_text().strip())
         
         # Extract variation location
-        location_element = variation.select_one('.field--name-field-location-ref a')
+        location_element = VARIATION_LOCATION.select_one(variation)
         if location_element:
             location_text = location_element.get_text().strip()
             location_link = location_element.get('href', '')
@@ -343,7 +431,7 @@ def scrape_offering_details(offering_url, offering_title, academy_name):
             }
         
         # Extract variation teachers
-        teacher_elements = variation.select('.field--name-field-teachers .field__item a')
+        teacher_elements = VARIATION_TEACHERS.select(variation)
         for teacher in teacher_elements:
             teacher_name = teacher.get_text().strip()
             teacher_link = teacher.get('href', '')
@@ -361,7 +449,7 @@ def scrape_offering_details(offering_url, offering_title, academy_name):
             details['variations'].append(variation_data)
     
     # Extract offering image if available
-    image_element = soup.select_one('#block-system-main-block > article > div.course--content > section.sidebar--second > div > article > div > picture > img')
+    image_element = COURSE_IMAGE.select_one(soup)
     if image_element:
         image_src = image_element.get('src', '')
         if image_src:
@@ -385,7 +473,28 @@ def scrape_academy_introduction(academy_base_url, academy_name):
         String containing the academy introduction HTML, or empty string if not found
     """
     print(f"Scraping introduction for {academy_name}...")
-      # Special case for UGain - hardcoded content
+    
+    introduction = hardcoded_introduction(academy_base_url)
+    if introduction is not None:
+        return introduction
+    
+    html = fetch_page(academy_base_url)
+    if html is None:
+        return ""
+    
+    return parse_academy_introduction(html, academy_base_url)
+
+def hardcoded_introduction(academy_base_url):
+    """
+    Return the fixed introduction for academies whose homepage has none
+    
+    Args:
+        academy_base_url: Base URL of the academy (e.g., https://ghall.ugent.be)
+        
+    Returns:
+        String containing the introduction HTML, or None if the homepage should be scraped
+    """
+    # Special case for UGain - hardcoded content
     if "ugain" in academy_base_url.lower():
         return "<p>Welkom bij UGain, de academie voor levenslang leren aan de Faculteit Ingenieurswetenschappen en Architectuur van de Universiteit Gent.</p> <p>UGAin biedt een gevarieerd aanbod aan bijscholingen, studiedagen, opleidingen en postgraduaten rond actuele en innovatieve thema's in engineering en technologie.</p> <p>Met onze activiteiten slaan we de brug tussen universiteit en praktijk, en ondersteunen we ingenieurs en andere professionals in hun verdere ontwikkeling.</p>"
     
@@ -393,23 +502,24 @@ def scrape_academy_introduction(academy_base_url, academy_name):
     if "dunant" in academy_base_url.lower():
         return "<p>De <strong>Dunant Academie</strong> maakt recente inzichten uit wetenschap en praktijk toegankelijk voor werkveld of breed publiek.</p><p>Ons cursusaanbod helpt je omgaan met vraagstukken van vandaag en morgen. Bepaalde lessen kunnen zowel ter plaatse als online gevolgd worden, in de vorm van theorie of practicum.</p>"
     
-    try:
-        # Send an HTTP request to the homepage
-        response = requests.get(academy_base_url, timeout=30)
-        
-        # Check if the request was successful
-        if response.status_code != 200:
-            print(f"Failed to retrieve the homepage: Status code {response.status_code}")
-            return ""
-    except Exception as e:
-        print(f"Error accessing {academy_base_url}: {e}")
-        return ""
+    return None
+
+def parse_academy_introduction(html, academy_base_url):
+    """
+    Extract the introduction text from the HTML of an academy homepage
     
+    Args:
+        html: HTML of the academy homepage
+        academy_base_url: Base URL of the academy (e.g., https://ghall.ugent.be)
+        
+    Returns:
+        String containing the academy introduction HTML, or empty string if not found
+    """
     # Parse the HTML content
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = make_soup(html)
     
     # Try to find the introduction text using the provided CSS selector
-    intro_element = soup.select_one("#block-system-main-block > article > div.field.field--name-field-body.field--type-entity-reference-revisions.field--label-hidden.field__items > div > article > div > div.layout__item.text--wrapper > div.clearfix.text-formatted.field.field--name-field-text.field--type-text-long.field--label-hidden.field__item")
+    intro_element = ACADEMY_INTRODUCTION.select_one(soup)
     
     if intro_element:
         # Get the inner HTML content (preserve HTML formatting)
@@ -432,23 +542,26 @@ def scrape_teacher_details(teacher_url, teacher_name):
     """
     print(f"Scraping teacher details for: {teacher_name}")
     
-    # Add a small delay to avoid overwhelming the server
-    time.sleep(0.1)
-    
-    # Send an HTTP request to the URL
-    try:
-        response = requests.get(teacher_url, timeout=30)
-        
-        # Check if the request was successful
-        if response.status_code != 200:
-            print(f"Failed to retrieve the teacher page: Status code {response.status_code}")
-            return {}
-    except Exception as e:
-        print(f"Error accessing {teacher_url}: {e}")
+    html = fetch_page(teacher_url)
+    if html is None:
         return {}
     
+    return parse_teacher_details(html, teacher_url, teacher_name)
+
+def parse_teacher_details(html, teacher_url, teacher_name):
+    """
+    Extract detailed information from the HTML of a teacher page
+    
+    Args:
+        html: HTML of the teacher page
+        teacher_url: URL of the teacher page
+        teacher_name: Name of the teacher
+        
+    Returns:
+        Dictionary with detailed teacher information
+    """
     # Parse the HTML content
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = make_soup(html)
     
     # Initialize the details dictionary
     details = {
@@ -459,7 +572,7 @@ def scrape_teacher_details(teacher_url, teacher_name):
     }
     
     # Extract teacher photo
-    photo_element = soup.select_one("#block-system-main-block > div > section.main--2-columns > div.field.field--name-field-teacher-pic.field--type-image.field--label-hidden.field__item img")
+    photo_element = TEACHER_PHOTO.select_one(soup)
     if photo_element:
         photo_src = photo_element.get('src', '')
         if photo_src:
@@ -470,7 +583,7 @@ def scrape_teacher_details(teacher_url, teacher_name):
             details['photo_url'] = photo_src
     
     # Extract teacher description with HTML content preserved
-    description_element = soup.select_one("#block-system-main-block > div > section.sidebar--second > div")
+    description_element = TEACHER_DESCRIPTION.select_one(soup)
     if description_element:
         # Get the inner HTML content (preserve HTML formatting)
         inner_html = ''.join(str(child) for child in description_element.children)
@@ -478,61 +591,86 @@ def scrape_teacher_details(teacher_url, teacher_name):
     
     return details
 
-if __name__ == "__main__":
-    # Define the academies to scrape
-    academies = [
-        {
-            'name': 'Humanities Academie',
-            'url': 'https://humanitiesacademie.ugent.be/programma',
-            'base_url': 'https://humanitiesacademie.ugent.be'
-        },
-        {
-            'name': 'Gandaius Academy',
-            'url': 'https://gandaiusacademy.ugent.be/programma',
-            'base_url': 'https://gandaiusacademy.ugent.be'
-        },
-        {
-            'name': 'Beta Academy',
-            'url': 'https://beta-academy.ugent.be/programma',
-            'base_url': 'https://beta-academy.ugent.be'
-        },
-        {
-            'name': 'Ghall',
-            'url': 'https://ghall.ugent.be/programma',
-            'base_url': 'https://ghall.ugent.be'
-        },        {
-            'name': 'UGain',
-            'url': 'https://ugain.ugent.be/programma',
-            'base_url': 'https://ugain.ugent.be'
-        },
-        {
-            'name': 'FEB Academy',
-            'url': 'https://febacademy.ugent.be/programma',
-            'base_url': 'https://febacademy.ugent.be'
-        },
-        {
-            'name': 'ACVetMed',
-            'url': 'https://acvetmed.ugent.be/programma',
-            'base_url': 'https://acvetmed.ugent.be'
-        },
-        {
-            'name': 'Dunant Academie',
-            'url': 'https://dunantacademie.ugent.be/programma',
-            'base_url': 'https://dunantacademie.ugent.be'
-        },
-        {
-            'name': 'ALLPHA',
-            'url': 'https://allpha.ugent.be/programma',
-            'base_url': 'https://allpha.ugent.be'
-        },
+# Define the academies to scrape
+academies = [
+    {
+        'name': 'Humanities Academie',
+        'url': 'https://humanitiesacademie.ugent.be/programma',
+        'base_url': 'https://humanitiesacademie.ugent.be'
+    },
+    {
+        'name': 'Gandaius Academy',
+        'url': 'https://gandaiusacademy.ugent.be/programma',
+        'base_url': 'https://gandaiusacademy.ugent.be'
+    },
+    {
+        'name': 'Beta Academy',
+        'url': 'https://beta-academy.ugent.be/programma',
+        'base_url': 'https://beta-academy.ugent.be'
+    },
+    {
+        'name': 'Ghall',
+        'url': 'https://ghall.ugent.be/programma',
+        'base_url': 'https://ghall.ugent.be'
+    },        {
+        'name': 'UGain',
+        'url': 'https://ugain.ugent.be/programma',
+        'base_url': 'https://ugain.ugent.be'
+    },
+    {
+        'name': 'FEB Academy',
+        'url': 'https://febacademy.ugent.be/programma',
+        'base_url': 'https://febacademy.ugent.be'
+    },
+    {
+        'name': 'ACVetMed',
+        'url': 'https://acvetmed.ugent.be/programma',
+        'base_url': 'https://acvetmed.ugent.be'
+    },
+    {
+        'name': 'Dunant Academie',
+        'url': 'https://dunantacademie.ugent.be/programma',
+        'base_url': 'https://dunantacademie.ugent.be'
+    },
+    {
+        'name': 'ALLPHA',
+        'url': 'https://allpha.ugent.be/programma',
+        'base_url': 'https://allpha.ugent.be'
+    },
+    {
+        'name': 'APSS',
+        'url': 'https://apss.ugent.be/programma',
+        'base_url': 'https://apss.ugent.be'
+    }
+]
+
+def academies_for_base_urls(base_urls):
+    """
+    Build an academies list for arbitrary sites (e.g. the local stand-in server)
+    
+    Args:
+        base_urls: Base URLs of the sites to scrape
+        
+    Returns:
+        List of academy dictionaries in the same format as `academies`
+    """
+    return [
         {
-            'name': 'APSS',
-            'url': 'https://apss.ugent.be/programma',
-            'base_url': 'https://apss.ugent.be'
+            'name': base_url.split('://', 1)[-1],
+            'url': f"{base_url.rstrip('/')}/programma",
+            'base_url': base_url.rstrip('/')
         }
+        for base_url in base_urls
     ]
-      # Dictionary to store all data
-    all_data = {
+
+def new_all_data():
+    """
+    Create the empty structure that is written to the detailed JSON file
+    
+    Returns:
+        Dictionary with empty academy, category, offering and teacher lists
+    """
+    return {
         'academies': [],
         'metadata': academy_metadata,  # Add the metadata to the JSON
         'categories': [],
@@ -540,122 +678,318 @@ if __name__ == "__main__":
         'teachers': [],
         'scraped_at': datetime.now().isoformat()
     }
+
+def build_academy_data(academy, introduction):
+    """
+    Combine an academy with its predefined metadata and introduction
     
-    # Dictionary to store unique offerings by URL
-    offerings_dict = {}
+    Args:
+        academy: Academy dictionary from the academies list
+        introduction: Introduction HTML scraped from the homepage
+        
+    Returns:
+        Dictionary describing the academy in the output JSON
+    """
+    academy_data = {
+        'name': academy['name'],
+        'url': academy['url']
+    }
     
-    # Dictionary to store unique teachers by URL
-    teachers_dict = {}
+    # Add metadata from our predefined dictionary if available
+    if academy['base_url'] in academy_metadata:
+        for key, value in academy_metadata[academy['base_url']].items():
+            academy_data[key] = value
     
-    # Process each academy
-    for academy in academies:
-        academy_name = academy['name']
-        academy_url = academy['url']
-        base_url = academy['base_url']
-        
-        # Add academy to the data with its metadata
-        academy_data = {
-            'name': academy_name,
-            'url': academy_url
-        }
-          # Add metadata from our predefined dictionary if available
-        if base_url in academy_metadata:
-            for key, value in academy_metadata[base_url].items():
-                academy_data[key] = value
-        
-        # Scrape academy introduction text from homepage
-        introduction = scrape_academy_introduction(base_url, academy_name)
-        if introduction:
-            academy_data['introduction'] = introduction
-        
-        all_data['academies'].append(academy_data)
-        
-        # Scrape categories for this academy
-        categories = scrape_categories(academy_url, academy_name)
-        
-        if categories:
-            print(f"Found {len(categories)} categories in {academy_name}")
-            
-            # Add categories to the data
-            all_data['categories'].extend(categories)
-            
-            # Print the category results
-            for i, category in enumerate(categories, 1):
-                print(f"{i}. [{academy_name}] {category['name']} - {category['link']}")
-            
-            # Scrape offerings from each category
-            for category in categories:
-                category_offerings = scrape_offerings(category['link'], category['name'], academy_name)
-                if category_offerings:
-                    for offering in category_offerings:
-                        # Use the URL as a unique identifier
-                        offering_url = offering['link']
-                        
-                        if offering_url in offerings_dict:
-                            # If this offering was already found in another category,
-                            # add the current category to its categories list
-                            current_category = f"{academy_name} - {category['name']}"
-                            if current_category not in offerings_dict[offering_url]['categories']:
-                                offerings_dict[offering_url]['categories'].append(current_category)
-                        else:
-                            # First time seeing this offering, initialize it with a categories list
-                            offerings_dict[offering_url] = {
-                                'title': offering['title'],
-                                'link': offering_url,
-                                'academy': academy_name,
-                                'categories': [f"{academy_name} - {category['name']}"]
-                            }
-      # Now visit each offering page to get detailed information
-    print("\nScraping detailed information for each offering...")
-    for url, offering in offerings_dict.items():
-        details = scrape_offering_details(url, offering['title'], offering['academy'])
-        
-        # Add the categories to the details
-        details['categories'] = offering['categories']
-        
-        # Collect teachers from this offering
-        for variation in details.get('variations', []):
-            for teacher in variation.get('teachers', []):
-                teacher_url = teacher.get('link', '')
-                teacher_name = teacher.get('name', '')
-                if teacher_url and teacher_name and teacher_url not in teachers_dict:
-                    teachers_dict[teacher_url] = {
-                        'name': teacher_name,
-                        'link': teacher_url
-                    }
+    if introduction:
+        academy_data['introduction'] = introduction
+    
+    return academy_data
+
+def merge_category_offerings(offerings_dict, academy_name, category, category_offerings):
+    """
+    Add the offerings of one category to the offerings dictionary
+    
+    Offerings are deduplicated by URL; an offering listed in several categories
+    keeps a single entry with all of its categories.
+    
+    Args:
+        offerings_dict: Dictionary of offerings keyed by URL
+        academy_name: Name of the academy the category belongs to
+        category: Category dictionary
+        category_offerings: Offerings found on the category page
+    """
+    if not category_offerings:
+        return
+    
+    current_category = f"{academy_name} - {category['name']}"
+    for offering in category_offerings:
+        # Use the URL as a unique identifier
+        offering_url = offering['link']
         
-        # Replace the basic offering with the detailed one
-        offerings_dict[url] = details
-    
-    # Now scrape detailed information for each teacher
-    print(f"\nScraping detailed information for {len(teachers_dict)} unique teachers...")
-    for teacher_url, teacher_basic in teachers_dict.items():
-        teacher_details = scrape_teacher_details(teacher_url, teacher_basic['name'])
-        if teacher_details:
-            teachers_dict[teacher_url] = teacher_details      # Convert the dictionaries to lists for the final JSON
-    all_data['offerings'] = list(offerings_dict.values())
-    all_data['teachers'] = list(teachers_dict.values())
-    
-    # Save all data to a single JSON file
-    if all_data['offerings']:
+        if offering_url in offerings_dict:
+            # If this offering was already found in another category,
+            # add the current category to its categories list
+            if current_category not in offerings_dict[offering_url]['categories']:
+                offerings_dict[offering_url]['categories'].append(current_category)
+        else:
+            # First time seeing this offering, initialize it with a categories list
+            offerings_dict[offering_url] = {
+                'title': offering['title'],
+                'link': offering_url,
+                'academy': academy_name,
+                'categories': [current_category]
+            }
+
+def collect_teachers(details, teachers_dict):
+    """
+    Add the teachers of an offering's variations to the teachers dictionary
+    
+    Args:
+        details: Detailed offering dictionary
+        teachers_dict: Dictionary of teachers keyed by URL
+    """
+    for variation in details.get('variations', []):
+        for teacher in variation.get('teachers', []):
+            teacher_url = teacher.get('link', '')
+            teacher_name = teacher.get('name', '')
+            if teacher_url and teacher_name and teacher_url not in teachers_dict:
+                teachers_dict[teacher_url] = {
+                    'name': teacher_name,
+                    'link': teacher_url
+                }
+
+def save_all_data(all_data, output_path):
+    """
+    Save the scraped data to a JSON file and print a short summary
+    
+    Args:
+        all_data: Dictionary with all scraped data
+        output_path: Path of the JSON file to write
+    """
+    if not all_data['offerings']:
+        print("No offerings were found in any academy")
+        return
+    
+    print(f"\nTotal unique offerings found: {len(all_data['offerings'])}")
+    
+    with open(output_path, 'w', encoding='utf-8') as jsonfile:
+        json.dump(all_data, jsonfile, ensure_ascii=False, indent=4)
+    
+    print(f"Saved all data to {output_path}")
+    print_offerings_sample(all_data)
+
+def print_offerings_sample(all_data):
+    """
+    Print the first few offerings of the scraped data
+    
+    Args:
+        all_data: Dictionary with all scraped data
+    """
+    # Print sample of detailed offerings
+    print("\nSample of detailed offerings:")
+    for i, offering in enumerate(all_data['offerings'][:3], 1):
+        print(f"{i}. [{offering['academy']}] {offering['title']}")
+        print(f"   - Categories: {', '.join(offering['categories'])}")
+        print(f"   - Variations: {len(offering.get('variations', []))}")
+    
+    if len(all_data['offerings']) > 3:
+        print(f"... and {len(all_data['offerings']) - 3} more offerings")
+
+if __name__ == "__main__":
+    from checkpoint import CrawlJournal
+    from crawler import Crawler
+    from fixtures import FixtureArchive, FixtureRecorder, replay_session
+    from http_cache import ResponseCache
+    from incremental import IncrementalState
+    from ndjson_output import NDJSONWriter
+    
+    parser = argparse.ArgumentParser(description="Scrape all UGent academies into a detailed JSON file")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Maximum number of requests in flight across all sites (default: 16)",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=4,
+        help="Maximum number of requests in flight per academy site (default: 4)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATE,
+        help=f"Maximum requests per second per academy site; 0 for no limit (default: {DEFAULT_RATE})",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=4,
+        help="Retries with exponential backoff after a connection error or 429/5xx response (default: 4)",
+    )
+    parser.add_argument(
+        "--base-url",
+        action="append",
+        help="Scrape this site instead of the UGent academies (repeatable, e.g. the local stand-in server)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="json writes one document at the end; ndjson streams one record per line as the crawl progresses (default: json)",
+    )
+    parser.add_argument(
+        "--output-file",
+        help="Path to write the data (default: getdata/ugent_academies_data_detailed.json or .ndjson); "
+             "an NDJSON path ending in .gz is gzip-compressed",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Download every page again instead of using the HTTP cache",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=0,
+        help="Seconds during which cached pages are reused without revalidation (default: 0, always revalidate)",
+    )
+    parser.add_argument(
+        "--cache-file",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache.sqlite3"),
+        help="Path of the HTTP cache (default: getdata/http_cache.sqlite3)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=200,
+        help="Maximum size of the HTTP cache in MB; least recently used pages are evicted (default: 200)",
+    )
+    parser.add_argument(
+        "--sitemap",
+        action="store_true",
+        help="Read each site's sitemap.xml first and skip requests for cached pages that did not change",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse records of unchanged offering/teacher pages from the previous output and write a change manifest",
+    )
+    parser.add_argument(
+        "--changes-file",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "ugent_academies_changes.json"),
+        help="Path of the change manifest written in incremental mode (default: getdata/ugent_academies_changes.json)",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=["lxml", "html.parser", "html5lib"],
+        default=html_parser.get_backend(),
+        help="HTML parser backend (default: html.parser). lxml is faster, but may store different description/program HTML",
+    )
+    parser.add_argument(
+        "--extract-workers",
+        type=int,
+        default=max(1, (os.cpu_count() or 1) - 1),
+        help="Processes that parse pages while others are being fetched; 0 parses in the crawler itself (default: CPU count - 1)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted crawl, skipping pages already completed in the journal",
+    )
+    parser.add_argument(
+        "--journal-file",
+        help="Path of the checkpoint journal (default: next to the output file, *.journal.ndjson)",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="ARCHIVE",
+        help="Save every response to this fixture archive (*.ndjson.gz); disables the HTTP cache",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="ARCHIVE",
+        help="Serve all requests from a fixture archive instead of the live sites; disables the HTTP cache",
+    )
+    args = parser.parse_args()
+    
+    if args.output_file is None:
+        extension = "ndjson" if args.format == "ndjson" else "json"
+        args.output_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"ugent_academies_data_detailed.{extension}")
+    
+    html_parser.set_backend(args.parser)
+    incremental = IncrementalState.load(args.output_file) if args.incremental else None
+    journal = CrawlJournal(args.journal_file or CrawlJournal.journal_path(args.output_file), resume=args.resume)
+    
+    cache = None
+    if not (args.no_cache or args.record or args.replay):
+        cache = ResponseCache(args.cache_file, max_bytes=int(args.cache_size * 1024 * 1024), max_age=args.max_age)
+    
+    academies_to_scrape = academies_for_base_urls(args.base_url) if args.base_url else academies
+    
+    session = None
+    recorder = None
+    if args.replay:
+        archive = FixtureArchive(args.replay)
+        print(f"Replaying {len(archive.responses)} responses recorded at {archive.recorded_at}")
+        if not args.base_url:
+            academies_to_scrape = archive.academies
+        session = replay_session(archive)
+    elif args.record:
+        recorder = FixtureRecorder(args.record, academies_to_scrape)
+        session = recorder.attach(http_session.make_session(pool_maxsize=args.per_host))
+    
+    # With --format ndjson records are written while the crawl runs
+    writer = NDJSONWriter(args.output_file) if args.format == "ndjson" else None
+    
+    crawler = Crawler(
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        cache=cache,
+        incremental=incremental,
+        journal=journal,
+        extract_workers=args.extract_workers,
+        session=session,
+        rate_limiter=http_session.HostRateLimiter(args.rate, burst=args.per_host),
+        retries=args.retries,
+        sink=writer,
+        sitemap=args.sitemap,
+    )
+    try:
+        all_data = asyncio.run(crawler.crawl(academies_to_scrape))
+    except BaseException:
+        journal.close()
+        print(f"\nCrawl interrupted; progress is saved in {journal.path}. Run again with --resume to continue.")
+        raise
+    finally:
+        if cache is not None:
+            print(cache.summary())
+            cache.close()
+        if crawler.sitemap is not None:
+            print(f"Sitemap: {crawler.sitemap.skipped} unchanged pages not requested")
+        if recorder is not None:
+            recorder.close()
+            print(f"Recorded {recorder.count} responses to {recorder.path}")
+        if writer is not None:
+            writer.close()
+    if journal.resumed:
+        print(f"Resumed {journal.resumed} pages from the journal")
+    if crawler.failed_urls:
+        print(f"\n{len(crawler.failed_urls)} pages could not be fetched after {args.retries} retries:")
+        for url in crawler.failed_urls:
+            print(f"   - {url}")
+    if writer is None:
+        save_all_data(all_data, args.output_file)
+    elif all_data['offerings']:
         print(f"\nTotal unique offerings found: {len(all_data['offerings'])}")
-        
-        # Save to a single JSON file in the getdata directory
-        combined_filename = "ugent_academies_data_detailed.json"
-        output_path = os.path.join(os.path.dirname(__file__), combined_filename)
-        with open(output_path, 'w', encoding='utf-8') as jsonfile:
-            json.dump(all_data, jsonfile, ensure_ascii=False, indent=4)
-        
-        print(f"Saved all data to {output_path}")
-        
-        # Print sample of detailed offerings
-        print("\nSample of detailed offerings:")
-        for i, offering in enumerate(all_data['offerings'][:3], 1):
-            print(f"{i}. [{offering['academy']}] {offering['title']}")
-            print(f"   - Categories: {', '.join(offering['categories'])}")
-            print(f"   - Variations: {len(offering.get('variations', []))}")
-        
-        if len(all_data['offerings']) > 3:
-            print(f"... and {len(all_data['offerings']) - 3} more offerings")
+        print(f"Streamed {', '.join(f'{count} {record_type} records' for record_type, count in writer.counts.items())} to {writer.path}")
+        print_offerings_sample(all_data)
     else:
-        print("No offerings were found in any academy")
\ No newline at end of file
+        print("No offerings were found in any academy")
+    journal.close(remove=True)
+    
+    if incremental is not None and all_data['offerings']:
+        manifest = incremental.save(args.output_file, args.changes_file, all_data)
+        print(incremental.summary(manifest))
+        print(f"Saved change manifest to {args.changes_file}")
@@ -0,0 +1,120 @@
+"""
+Sitemap-based change detection for the crawl engine
+
+The Drupal academy sites publish a sitemap.xml (possibly a sitemap index with
+several pages) listing their pages with a lastmod date. With a handful of
+sitemap requests per site the crawler knows which pages changed since they
+were cached, and skips the request for all others:
+
+- offering and teacher pages are reused from the cache when their own lastmod
+  is not newer than the cached copy;
+- listing pages (homepage, program page, category pages) carry no useful
+  lastmod of their own, since a view changes when the offerings in it change.
+  They are reused only when the site's sitemap is identical to the previous
+  run and the cached copy is newer than every lastmod on the site, so added,
+  edited and removed offerings still reach the category membership.
+
+Pages that are not in the sitemap are always requested.
+"""
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+
+def parse_lastmod(value):
+    """
+    Convert a sitemap lastmod value to a Unix timestamp
+
+    Args:
+        value: W3C datetime, e.g. '2025-03-01T10:00:00+01:00' or '2025-03-01'
+
+    Returns:
+        Timestamp, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if len(value) == 10:
+        # A bare date: the page may have changed at any time that day
+        moment += timedelta(days=1)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def parse_sitemap(xml):
+    """
+    Parse a sitemap or sitemap index
+
+    Args:
+        xml: Text of the sitemap
+
+    Returns:
+        Tuple of (list of (url, lastmod timestamp) for pages, list of child sitemap URLs)
+    """
+    root = ET.fromstring(xml)
+    pages = []
+    children = []
+    # Match on local names so the sitemap namespace version does not matter
+    for element in root:
+        tag = element.tag.rsplit('}', 1)[-1]
+        values = {child.tag.rsplit('}', 1)[-1]: (child.text or '').strip() for child in element}
+        if not values.get('loc'):
+            continue
+        if tag == 'sitemap':
+            children.append(values['loc'])
+        elif tag == 'url':
+            pages.append((values['loc'], parse_lastmod(values.get('lastmod'))))
+    return pages, children
+
+
+class SitemapIndex:
+    """lastmod dates of the pages of all crawled sites."""
+
+    def __init__(self):
+        self.lastmod = {}
+        self.site_lastmod = {}
+        self.unchanged_sites = set()
+        self.skipped = 0
+
+    def add_site(self, base_url, pages, unchanged):
+        """
+        Register the sitemap pages of one site
+
+        Args:
+            base_url: Base URL of the academy site
+            pages: List of (url, lastmod timestamp) from parse_sitemap
+            unchanged: Whether the sitemap is identical to the cached copy
+        """
+        host = urlsplit(base_url).netloc
+        latest = 0.0
+        for url, lastmod in pages:
+            self.lastmod[url] = lastmod
+            # A page without lastmod could have changed at any time
+            latest = max(latest, lastmod if lastmod is not None else float('inf'))
+        if pages:
+            self.site_lastmod[host] = latest
+            if unchanged:
+                self.unchanged_sites.add(host)
+
+    def unchanged(self, url, fetched_at, listing=False):
+        """
+        Whether a cached page can be reused without a request
+
+        Args:
+            url: URL of the page
+            fetched_at: Timestamp of the cached copy
+            listing: The page lists other pages (homepage, program or category page)
+        """
+        if listing:
+            host = urlsplit(url).netloc
+            return host in self.unchanged_sites and self.site_lastmod[host] <= fetched_at
+        lastmod = self.lastmod.get(url)
+        return lastmod is not None and lastmod <= fetched_at
+
+    def __len__(self):
+        return len(self.lastmod)
@@ -0,0 +1,261 @@
+"""
+Local HTTP stand-in for the UGent academy sites
+
+Serves deterministic, synthetic Drupal-like pages (homepage, program page,
+category pages, offering pages and teacher pages) that match the selectors used
+by scrape2.py. Every academy gets its own port on 127.0.0.1 so per-host limits
+behave as they do against the real sites, and an artificial latency per request
+makes wall-clock comparisons meaningful without network access. Responses carry
+an ETag and answer If-None-Match with 304, like the Drupal sites do. Each site
+also serves a sitemap index (/sitemap.xml) with the offering and teacher pages.
+
+Usage:
+    python standin_server.py [--academies 10] [--latency 0.05]
+    python scrape2.py --base-url http://127.0.0.1:<port> ...
+"""
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# lastmod of every page in the stand-in sitemaps
+LASTMOD = '2025-01-01T00:00:00+01:00'
+
+
+class StandinSite:
+    """Synthetic pages for one academy site."""
+
+    def __init__(self, index, categories=3, offerings=10, teachers=6, variations=2):
+        self.index = index
+        self.categories = categories
+        self.offerings = offerings
+        self.teachers = teachers
+        self.variations = variations
+
+    def offering_categories(self, k):
+        """Categories an offering is listed in; every third offering is in two."""
+        cats = [k % self.categories]
+        if k % 3 == 0 and self.categories > 1:
+            cats.append((k + 1) % self.categories)
+        return cats
+
+    def variation_teachers(self, k, v):
+        teachers = [(k + v) % self.teachers, (k * 7 + v) % self.teachers]
+        return list(dict.fromkeys(teachers))
+
+    def homepage(self):
+        return (
+            '<html><body><div id="block-system-main-block"><article>'
+            '<div class="field field--name-field-body field--type-entity-reference-revisions field--label-hidden field__items">'
+            '<div><article><div><div class="layout__item text--wrapper">'
+            '<div class="clearfix text-formatted field field--name-field-text field--type-text-long field--label-hidden field__item">'
+            f'<p>Welkom bij stand-in academie {self.index}.</p>'
+            '</div></div></div></article></div></div></article></div></body></html>'
+        )
+
+    def program(self):
+        items = ''.join(
+            f'<li><div class="views-field-name"><a href="/programma/categorie-{c}">Categorie {c}</a></div></li>'
+            for c in range(self.categories)
+        )
+        return (
+            '<html><body><div id="block-system-main-block"><div><div><div class="view-content"><div>'
+            f'<ul>{items}</ul>'
+            '</div></div></div></div></div></body></html>'
+        )
+
+    def category(self, c):
+        articles = ''.join(
+            f'<article><a href="/cursus-{k}"><h4><span class="field--name-title">Cursus {self.index}.{k}</span></h4></a></article>'
+            for k in range(self.offerings)
+            if c in self.offering_categories(k)
+        )
+        return f'<html><body><div id="block-system-main-block"><div>{articles}</div></div></body></html>'
+
+    def offering(self, k):
+        variations = []
+        for v in range(self.variations):
+            teachers = ''.join(
+                f'<div class="field__item"><a href="/lesgever/lesgever-{t}">Lesgever {self.index}.{t}</a></div>'
+                for t in self.variation_teachers(k, v)
+            )
+            variations.append(
+                '<div class="field__item">'
+                f'<div class="field--name-title">Les {v + 1}</div>'
+                f'<div class="field--name-field-description"><p>Beschrijving van les {v + 1}.</p></div>'
+                f'<div class="field--name-price"><div class="field__item">&euro; {100 + 10 * v},00</div></div>'
+                '<div class="field--name-field-lesson-dates">'
+                f'<div class="field__item">{1 + v:02d}/10/2025 - 09:00 &ndash; {1 + v:02d}/10/2025 - 16:00</div>'
+                '</div>'
+                f'<div class="field--name-field-location-ref"><a href="/locatie/{k % 4}">Locatie {k % 4}</a></div>'
+                f'<div class="field--name-field-teachers">{teachers}</div>'
+                '</div>'
+            )
+        body = (
+            '<div class="course-number"><div class="field--name-field-course-id">'
+            f'C{self.index:02d}{k:04d}</div></div>'
+            '<div class="course-language"><div class="field--name-field-course-language">Nederlands</div></div>'
+            f'<div class="field--name-field-course-desc"><p>Beschrijving van cursus {k}.</p>'
+            + '<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>' * 20
+            + '</div>'
+            f'<div class="field--name-field-course-program"><ul><li>Onderdeel {k}</li></ul></div>'
+            f'<div class="field--name-variations">{"".join(variations)}</div>'
+        )
+        sidebar = (
+            '<section class="sidebar--second"><div><article><div><picture>'
+            f'<img src="/sites/default/files/cursus-{k}.jpg" alt="">'
+            '</picture></div></article></div></section>'
+        )
+        return (
+            '<html><body><div id="block-system-main-block"><article>'
+            f'<div class="course--content"><section class="main">{body}</section>{sidebar}</div>'
+            '</article></div></body></html>'
+        )
+
+    def teacher(self, t):
+        return (
+            '<html><body><div id="block-system-main-block"><div>'
+            '<section class="main--2-columns">'
+            '<div class="field field--name-field-teacher-pic field--type-image field--label-hidden field__item">'
+            f'<img src="/sites/default/files/lesgever-{t}.jpg"></div></section>'
+            f'<section class="sidebar--second"><div><p>Profiel van lesgever {self.index}.{t}.</p></div></section>'
+            '</div></div></body></html>'
+        )
+
+    def sitemap(self, base_url, part=None):
+        """Sitemap index, or one of its two parts (1: offerings, 2: teachers)."""
+        if part is None:
+            entries = ''.join(
+                f'<sitemap><loc>{base_url}/sitemap-{n}.xml</loc><lastmod>{LASTMOD}</lastmod></sitemap>' for n in (1, 2)
+            )
+            return (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'
+            )
+        if part == 1:
+            paths = [f'/cursus-{k}' for k in range(self.offerings)]
+        else:
+            paths = [f'/lesgever/lesgever-{t}' for t in range(self.teachers)]
+        entries = ''.join(f'<url><loc>{base_url}{path}</loc><lastmod>{LASTMOD}</lastmod></url>' for path in paths)
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+        )
+
+    def page(self, path, base_url=''):
+        """Return the HTML (or sitemap XML) for a path, or None for unknown paths."""
+        path = path.split('?', 1)[0].rstrip('/') or '/'
+        try:
+            if path == '/sitemap.xml':
+                return self.sitemap(base_url)
+            if path in ('/sitemap-1.xml', '/sitemap-2.xml'):
+                return self.sitemap(base_url, int(path[9]))
+            if path == '/':
+                return self.homepage()
+            if path == '/programma':
+                return self.program()
+            if path.startswith('/programma/categorie-'):
+                c = int(path.rsplit('-', 1)[1])
+                return self.category(c) if c < self.categories else None
+            if path.startswith('/cursus-'):
+                k = int(path.rsplit('-', 1)[1])
+                return self.offering(k) if k < self.offerings else None
+            if path.startswith('/lesgever/lesgever-'):
+                t = int(path.rsplit('-', 1)[1])
+                return self.teacher(t) if t < self.teachers else None
+        except ValueError:
+            return None
+        return None
+
+
+def make_handler(site, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            html = site.page(self.path, f"http://{self.headers['Host']}")
+            if html is None:
+                self.send_error(404)
+                return
+            body = html.encode('utf-8')
+            etag = '"' + hashlib.md5(body).hexdigest()[:16] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            content_type = 'application/xml' if self.path.endswith('.xml') else 'text/html; charset=utf-8'
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_standin(academies=10, latency=0.05, port=0, **site_options):
+    """
+    Start one stand-in server per academy in background threads
+
+    Args:
+        academies: Number of academy sites to serve
+        latency: Artificial delay in seconds added to every response
+        port: First port to use, or 0 for ephemeral ports
+        **site_options: Passed to StandinSite (categories, offerings, teachers, variations)
+
+    Returns:
+        Tuple of (servers, base_urls)
+    """
+    servers = []
+    base_urls = []
+    for index in range(academies):
+        site = StandinSite(index, **site_options)
+        server = ThreadingHTTPServer(('127.0.0.1', port + index if port else 0), make_handler(site, latency))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        base_urls.append(f"http://127.0.0.1:{server.server_address[1]}")
+    return servers, base_urls
+
+
+def stop_standin(servers):
+    """Shut down servers started by start_standin."""
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic academy sites for offline scraper runs")
+    parser.add_argument("--academies", type=int, default=10, help="Number of academy sites (default: 10)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of delay per response (default: 0.05)")
+    parser.add_argument("--port", type=int, default=8100, help="First port; academy N listens on port+N (default: 8100)")
+    parser.add_argument("--categories", type=int, default=3, help="Categories per academy (default: 3)")
+    parser.add_argument("--offerings", type=int, default=10, help="Offerings per academy (default: 10)")
+    parser.add_argument("--teachers", type=int, default=6, help="Teachers per academy (default: 6)")
+    args = parser.parse_args()
+
+    servers, base_urls = start_standin(
+        args.academies,
+        args.latency,
+        args.port,
+        categories=args.categories,
+        offerings=args.offerings,
+        teachers=args.teachers,
+    )
+    print("Serving stand-in academies:")
+    for base_url in base_urls:
+        print(f"  {base_url}")
+    print("Scrape them with:")
+    print("  python scrape2.py " + " ".join(f"--base-url {base_url}" for base_url in base_urls))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop_standin(servers)
@@ -3,17 +3,25 @@
 Helper script to automate the complete process of scraping data and updating the Django database.
 This script will:
 1. Run the scrape2.py script to gather data from academy websites
-2. Run the import_detailed_data command to update the Django database
-3. Run the move_ugain_offerings command to handle UGain exceptions
+2. Copy the live database to a shadow database next to it
+3. Run the import_detailed_data and move_ugain_offerings commands on the shadow database
+4. Check the shadow database and swap it in for the live one
+
+The site keeps serving the live database until the swap, which is a single
+rename: a request sees either the old or the new data, never a half-imported
+database. The replaced database is kept as db.sqlite3.previous.
 
 Usage:
     python update_data.py [--clear]
+    python update_data.py --rollback
 
 Options:
-    --clear    Clear existing data before importing
+    --clear       Clear existing data before importing
+    --rollback    Swap the previous database back in (run again to undo)
 """
 
 import os
+import sqlite3
 import subprocess
 import sys
 import time
@@ -24,13 +32,119 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent
 JSON_PATH = BASE_DIR / 'getdata' / 'ugent_academies_data_detailed.json'
 ROOT_JSON_PATH = BASE_DIR / 'ugent_academies_data_detailed.json'  # In case it's saved in the root
+DB_PATH = BASE_DIR / 'db.sqlite3'
+SHADOW_DB_PATH = BASE_DIR / 'db.sqlite3.new'
+PREVIOUS_DB_PATH = BASE_DIR / 'db.sqlite3.previous'
+
+# Tables whose row counts are compared before swapping in the shadow database
+CHECKED_TABLES = ['academies_academy', 'academies_category', 'academies_offering', 'academies_variation', 'academies_teacher']
+# Fraction of the live offerings the shadow database must at least have
+MIN_OFFERING_RATIO = 0.5
+
+
+def manage(*args):
+    """Run a manage.py command on the shadow database."""
+    env = {**os.environ, 'ACADEMY_DB_PATH': str(SHADOW_DB_PATH)}
+    subprocess.run([sys.executable, str(BASE_DIR / 'manage.py'), *args], check=True, cwd=str(BASE_DIR), env=env)
+
+
+def create_shadow_db():
+    """Copy the live database to the shadow database, or start an empty one."""
+    SHADOW_DB_PATH.unlink(missing_ok=True)
+    if DB_PATH.exists():
+        # The backup API copies a consistent snapshot while the site is using the database
+        live = sqlite3.connect(DB_PATH)
+        shadow = sqlite3.connect(SHADOW_DB_PATH)
+        try:
+            live.backup(shadow)
+        finally:
+            shadow.close()
+            live.close()
+
+
+def count_rows(db_path):
+    """Row counts of CHECKED_TABLES in a database; tables that do not exist count as 0."""
+    connection = sqlite3.connect(db_path)
+    try:
+        tables = {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return {
+            table: connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] if table in tables else 0
+            for table in CHECKED_TABLES
+        }
+    finally:
+        connection.close()
+
+
+def check_shadow_db():
+    """
+    Check the shadow database before it replaces the live one
+
+    Returns:
+        A list of problems, empty if the shadow database can be swapped in
+    """
+    problems = []
+    connection = sqlite3.connect(SHADOW_DB_PATH)
+    try:
+        result = connection.execute('PRAGMA integrity_check').fetchone()[0]
+        # Swap in a single file, without a journal still to be applied
+        connection.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        connection.close()
+    if result != 'ok':
+        problems.append(f'integrity check failed: {result}')
+
+    shadow = count_rows(SHADOW_DB_PATH)
+    live = count_rows(DB_PATH) if DB_PATH.exists() else {table: 0 for table in CHECKED_TABLES}
+    print(f"   {'table':<24} {'live':>8} {'new':>8}")
+    for table in CHECKED_TABLES:
+        print(f"   {table:<24} {live[table]:8,} {shadow[table]:8,}")
+
+    if not shadow['academies_academy'] or not shadow['academies_offering']:
+        problems.append('no academies or offerings were imported')
+    elif shadow['academies_offering'] < live['academies_offering'] * MIN_OFFERING_RATIO:
+        problems.append(f"only {shadow['academies_offering']:,} offerings, against {live['academies_offering']:,} now")
+    return problems
+
+
+def swap_in(new_path, previous_path):
+    """
+    Make new_path the live database and keep the live one as previous_path
+
+    os.replace() is atomic, so db.sqlite3 always exists and is always one of
+    the two complete databases. Connections opened before the swap keep
+    reading the old file until they close; Django opens one per request.
+    """
+    if DB_PATH.exists():
+        previous_path.unlink(missing_ok=True)
+        try:
+            os.link(DB_PATH, previous_path)
+        except OSError:
+            # File systems without hard links
+            shutil.copy2(DB_PATH, previous_path)
+    os.replace(new_path, DB_PATH)
+
+
+def rollback():
+    """Swap the previous database back in, keeping the current one as previous."""
+    if not PREVIOUS_DB_PATH.exists():
+        print(f"❌ No previous database at {PREVIOUS_DB_PATH}")
+        return
+    rolled_back = BASE_DIR / 'db.sqlite3.rollback'
+    os.replace(PREVIOUS_DB_PATH, rolled_back)
+    swap_in(rolled_back, PREVIOUS_DB_PATH)
+    print(f"✅ Previous database restored; the replaced one is kept as {PREVIOUS_DB_PATH.name}")
+
 
 def main():
+    if '--rollback' in sys.argv:
+        rollback()
+        return
+
     clear_option = '--clear' in sys.argv
     run_cwd = str(BASE_DIR)
-    
+
     print("=== UGent Academy Data Management ===")
-    
+
     # Step 1: Run the scraper
     print("\n🔄 Step 1: Running scraper to collect data...")
     try:
@@ -44,7 +158,7 @@ def main():
 
     # Small delay to ensure file writes are complete
     time.sleep(1)
-      # Check if JSON file exists
+    # Check if JSON file exists
     if not JSON_PATH.exists():
         # Check if the file might be in the root directory
         if ROOT_JSON_PATH.exists():
@@ -59,37 +173,52 @@ def main():
             print(f"❌ Error: JSON file not found at {JSON_PATH} or in root directory")
             print("   Please check the scraper configuration and output.")
             return
-          # Step 2: Import data into Django
-    print("\n🔄 Step 2: Importing data into Django...")
-    manage_py = BASE_DIR / 'manage.py'
-    command = [sys.executable, str(manage_py), 'import_detailed_data', str(JSON_PATH)]
+
+    # Step 2: Import data into a shadow copy of the database
+    print(f"\n🔄 Step 2: Importing data into a shadow database ({SHADOW_DB_PATH.name})...")
+    command = ['import_detailed_data', str(JSON_PATH)]
     if clear_option:
         command.append('--clear')
         print("   (Using --clear option: existing data will be cleared)")
-        
+
     try:
-            subprocess.run(command, check=True, cwd=run_cwd)
+        create_shadow_db()
+        manage('migrate', '--noinput')
+        manage(*command)
         print("✅ Import completed successfully")
     except subprocess.CalledProcessError:
         print("❌ Import failed. Please check the Django error output.")
+        print("   The live database was not changed.")
+        SHADOW_DB_PATH.unlink(missing_ok=True)
         return
-    
+
     # Step 3: Move UGain offerings from Science Academy to UGain Academy
     print("\n🔄 Step 3: Moving UGain offerings to correct academy...")
     try:
-        move_command = [sys.executable, str(manage_py), 'move_ugain_offerings']
-        subprocess.run(move_command, check=True, cwd=run_cwd)
+        manage('move_ugain_offerings')
         print("✅ UGain offerings moved successfully")
     except subprocess.CalledProcessError:
         print("❌ UGain move failed. This may be normal if no UGain offerings were found.")
         print("   You can run 'python manage.py move_ugain_offerings' manually if needed.")
-        
+
+    # Step 4: Check the shadow database and swap it in
+    print("\n🔄 Step 4: Checking the new database...")
+    problems = check_shadow_db()
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        print(f"   The live database was not changed; the new one is left at {SHADOW_DB_PATH} for inspection.")
+        return
+    swap_in(SHADOW_DB_PATH, PREVIOUS_DB_PATH)
+    print(f"✅ New database swapped in; the previous one is kept as {PREVIOUS_DB_PATH.name}")
+
     print("\n✨ Complete data update process finished! ✨")
     print("All steps completed:")
     print("  ✅ Data scraped from academy websites")
     print("  ✅ Data imported into Django database")
     print("  ✅ UGain offerings moved to correct academy")
     print("You can now check the Django site to see the updated content.")
+    print("Run 'python update_data.py --rollback' to go back to the previous data.")
 
 if __name__ == '__main__':
     main()